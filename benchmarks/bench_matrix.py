@@ -0,0 +1,273 @@
+"""
+Benchmark suite: time generating and outputting the matrix for
+synthetic tox configs.
+
+    python benchmarks/bench_matrix.py [--output FILE] [--repeat N]
+        [--scenario NAME ...] [--sizes N ...]
+
+Scenarios (each a synthetic tox.ini):
+
+    factors         wide brace-factor products: py{38,39}-a{...}-b{0,...,4}
+                    (default 10, 100, 1,000 and 10,000 envs)
+    basepythons     many distinct basepythons (CPython 2.7-3.13, PyPy 3.7-3.10)
+    substitutions   heavy {env:...} and {[section]key} substitution
+                    in setenv, deps, commands, basepython and ignore_outcome
+
+For each, times:
+
+    config_to_matrix  tox_config_to_gh_matrix, on an already-parsed tox config
+    set_gh_output     json.dumps the matrix and set_gh_output it
+    write_outputs     generate the matrix and write_gh_matrix_outputs it, streamed
+                      (as --gh-matrix does)
+    tox               end-to-end `tox -c tox.ini --gh-matrix` (in process)
+    fast              end-to-end `python -m tox_gh_matrix --fast tox.ini --gh-matrix`
+
+Interpreters are mocked (with the tests' mock_interpreter helper), so no
+real Pythons are needed, and memoization caches are cleared before each
+run. Results (the best of --repeat runs) are written as JSON to --output
+(default: bench-results.json); compare two of them with compare.py.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import tox
+import tox.config
+import tox.session
+
+from tox_gh_matrix import __version__, version_utils
+from tox_gh_matrix.__main__ import main as gh_matrix_main
+from tox_gh_matrix.cache_keys import hash_file
+from tox_gh_matrix.plugin import (
+    iter_gh_matrix,
+    set_gh_output,
+    tox_config_to_gh_matrix,
+    write_gh_matrix_outputs,
+)
+
+# The tests' mock interpreters (see tests/mock_interpreters.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tests"))
+from mock_interpreters import MockInterpreters  # noqa: E402
+
+RESULTS_VERSION = 1
+
+DEFAULT_SIZES = {
+    "factors": [10, 100, 1_000, 10_000],
+    "basepythons": [1_000],
+    "substitutions": [1_000],
+}
+
+MEASURES = ["config_to_matrix", "set_gh_output", "write_outputs", "tox", "fast"]
+
+# factor --> mocked interpreter basepython
+PYTHONS = {
+    "py27": "python2.7",
+    **{f"py3{minor}": f"python3.{minor}" for minor in range(5, 14)},
+    **{f"pypy3{minor}": f"pypy3.{minor}" for minor in range(7, 11)},
+}
+
+
+def factors_ini(num_envs: int) -> str:
+    a_factors = ",".join(str(n) for n in range(max(1, num_envs // 10)))
+    return f"""
+[tox]
+envlist = py{{38,39}}-a{{{a_factors}}}-b{{0,1,2,3,4}}
+[testenv]
+deps = pytest
+commands = pytest {{posargs}}
+"""
+
+
+def basepythons_ini(num_envs: int) -> str:
+    pythons = ",".join(PYTHONS)
+    a_factors = ",".join(str(n) for n in range(max(1, num_envs // len(PYTHONS))))
+    return f"""
+[tox]
+envlist = {{{pythons}}}-a{{{a_factors}}}
+[testenv]
+deps = pytest
+commands = pytest {{posargs}}
+"""
+
+
+def substitutions_ini(num_envs: int) -> str:
+    a_factors = ",".join(str(n) for n in range(max(1, num_envs // 10)))
+    setenv = "\n".join(
+        f"    BENCH_{n} = {{env:BENCH_{n}:{{envname}}-{{toxinidir}}-{n}}}" for n in range(10)
+    )
+    return f"""
+[tox]
+envlist = py{{38,39}}-a{{{a_factors}}}-b{{0,1,2,3,4}}
+[base]
+deps =
+    pytest{{env:BENCH_PYTEST_SPEC:>=7}}
+    coverage{{env:BENCH_COVERAGE_SPEC:}}
+[testenv]
+basepython =
+    py38: {{env:BENCH_PY38:python3.8}}
+    py39: {{env:BENCH_PY39:python3.9}}
+setenv =
+{setenv}
+deps =
+    {{[base]deps}}
+    b0: {{env:BENCH_B0_DEP:six}}
+commands = python -c "print('{{env:BENCH_MESSAGE:hello}} {{envname}}')" {{posargs}}
+ignore_outcome =
+    b4: {{env:BENCH_IGNORE_OUTCOME:true}}
+"""
+
+
+SCENARIOS: Dict[str, Callable[[int], str]] = {
+    "factors": factors_ini,
+    "basepythons": basepythons_ini,
+    "substitutions": substitutions_ini,
+}
+
+
+def mock_interpreters():
+    """Make tox find a (mock) interpreter for every basepython in PYTHONS"""
+    interpreters = MockInterpreters()
+    for basepython in PYTHONS.values():
+        interpreters.install(basepython)
+    interpreters.patch()
+
+
+def clear_caches():
+    """Forget memoized results, so each run starts cold"""
+    for func in (
+        version_utils.basepython_to_gh_python_version,
+        version_utils.python_version_to_prerelease_spec,
+        version_utils.implementation_version,
+        hash_file,
+    ):
+        func.cache_clear()
+
+
+def best_time(func: Callable, repeat: int) -> List[float]:
+    """Run func (after clearing caches) repeat times, and return each run's seconds"""
+    times = []
+    for _ in range(repeat):
+        clear_caches()
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def expect_exit(func: Callable):
+    try:
+        func()
+    except SystemExit as exit:
+        if exit.code:
+            raise RuntimeError(f"exited with {exit.code}")
+    else:
+        raise RuntimeError("didn't exit")
+
+
+def run_scenario(scenario: str, num_envs: int, repeat: int, measures: List[str]) -> List[Dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        ini_path = tmp / "tox.ini"
+        ini_path.write_text(SCENARIOS[scenario](num_envs))
+        output_path = tmp / "github-output"
+        os.environ["GITHUB_OUTPUT"] = str(output_path)
+        os.environ["TOX_GH_MATRIX_CACHE_DIR"] = str(tmp / "cache")
+
+        # (-qq, which also applies to the later measures: the larger synthetic
+        # matrices are deliberately over GitHub's limits, so don't warn about it.)
+        config = tox.config.parseconfig(["-c", str(ini_path), "-qq"])
+        matrix = tox_config_to_gh_matrix(config)
+
+        def write_outputs():
+            write_gh_matrix_outputs({"envlist": iter_gh_matrix(config)})
+
+        funcs = {
+            "config_to_matrix": lambda: tox_config_to_gh_matrix(config),
+            "set_gh_output": lambda: set_gh_output("envlist", json.dumps(matrix)),
+            "write_outputs": write_outputs,
+            "tox": lambda: expect_exit(
+                lambda: tox.session.main(["-c", str(ini_path), "--gh-matrix", "-qq"])
+            ),
+            "fast": lambda: expect_exit(
+                lambda: gh_matrix_main(["--fast", str(ini_path), "--gh-matrix"])
+            ),
+        }
+        for measure in measures:
+            output_path.write_text("")
+            times = best_time(funcs[measure], repeat)
+            results.append(
+                {
+                    "scenario": scenario,
+                    "envs": len(matrix),
+                    "measure": measure,
+                    "seconds": min(times),
+                    "runs": times,
+                }
+            )
+            print(
+                f"{scenario:>14} {len(matrix):>7} {measure:>17}" f" {min(times) * 1e3:>10.1f} ms",
+                flush=True,
+            )
+    return results
+
+
+def git_revision() -> str:
+    try:
+        result = subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=str(Path(__file__).parent),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True,
+            universal_newlines=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+    return result.stdout.strip()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--output", default="bench-results.json", metavar="FILE")
+    parser.add_argument("--repeat", type=int, default=3, metavar="N")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS))
+    parser.add_argument("--sizes", type=int, nargs="+", metavar="N")
+    parser.add_argument("--measure", action="append", choices=MEASURES)
+    options = parser.parse_args(args)
+
+    mock_interpreters()
+    measures = options.measure or MEASURES
+    print(f"{'scenario':>14} {'envs':>7} {'measure':>17} {'best':>13}")
+    results = []
+    for scenario in options.scenario or SCENARIOS:
+        for size in options.sizes or DEFAULT_SIZES[scenario]:
+            results.extend(run_scenario(scenario, size, options.repeat, measures))
+
+    data = {
+        "version": RESULTS_VERSION,
+        "revision": git_revision(),
+        "tox_gh_matrix": __version__,
+        "tox": tox.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": options.repeat,
+        "results": results,
+    }
+    with open(options.output, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+    print(f"Wrote {options.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Memory benchmark: peak memory used generating and outputting the matrix,
+as the envlist grows.
+
+    python benchmarks/bench_memory.py [--check] [NUM_ENVS ...]
+
+For each envlist size (default 1,000, 4,000 and 16,000 envs), loads a
+synthetic tox.ini with the --fast config reader, then measures the peak
+additional memory (both traced Python allocations and process RSS) used
+by `--gh-matrix` output: streamed (as tox-gh-matrix does it), and fully
+materialized (a list of items, then a single JSON string) for comparison.
+
+Each measurement runs in a fresh subprocess, so peak RSS isn't shared.
+With --check, exits with an error if the streamed peak at the largest
+size is more than CHECK_RATIO times the peak at the smallest size.
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from tox_gh_matrix.__main__ import make_fast_parser
+from tox_gh_matrix.fast import parse_fast_config
+from tox_gh_matrix.plugin import output_gh_matrix, tox_config_to_gh_matrix
+
+DEFAULT_SIZES = [1_000, 4_000, 16_000]
+CHECK_RATIO = 2.0
+MODES = ["streamed", "materialized"]
+
+
+def write_tox_ini(path: Path, num_envs: int):
+    """Write a tox.ini with a py39-a{...}-b{...} envlist of about num_envs envs"""
+    factors = ",".join(str(n) for n in range(max(1, num_envs // 100)))
+    path.write_text(
+        f"[tox]\nenvlist = py39-a{{{factors}}}-b{{{','.join(str(n) for n in range(100))}}}\n"
+    )
+
+
+def max_rss_bytes() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def measure(num_envs: int, mode: str) -> dict:
+    """Measure a single size and mode (in this process)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_tox_ini(tmp / "tox.ini", num_envs)
+        os.environ["GITHUB_OUTPUT"] = str(tmp / "github-output")
+        os.environ["TOX_GH_MATRIX_CACHE_DIR"] = str(tmp / "cache")
+        parser = make_fast_parser()
+        option = parser.parse_args(["--gh-matrix"])
+        config = parse_fast_config(option, str(tmp), parser.testenv_attributes)
+
+        rss_before = max_rss_bytes()
+        tracemalloc.start()
+        if mode == "streamed":
+            output_gh_matrix(config)
+        else:
+            value = json.dumps(tox_config_to_gh_matrix(config))
+            with open(os.environ["GITHUB_OUTPUT"], "a") as f:
+                f.write(f"envlist={value}\n")
+            del value
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss_growth = max_rss_bytes() - rss_before
+        output_size = (tmp / "github-output").stat().st_size
+    return {
+        "envs": len(config.envlist),
+        "mode": mode,
+        "traced_peak": traced_peak,
+        "rss_growth": rss_growth,
+        "output_size": output_size,
+    }
+
+
+def run_child(num_envs: int, mode: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, __file__, "--child", str(num_envs), mode],
+        stdout=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    )
+    # (The result is the last line, after any tox-gh-matrix warnings.)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main(args):
+    if args[:1] == ["--child"]:
+        print(json.dumps(measure(int(args[1]), args[2])))
+        return 0
+
+    check = "--check" in args
+    sizes = [int(arg) for arg in args if arg != "--check"] or DEFAULT_SIZES
+    results = {mode: [run_child(size, mode) for size in sizes] for mode in MODES}
+
+    print(f"{'envs':>8} {'mode':>12} {'traced peak':>12} {'RSS growth':>12} {'output':>10}")
+    for mode in MODES:
+        for result in results[mode]:
+            print(
+                f"{result['envs']:>8} {mode:>12} {result['traced_peak'] / 1024:>10.0f}kB"
+                f" {result['rss_growth'] / 1024:>10.0f}kB {result['output_size'] / 1024:>8.0f}kB"
+            )
+
+    if check:
+        streamed = results["streamed"]
+        ratio = streamed[-1]["traced_peak"] / streamed[0]["traced_peak"]
+        if ratio > CHECK_RATIO:
+            print(f"FAILED: streamed peak grew {ratio:.1f}x (limit {CHECK_RATIO}x)")
+            return 1
+        print(f"OK: streamed peak grew {ratio:.1f}x (limit {CHECK_RATIO}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
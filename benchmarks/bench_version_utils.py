@@ -0,0 +1,68 @@
+"""
+Micro-benchmark: per-env cost of mapping basepython to the matrix `python` field.
+
+    python benchmarks/bench_version_utils.py [NUM_ENVS]
+
+Simulates a large factor-product envlist (default 10,000 envs), where the
+same handful of basepythons repeat across envs, and compares the memoized
+version_utils functions with their unmemoized versions.
+"""
+
+import itertools
+import sys
+import timeit
+
+from tox_gh_matrix import version_utils
+from tox_gh_matrix.version_utils import (
+    basepython_to_gh_python_version,
+    gh_python_config,
+    python_version_to_prerelease_spec,
+)
+
+PYTHONS = ["python3.7", "python3.8", "python3.9", "python3.10", "python3.11", "pypy3.9"]
+
+
+def make_basepythons(num_envs: int):
+    """basepython for each env in a {python}-django{N}-db{N}-... envlist"""
+    others = itertools.product(range(10), range(10), range(10), range(10))
+    envs = itertools.product(others, PYTHONS)
+    return [basepython for _, basepython in itertools.islice(envs, num_envs)]
+
+
+def run(basepythons):
+    for basepython in basepythons:
+        gh_python_config(basepython)
+
+
+def unmemoized():
+    """Replace the memoized functions with their originals (returns an undo function)"""
+    originals = {}
+    for func in (basepython_to_gh_python_version, python_version_to_prerelease_spec):
+        originals[func.__name__] = func
+        setattr(version_utils, func.__name__, func.__wrapped__)
+
+    def restore():
+        for name, func in originals.items():
+            setattr(version_utils, name, func)
+
+    return restore
+
+
+def main(num_envs: int = 10_000, repeat: int = 5):
+    basepythons = make_basepythons(num_envs)
+
+    def best_per_env(label):
+        seconds = min(timeit.repeat(lambda: run(basepythons), number=1, repeat=repeat))
+        print(f"{label:>12}: {seconds / num_envs * 1e6:.3f} µs/env ({seconds * 1e3:.1f} ms total)")
+
+    print(f"{num_envs} envs, {len(set(basepythons))} distinct basepythons")
+    restore = unmemoized()
+    try:
+        best_per_env("unmemoized")
+    finally:
+        restore()
+    best_per_env("memoized")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
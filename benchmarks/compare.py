@@ -0,0 +1,74 @@
+"""
+Compare two bench_matrix.py results files (e.g., from different revisions).
+
+    python benchmarks/compare.py BASE.json HEAD.json [--threshold RATIO]
+
+Shows each measurement's best time in both files, and the ratio HEAD/BASE.
+Exits with an error if any ratio exceeds --threshold (default 1.25),
+so it can be used to catch performance regressions.
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, Tuple
+
+DEFAULT_THRESHOLD = 1.25
+
+Key = Tuple[str, int, str]  # (scenario, envs, measure)
+
+
+def load_results(path: str) -> Dict[Key, float]:
+    """Return (scenario, envs, measure) --> best seconds from a results file"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {
+        (result["scenario"], result["envs"], result["measure"]): result["seconds"]
+        for result in data["results"]
+    }
+
+
+def describe(path: str) -> str:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return f"{path} ({data.get('revision') or data.get('tox_gh_matrix')}, tox {data.get('tox')})"
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, metavar="RATIO")
+    options = parser.parse_args(args)
+
+    base = load_results(options.base)
+    head = load_results(options.head)
+    print(f"base: {describe(options.base)}")
+    print(f"head: {describe(options.head)}")
+    print(f"{'scenario':>14} {'envs':>7} {'measure':>17} {'base':>11} {'head':>11} {'ratio':>7}")
+
+    regressions = 0
+    for key in sorted(set(base) | set(head)):
+        scenario, envs, measure = key
+        if key not in base or key not in head:
+            only = "base" if key in base else "head"
+            print(f"{scenario:>14} {envs:>7} {measure:>17}  (only in {only})")
+            continue
+        ratio = head[key] / base[key] if base[key] else float("inf")
+        flag = ""
+        if ratio > options.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(
+            f"{scenario:>14} {envs:>7} {measure:>17} {base[key] * 1e3:>8.1f} ms"
+            f" {head[key] * 1e3:>8.1f} ms {ratio:>6.2f}x{flag}"
+        )
+
+    if regressions:
+        print(f"{regressions} measurements slower than {options.threshold}x base")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,8 @@
+from .api import MatrixConfig, build_matrix, load_config
+from .timings import mark_time
 from .version import version as __version__
 
-__all__ = ("__version__",)
+# (When tox started loading the plugin, for --gh-matrix-timings.)
+mark_time("import")
+
+__all__ = ("__version__", "MatrixConfig", "build_matrix", "load_config")
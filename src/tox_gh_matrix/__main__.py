@@ -0,0 +1,239 @@
+"""
+Command line entry point: python -m tox_gh_matrix [--fast] [--batch] [INI] [OPTIONS]
+or: python -m tox_gh_matrix [--fast] --projects [--projects-jobs=N] [ROOT] [OPTIONS]
+
+Without --fast, this is equivalent to `tox -c INI OPTIONS`
+(OPTIONS default to --gh-matrix-dump). With --fast, the matrix
+is generated from a partial read of INI, skipping tox's full
+config parsing. (See tox_gh_matrix.fast.)
+
+With --gh-matrix-result-cache, a cached result is looked up before
+parsing the config (with or without --fast).
+
+With --batch, the config is loaded once, then each line of stdin is
+a query: a FILTER (as in --gh-matrix=VAR=FILTER, or blank for all envs),
+answered with a line of JSON: the matrix for the envs matching FILTER.
+
+With --projects, builds the matrices for all the tox.ini projects under
+ROOT (default: the current directory) in up to --projects-jobs worker
+processes, and outputs them as one matrix (see tox_gh_matrix.projects).
+Exits with an error if any project's matrix couldn't be built (after
+outputting the others). Matrix-wide options (like --gh-matrix-pack)
+aren't supported with --projects.
+"""
+
+import json
+import pathlib
+import sys
+from collections import OrderedDict
+from typing import List, Optional
+
+import tox
+from tox import reporter as report
+from tox.exception import ConfigError
+
+from .api import load_config
+from .fast import FastParser, find_config_file, parse_fast_config
+from .filters import parse_gh_matrix_specs
+from .json_stream import ReportWriter, iterencode
+from .plugin import (
+    filter_gh_matrix,
+    get_result_fingerprint,
+    get_results_dir,
+    output_cached_gh_matrix,
+    tox_addoption,
+    tox_configure,
+    write_gh_matrix_outputs,
+)
+from .projects import build_projects_matrix
+
+# Matrix-wide options that --projects can't apply to the merged matrix
+PROJECTS_UNSUPPORTED_OPTIONS = (
+    "gh_matrix_pack",
+    "gh_matrix_chunks",
+    "gh_matrix_stages",
+    "gh_matrix_baseline",
+)
+
+# Options that select what tox-gh-matrix does (else --gh-matrix-dump)
+COMMAND_OPTIONS = ("--gh-matrix", "--gh-matrix-dump", "--gh-matrix-record", "--gh-matrix-watch")
+
+
+def make_fast_parser() -> FastParser:
+    """Return a parser for the subset of tox options the --fast path supports"""
+    parser = FastParser(prog="python -m tox_gh_matrix --fast INI")
+    parser.add_argument("-e", action="append", dest="env", metavar="envlist")
+    parser.add_argument("--discover", nargs="+", default=[], metavar="PATH")
+    parser.add_argument("--force-dep", action="append", metavar="REQ")
+    tox_addoption(parser)
+    return parser
+
+
+def main(args: Optional[List[str]] = None):
+    args = list(sys.argv[1:] if args is None else args)
+    fast = "--fast" in args
+    if fast:
+        args.remove("--fast")
+    batch = "--batch" in args
+    if batch:
+        args.remove("--batch")
+    projects = "--projects" in args
+    if projects:
+        args.remove("--projects")
+    try:
+        projects_jobs = parse_projects_jobs(pop_option_value(args, "--projects-jobs"))
+    except ConfigError as error:
+        usage_error(error)
+    inipath = args.pop(0) if args and not args[0].startswith("-") else None
+    if batch:
+        run_batch(inipath, args, fast)
+        return
+    if projects:
+        try:
+            check_projects_options(args)
+        except ConfigError as error:
+            usage_error(error)
+        run_projects(inipath, args, fast, projects_jobs)
+        return
+    if not any(arg.split("=", 1)[0] in COMMAND_OPTIONS for arg in args):
+        args.append("--gh-matrix-dump")
+
+    if "--gh-matrix-result-cache" in args:
+        output_cached_result(args, inipath, fast)
+
+    if fast:
+        parser = make_fast_parser()
+        option = parser.parse_args(args)
+        config = parse_fast_config(option, inipath, parser.testenv_attributes)
+        # (Handles the command and raises SystemExit, just like under tox.)
+        tox_configure(config)
+    else:
+        tox.cmdline((["-c", inipath] if inipath else []) + args)
+
+
+def pop_option_value(args: List[str], name: str) -> Optional[str]:
+    """
+    Remove name=VALUE (or name VALUE) from args, and return VALUE
+    (or None if not there)
+    """
+    for index, arg in enumerate(args):
+        if arg.startswith(f"{name}="):
+            del args[index]
+            return arg.split("=", 1)[1]
+        if arg == name:
+            if index + 1 >= len(args):
+                raise ConfigError(f"{name} needs a value")
+            value = args.pop(index + 1)
+            del args[index]
+            return value
+    return None
+
+
+def parse_projects_jobs(value: Optional[str]) -> Optional[int]:
+    """Parse a --projects-jobs value (None for the default)"""
+    if value is None:
+        return None
+    try:
+        jobs = int(value)
+    except ValueError:
+        jobs = 0
+    if jobs < 1:
+        raise ConfigError(f"--projects-jobs must be a positive integer, not {value!r}")
+    return jobs
+
+
+def check_projects_options(args: List[str]):
+    """Raise ConfigError if args include options --projects doesn't support"""
+    option, _ = make_fast_parser().argparser.parse_known_args(args)
+    unsupported = [
+        "--" + name.replace("_", "-")
+        for name in PROJECTS_UNSUPPORTED_OPTIONS
+        if getattr(option, name, None)
+    ]
+    if getattr(option, "gh_matrix_format", "json") != "json":
+        unsupported.append(f"--gh-matrix-format={option.gh_matrix_format}")
+    if unsupported:
+        raise ConfigError(f"--projects doesn't support {', '.join(unsupported)}")
+
+
+def usage_error(error: ConfigError):
+    """Report a command line error, and exit"""
+    report.error(f"tox-gh-matrix: {error}")
+    raise SystemExit(2)
+
+
+def output_cached_result(args: List[str], inipath: Optional[str], fast: bool):
+    """Output a cached result without parsing the tox config, and exit, if there is one"""
+    option, _ = make_fast_parser().argparser.parse_known_args(args)
+    try:
+        toxinipath = find_config_file(inipath)
+    except ConfigError:
+        return  # (Let tox report it.)
+    fingerprint = get_result_fingerprint(option, toxinipath, fast=fast)
+    if fingerprint is not None and output_cached_gh_matrix(
+        option, fingerprint, get_results_dir(option)
+    ):
+        raise SystemExit(0)
+
+
+def run_batch(inipath: Optional[str], args: List[str], fast: bool):
+    """Answer FILTER queries from stdin (see module docstring)"""
+    config = load_config(inipath, args=args, fast=fast)
+    for line in sys.stdin:
+        filter_spec = line.strip()
+        matrix = config.build_matrix(filters=[filter_spec] if filter_spec else None)
+        print(json.dumps(matrix), flush=True)
+
+
+def split_command_args(args: List[str]) -> List[str]:
+    """Return args without COMMAND_OPTIONS (and their values)"""
+    remaining = []
+    previous = None
+    for arg in args:
+        if arg.split("=", 1)[0] in COMMAND_OPTIONS:
+            pass
+        elif previous == "--gh-matrix" and not arg.startswith("-"):
+            pass  # (--gh-matrix's VAR, as a separate arg)
+        else:
+            remaining.append(arg)
+        previous = arg
+    return remaining
+
+
+def run_projects(root: Optional[str], args: List[str], fast: bool, jobs: Optional[int]):
+    """Output the combined matrix for all projects under root (see module docstring)"""
+    option, _ = make_fast_parser().argparser.parse_known_args(args)
+    specs = option.gh_matrix or []
+    # output name --> filter (or None for all envs)
+    try:
+        output_filters = parse_gh_matrix_specs(specs)
+    except ConfigError as error:
+        usage_error(error)
+    # Only build envs that are in some output (as FILTER strings, for the workers).
+    filter_specs = [spec.partition("=")[2] for spec in specs]
+    filters = filter_specs if specs and all(filter_specs) else None
+
+    matrix, errors = build_projects_matrix(
+        pathlib.Path(root or "."), split_command_args(args), fast=fast, filters=filters, jobs=jobs
+    )
+    for project, error in errors.items():
+        report.error(f"tox-gh-matrix: can't build matrix for project {project!r}: {error}")
+
+    matrices = OrderedDict(
+        (name, matrix if f is None else list(filter_gh_matrix(matrix, f)))
+        for name, f in output_filters.items()
+    )
+    if option.gh_matrix_dump or not matrices:
+        dump = next(iter(matrices.values())) if len(matrices) == 1 else matrices or matrix
+        writer = ReportWriter()
+        for text in iterencode(dump, indent=2):
+            writer.write(text)
+        writer.close()
+    if matrices:
+        write_gh_matrix_outputs(matrices)
+    if errors:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
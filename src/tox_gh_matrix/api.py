@@ -0,0 +1,126 @@
+"""
+In-process API for generating GitHub workflow matrices, without a tox session:
+
+    from tox_gh_matrix import build_matrix, load_config
+
+    matrix = build_matrix("tox.ini", filters=["py39-!win"])
+
+    # Parse the tox config once, then build any number of matrices from it:
+    config = load_config("tox.ini", args=["--gh-matrix-order=duration"])
+    unit = config.build_matrix(filters=["unit"])
+    integration = config.build_matrix(filters=["integration"])
+    names = config.build_matrix(fields=["name", "python.spec"])
+
+The matrix items are the same as --gh-matrix's (see tox_config_to_gh_matrix).
+Tox (and the rest of tox-gh-matrix) is only imported when first needed.
+"""
+
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+if TYPE_CHECKING:  # pragma: no cover
+    import tox.config
+
+# A FILTER string (as in --gh-matrix=VAR=FILTER) or an envname -> bool function
+Filter = Union[str, Callable[[str], bool]]
+
+
+class MatrixConfig:
+    """A loaded tox config, for building matrices from"""
+
+    def __init__(self, config: "tox.config.Config"):
+        self.config = config
+
+    @property
+    def envlist(self) -> List[str]:
+        """The envnames tox would run (before any filters)"""
+        return list(self.config.envlist)
+
+    def build_matrix(
+        self,
+        filters: Optional[Iterable[Filter]] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> List[Dict]:
+        """
+        Return the matrix items for envs that match any of filters
+        (or for all envs, if no filters are given).
+
+        fields selects the items' fields, like --gh-matrix-fields
+        (default: the loaded config's --gh-matrix-fields, if any).
+        """
+        from .plugin import tox_config_to_gh_matrix
+
+        selection = None
+        if fields is not None:
+            from .fields import parse_fields
+
+            selection = parse_fields(fields if isinstance(fields, str) else ",".join(fields))
+        return tox_config_to_gh_matrix(
+            self.config, env_filter=combine_filters(filters), fields=selection
+        )
+
+
+def load_config(
+    ini_path: Optional[str] = None, args: Sequence[str] = (), fast: bool = False
+) -> MatrixConfig:
+    """
+    Load the tox config at ini_path (a tox.ini or setup.cfg file, or directory
+    containing one; default: the current directory), for building matrices.
+
+    args are additional tox command line options, including any
+    --gh-matrix-* options that affect the matrix items (but not
+    --gh-matrix, --gh-matrix-dump or --gh-matrix-record).
+    If fast is True, uses --fast's partial read of the tox config.
+    """
+    from .__main__ import COMMAND_OPTIONS
+
+    ini_path = str(ini_path) if ini_path is not None else None
+    args = [str(arg) for arg in args]
+    commands = [arg for arg in args if arg.split("=", 1)[0] in COMMAND_OPTIONS]
+    if commands:
+        raise ValueError(f"load_config args can't include {', '.join(commands)}")
+
+    if fast:
+        from .__main__ import make_fast_parser
+        from .fast import parse_fast_config
+
+        parser = make_fast_parser()
+        option = parser.parse_args(args)
+        config = parse_fast_config(option, ini_path, parser.testenv_attributes)
+    else:
+        import tox.config
+
+        config = tox.config.parseconfig((["-c", ini_path] if ini_path else []) + args)
+    return MatrixConfig(config)
+
+
+def build_matrix(
+    ini_path: Optional[str] = None,
+    *,
+    filters: Optional[Iterable[Filter]] = None,
+    fields: Optional[Iterable[str]] = None,
+    args: Sequence[str] = (),
+    fast: bool = False,
+) -> List[Dict]:
+    """
+    Return the matrix items for the tox config at ini_path
+    (see load_config and MatrixConfig.build_matrix)
+    """
+    return load_config(ini_path, args=args, fast=fast).build_matrix(filters=filters, fields=fields)
+
+
+def combine_filters(filters: Optional[Iterable[Filter]]) -> Optional[Callable[[str], bool]]:
+    """Return an env filter matching any of filters, or None if there aren't any"""
+    if filters is None:
+        return None
+    if isinstance(filters, str):
+        filters = [filters]
+    from .filters import make_env_filter
+
+    env_filters = [make_env_filter(f) if isinstance(f, str) else f for f in filters]
+    if not env_filters:
+        return None
+
+    def env_filter(envname: str) -> bool:
+        return any(f(envname) for f in env_filters)
+
+    return env_filter
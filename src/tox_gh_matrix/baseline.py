@@ -0,0 +1,157 @@
+"""
+Skipping unchanged jobs, for --gh-matrix-baseline.
+
+Each matrix item gets a `fingerprint`: a hash of the item, its env's
+effective config, and the contents of the files that can affect it
+(the env's gh_matrix_paths, or else every file in the project that git
+tracks, plus setup and requirements files). A tox.ini file is
+covered by the env's effective config, so editing one env doesn't change
+the others. Items whose fingerprint is in a baseline matrix (e.g., the
+matrix saved by the last successful run) are left out of the outputs,
+and listed in a `skipped` output instead.
+
+The baseline is a JSON file: a matrix, a --gh-matrix-dump, or anything
+else containing matrix items (packed and compact matrices are fine).
+"""
+
+import functools
+import hashlib
+import json
+import os
+import pathlib
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import tox.config
+from tox import reporter as report
+from tox.exception import ConfigError
+
+from .cache_keys import env_cache_files, hash_file
+from .changes import ALL_ENVS_PATTERNS, git_project_paths, path_matches, walk_project
+from .dedup import env_fingerprint
+
+FINGERPRINT_FIELD = "fingerprint"
+FINGERPRINT_LENGTH = 20  # hex digits
+
+SKIPPED_OUTPUT = "skipped"
+
+# Item fields that don't change what its job does
+UNFINGERPRINTED_FIELDS = (
+    FINGERPRINT_FIELD,
+    "order",
+    "estimated_seconds",
+    "flaky_score",
+    "run_first",
+)
+
+
+@functools.lru_cache(maxsize=None)
+def project_files(root: str) -> Tuple[str, ...]:
+    """
+    Return the (sorted, posix) paths relative to root of the project's files:
+    the ones git tracks in a git checkout (so build output and other untracked
+    files don't count), or else all the files under root
+    """
+    paths = git_project_paths(root)
+    if paths is None:
+        paths = []
+        for dirpath, _dirnames, filenames in walk_project(root):
+            reldir = os.path.relpath(dirpath, root)
+            for name in filenames:
+                path = name if reldir == "." else os.path.join(reldir, name)
+                paths.append(path.replace(os.sep, "/"))
+    return tuple(sorted(paths))
+
+
+@functools.lru_cache(maxsize=None)
+def sources_digest(
+    root: str, patterns: Optional[Tuple[str, ...]] = None, exclude: Tuple[str, ...] = ()
+) -> str:
+    """
+    Return a hash of the paths and contents of the project files under root
+    matching patterns (globs, as in gh_matrix_paths), or all of them if None,
+    other than the paths in exclude
+    """
+    digest = hashlib.sha256()
+    for path in project_files(root):
+        if path in exclude:
+            continue
+        if patterns is None or any(path_matches(path, pattern) for pattern in patterns):
+            digest.update(f"{path}\0{hash_file(os.path.join(root, path))}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def clear_caches():
+    """
+    Forget the project files and contents seen so far. (The caches are only
+    good for a single build: in watch mode, or when the API builds matrices
+    repeatedly, files can change between builds.)
+    """
+    project_files.cache_clear()
+    sources_digest.cache_clear()
+    hash_file.cache_clear()
+
+
+def env_inputs_fingerprint(env: tox.config.TestenvConfig) -> str:
+    """Return a hash of env's effective config and the files that can affect it"""
+    toxinidir = str(env.config.toxinidir)
+    paths = getattr(env, "gh_matrix_paths", None)
+    patterns = tuple(paths) + ALL_ENVS_PATTERNS if paths else None
+    # A tox.ini only matters for its effective config (which other envs' changes
+    # don't affect). Other config files (setup.cfg, etc.) can also affect the package.
+    toxinipath = pathlib.Path(str(env.config.toxinipath))
+    exclude = (toxinipath.name,) if toxinipath.name == "tox.ini" else ()
+    data = {
+        "config": env_fingerprint(env, toxinidir=toxinidir),
+        "sources": sources_digest(toxinidir, patterns, exclude),
+        "files": {
+            os.path.relpath(path, toxinidir).replace(os.sep, "/"): hash_file(path)
+            for path in env_cache_files(env)
+        },
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def item_fingerprint(item: Dict, inputs: str) -> str:
+    """Return the fingerprint for a matrix item, whose env has inputs fingerprint"""
+    fields = {key: value for key, value in item.items() if key not in UNFINGERPRINTED_FIELDS}
+    data = json.dumps({"item": fields, "inputs": inputs}, sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:FINGERPRINT_LENGTH]
+
+
+def load_baseline(path: str) -> Set[str]:
+    """
+    Return the item fingerprints in the baseline JSON file at path
+    (an empty set, with a warning, if it doesn't exist)
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        report.warning(f"tox-gh-matrix: no baseline matrix {path!r} (nothing will be skipped)")
+        return set()
+    except (OSError, ValueError) as error:
+        raise ConfigError(f"--gh-matrix-baseline can't read {path!r}: {error}")
+    return set(iter_fingerprints(data))
+
+
+def iter_fingerprints(data: Any) -> Iterable[str]:
+    """Generate the item fingerprints anywhere in (JSON) data"""
+    if isinstance(data, dict):
+        fingerprint = data.get(FINGERPRINT_FIELD)
+        if isinstance(fingerprint, str):
+            yield fingerprint
+        values: Iterable = data.values()
+    elif isinstance(data, list):
+        values = data
+    else:
+        return
+    for value in values:
+        yield from iter_fingerprints(value)
+
+
+def split_baseline(matrix: Iterable[Dict], baseline: Set[str]) -> Tuple[List[Dict], List[Dict]]:
+    """Return the items in matrix that aren't in baseline, and the ones that are"""
+    changed, skipped = [], []
+    for item in matrix:
+        (skipped if item.get(FINGERPRINT_FIELD) in baseline else changed).append(item)
+    return changed, skipped
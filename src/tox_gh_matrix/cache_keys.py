@@ -0,0 +1,109 @@
+import functools
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+import tox.config
+
+# Files in setupdir that determine how the package under test is installed
+SETUP_FILES = ("pyproject.toml", "setup.cfg", "setup.py")
+
+# pip options in deps that name a requirements or constraints file
+REQUIREMENTS_FILE_OPTIONS = ("-r", "--requirement", "-c", "--constraint")
+
+# Length of the hex digest in cache keys
+CACHE_KEY_DIGEST_LENGTH = 20
+
+
+def env_cache_key(env: tox.config.TestenvConfig, python_version: Optional[str] = None) -> str:
+    """
+    Return a key for caching env's virtualenv: the envname and a hash of
+    everything that determines what gets installed in it (python_version,
+    basepython, deps and the contents of any requirements files they
+    reference, install_command, and for envs that install the package,
+    extras and the contents of its setup files).
+    """
+    data = env_cache_data(env, python_version)
+    digest = hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+    return f"{env.envname}-{digest[:CACHE_KEY_DIGEST_LENGTH]}"
+
+
+def env_cache_data(env: tox.config.TestenvConfig, python_version: Optional[str]) -> Dict:
+    """Collect the (JSON-serializable) inputs to env's cache key"""
+    toxinidir = str(env.config.toxinidir)
+    deps = env_deps(env)
+    install_command = list(getattr(env, "install_command", None) or ())
+    data = {
+        "python": python_version,
+        "basepython": env.basepython,
+        # (Keys shouldn't depend on where the project is checked out.)
+        "deps": [relative_to_toxinidir(dep, toxinidir) for dep in deps],
+        "files": {
+            relative_to_toxinidir(path, toxinidir): hash_file(os.path.join(toxinidir, path))
+            for path in requirements_files(deps)
+        },
+        "install_command": [relative_to_toxinidir(arg, toxinidir) for arg in install_command],
+    }
+    if not getattr(env, "skip_install", False):
+        setupdir = str(getattr(env.config, "setupdir", toxinidir))
+        data["package"] = "develop" if getattr(env, "usedevelop", False) else "sdist"
+        data["extras"] = sorted(getattr(env, "extras", None) or ())
+        data["setup_files"] = {
+            name: hash_file(os.path.join(setupdir, name)) for name in SETUP_FILES
+        }
+    return data
+
+
+def env_cache_files(env: tox.config.TestenvConfig) -> List[str]:
+    """Return the paths of the files whose contents env's cache key depends on"""
+    toxinidir = str(env.config.toxinidir)
+    paths = [os.path.join(toxinidir, path) for path in requirements_files(env_deps(env))]
+    if not getattr(env, "skip_install", False):
+        setupdir = str(getattr(env.config, "setupdir", toxinidir))
+        paths.extend(os.path.join(setupdir, name) for name in SETUP_FILES)
+    return paths
+
+
+def env_deps(env: tox.config.TestenvConfig) -> List[str]:
+    """Return env's deps (as written, less any :indexserver: prefix)"""
+    return [getattr(dep, "name", str(dep)) for dep in getattr(env, "deps", None) or ()]
+
+
+def relative_to_toxinidir(value: str, toxinidir: str) -> str:
+    """Replace the toxinidir path in value with '{toxinidir}'"""
+    return value.replace(toxinidir, "{toxinidir}")
+
+
+def requirements_files(deps: List[str]) -> List[str]:
+    """Return the requirements and constraints files referenced in deps (as written)"""
+    paths = []
+    for dep in deps:
+        for option in REQUIREMENTS_FILE_OPTIONS:
+            # tox normalizes these to "-rfile" and "--requirement=file"
+            prefix = option if len(option) == 2 else f"{option}="
+            if dep.startswith(prefix):
+                paths.append(dep.replace(prefix, "", 1).strip())
+                break
+    return paths
+
+
+@functools.lru_cache(maxsize=None)
+def hash_file(path: str) -> Optional[str]:
+    """
+    Return the sha256 hex digest of path's contents, or None if it doesn't exist.
+    (Memoized: envs tend to share setup and requirements files.)
+    """
+    return file_digest(path)
+
+
+def file_digest(path: str) -> Optional[str]:
+    """Return the sha256 hex digest of path's contents, or None if it doesn't exist"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(65536), b""):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
@@ -0,0 +1,107 @@
+import fnmatch
+import os
+import subprocess
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import tox.config
+from tox import reporter as report
+
+# Changes to these files (relative to toxinidir) affect every env
+ALL_ENVS_PATTERNS = ("tox.ini", "setup.cfg", "setup.py", "pyproject.toml")
+
+# Directories that aren't project sources (as well as hidden ones and virtualenvs)
+SKIP_DIRS = {"__pycache__", "node_modules", "site-packages"}
+
+
+def walk_project(root: str) -> Iterator[Tuple[str, List[str], List[str]]]:
+    """
+    Like os.walk(root), but without descending into hidden dirs
+    (like .tox and .git), virtualenvs, or SKIP_DIRS (and in sorted order)
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            name
+            for name in dirnames
+            if not name.startswith(".")
+            and name not in SKIP_DIRS
+            and not os.path.exists(os.path.join(dirpath, name, "pyvenv.cfg"))
+        )
+        yield dirpath, dirnames, sorted(filenames)
+
+
+def git_changed_paths(repo_dir, ref: str) -> Optional[List[str]]:
+    """
+    Return the paths (relative to repo_dir) of files changed in
+    repo_dir since git ref, or None if git can't determine them.
+
+    ref can be anything `git diff` accepts, e.g. a branch or commit,
+    or 'origin/main...HEAD' for changes since the merge base.
+    """
+    try:
+        result = subprocess.run(
+            ["git", "diff", "--name-only", "--relative", "--no-renames", ref, "--"],
+            cwd=str(repo_dir),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError) as error:
+        stderr = getattr(error, "stderr", None) or str(error)
+        report.warning(f"tox-gh-matrix: can't get changes since {ref!r}: {stderr.strip()}")
+        return None
+    return [path for path in result.stdout.splitlines() if path]
+
+
+def git_project_paths(repo_dir) -> Optional[List[str]]:
+    """
+    Return the paths (relative to repo_dir) of the files under repo_dir
+    that git tracks, or None if repo_dir isn't in a git checkout
+    """
+    try:
+        result = subprocess.run(
+            ["git", "ls-files", "-z"],
+            cwd=str(repo_dir),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return [path for path in result.stdout.split("\0") if path]
+
+
+def path_matches(path: str, pattern: str) -> bool:
+    """
+    Return True if path matches glob pattern (where * also matches /),
+    or is in the directory pattern names
+    """
+    pattern = pattern.rstrip("/")
+    return fnmatch.fnmatchcase(path, pattern) or fnmatch.fnmatchcase(path, pattern + "/*")
+
+
+def filter_changed_envs(
+    envconfigs: List[tox.config.TestenvConfig],
+    changed_paths: Iterable[str],
+    all_envs_patterns: Sequence[str] = ALL_ENVS_PATTERNS,
+) -> List[tox.config.TestenvConfig]:
+    """
+    Return the envconfigs affected by changed_paths, according to each
+    env's gh_matrix_paths setting. Envs without gh_matrix_paths are always
+    affected, and changes to files matching all_envs_patterns
+    (e.g., the tox config) affect all envs.
+    """
+    changed_paths = list(changed_paths)
+    if any(path_matches(path, pattern) for path in changed_paths for pattern in all_envs_patterns):
+        return list(envconfigs)
+    return [
+        env
+        for env in envconfigs
+        if not getattr(env, "gh_matrix_paths", None)
+        or any(
+            path_matches(path, pattern)
+            for path in changed_paths
+            for pattern in env.gh_matrix_paths
+        )
+    ]
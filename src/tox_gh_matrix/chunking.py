@@ -0,0 +1,136 @@
+import json
+import math
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from tox import reporter as report
+from tox.exception import ConfigError
+
+from .durations import estimate_durations
+
+# GitHub's limits on a job's matrix, and on the size of an output parameter
+MAX_MATRIX_JOBS = 256
+MAX_OUTPUT_SIZE = 1_000_000  # bytes
+
+# The output listing the chunks of a chunked output
+CHUNK_INDEX_SUFFIX = "-chunks"
+
+
+def parse_chunk_count(value: str) -> Optional[int]:
+    """Parse a --gh-matrix-chunks value: a positive chunk count, or 'auto' (None)"""
+    if value == "auto":
+        return None
+    try:
+        chunks = int(value)
+    except ValueError:
+        chunks = 0
+    if chunks < 1:
+        raise ConfigError(f"--gh-matrix-chunks must be a positive number or 'auto', not {value!r}")
+    return chunks
+
+
+def chunk_gh_outputs(
+    matrices: Dict[Optional[str], List[Dict]],
+    chunks: Optional[int],
+    durations: Dict[str, float],
+    default_name: str = "envlist",
+) -> Dict[str, List]:
+    """
+    Split each matrix into chunks (see chunk_gh_matrix) named NAME-0, NAME-1, etc.,
+    and add a NAME-chunks index listing each chunk's name, number of jobs and
+    estimated_seconds. (A matrix named None uses default_name.)
+    """
+    outputs: Dict[str, List] = OrderedDict()
+    for name, matrix in matrices.items():
+        name = default_name if name is None else name
+        index = []
+        for number, chunk in enumerate(chunk_gh_matrix(matrix, chunks, durations)):
+            chunk_name = f"{name}-{number}"
+            outputs[chunk_name] = chunk
+            index.append(
+                {
+                    "name": chunk_name,
+                    "jobs": len(chunk),
+                    "estimated_seconds": round(sum(gh_item_costs(chunk, durations))),
+                }
+            )
+        outputs[f"{name}{CHUNK_INDEX_SUFFIX}"] = index
+    return outputs
+
+
+def chunk_gh_matrix(
+    matrix: List[Dict], chunks: Optional[int], durations: Dict[str, float]
+) -> List[List[Dict]]:
+    """
+    Split matrix into (at least) `chunks` matrices that are each within
+    GitHub's job count and output size limits, balancing their estimated
+    total durations. If chunks is None, uses the fewest chunks that fit.
+
+    Items keep their original relative order within each chunk.
+    """
+    if not matrix:
+        return []
+    costs = gh_item_costs(matrix, durations)
+    # (Each item also needs a separator in the JSON array.)
+    sizes = [len(json.dumps(item)) + 2 for item in matrix]
+    needed = max(
+        math.ceil(len(matrix) / MAX_MATRIX_JOBS), math.ceil((sum(sizes) + 2) / MAX_OUTPUT_SIZE)
+    )
+    if chunks is not None and chunks < needed:
+        report.warning(
+            f"tox-gh-matrix: using {needed} chunks (rather than {chunks}) to fit GitHub limits"
+        )
+    count = min(max(chunks or 1, needed), len(matrix))
+
+    # Assign each item (most costly first) to the least-loaded chunk with room for it.
+    loads = [0.0] * count
+    jobs = [0] * count
+    bytes_used = [2] * count
+    bins: List[List[int]] = [[] for _ in range(count)]
+    for i in sorted(range(len(matrix)), key=lambda i: -costs[i]):
+        fits = [
+            index
+            for index in range(len(bins))
+            if jobs[index] < MAX_MATRIX_JOBS and bytes_used[index] + sizes[i] <= MAX_OUTPUT_SIZE
+        ]
+        if not fits:
+            # (Possible when items vary widely in size.)
+            loads.append(0.0)
+            jobs.append(0)
+            bytes_used.append(2)
+            bins.append([])
+            fits = [len(bins) - 1]
+        index = min(fits, key=lambda index: (loads[index], index))
+        bins[index].append(i)
+        loads[index] += costs[i]
+        jobs[index] += 1
+        bytes_used[index] += sizes[i]
+
+    return [[matrix[i] for i in sorted(indexes)] for indexes in bins if indexes]
+
+
+def gh_item_costs(matrix: List[Dict], durations: Dict[str, float]) -> List[float]:
+    """
+    Return the estimated duration of each matrix item: its estimated_seconds
+    (e.g., from packing or ordering), else its env's estimated duration
+    (divided among its shards)
+    """
+    estimates = estimate_durations((item["name"] for item in matrix), durations)
+    costs = []
+    for item in matrix:
+        if "estimated_seconds" in item:
+            costs.append(float(item["estimated_seconds"]))
+        else:
+            shards = item["shard"]["total"] if "shard" in item else 1
+            costs.append(estimates[item["name"]] / shards)
+    return costs
+
+
+def check_gh_output_limits(name: str, jobs: int, size: int):
+    """Warn if a matrix output (with jobs items, and size bytes) exceeds GitHub's limits"""
+    if jobs > MAX_MATRIX_JOBS or size > MAX_OUTPUT_SIZE:
+        report.warning(
+            f"tox-gh-matrix: output {name!r} ({jobs} jobs, {size} bytes) exceeds GitHub's"
+            f" limits ({MAX_MATRIX_JOBS} jobs, {MAX_OUTPUT_SIZE} bytes);"
+            f" consider --gh-matrix-chunks"
+        )
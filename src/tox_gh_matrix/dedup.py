@@ -0,0 +1,114 @@
+"""
+Config-equivalence deduplication, for --gh-matrix-dedup.
+
+Factor products often produce envs whose effective config is identical
+(same basepython, deps, commands, setenv, ...), differing only by a factor
+that doesn't affect anything on that axis. Such envs would all run exactly
+the same way, so only the first of them needs a matrix job, and the rest
+are listed in its `aliases`.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import tox.config
+
+from .cache_keys import env_deps
+
+# TestenvConfig settings that affect how an env runs.
+# (Not its envdir, envlogdir, etc., which are named for each env.)
+FINGERPRINT_ATTRIBUTES = (
+    "basepython",
+    "deps",
+    "commands_pre",
+    "commands",
+    "commands_post",
+    "setenv",
+    "changedir",
+    "passenv",
+    "allowlist_externals",
+    "whitelist_externals",
+    "extras",
+    "usedevelop",
+    "skip_install",
+    "install_command",
+    "list_dependencies_command",
+    "sitepackages",
+    "alwayscopy",
+    "pip_pre",
+    "download",
+    "platform",
+    "recreate",
+    "ignore_errors",
+    "ignore_outcome",
+    "args_are_paths",
+    "depends",
+)
+
+# setenv variables tox sets for each env (or, for the hash seed, randomly each run)
+PER_ENV_SETENV = ("TOX_ENV_NAME", "PYTHONHASHSEED")
+
+
+def env_fingerprint(env: tox.config.TestenvConfig, toxinidir: Optional[str] = None) -> str:
+    """
+    Return a hash of env's effective config (the same for equivalent envs).
+    If toxinidir is given, paths in it are hashed relative to it.
+    """
+    envdir = str(env.envdir)
+    data = {}
+    for name in FINGERPRINT_ATTRIBUTES + tuple(
+        name for name in sorted(vars(env)) if name.startswith("gh_matrix_")
+    ):
+        if name == "deps":
+            value: Any = env_deps(env)
+        elif name == "setenv":
+            setenv = getattr(env, "setenv", None) or {}
+            value = {key: setenv[key] for key in setenv.keys() if key not in PER_ENV_SETENV}
+        else:
+            value = getattr(env, name, None)
+        data[name] = normalize(value, envdir, toxinidir)
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def normalize(value: Any, envdir: str, toxinidir: Optional[str] = None) -> Any:
+    """
+    Convert value to JSON-serializable data, without env-specific paths
+    (or paths in toxinidir, if given)
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, dict):
+        return {str(key): normalize(item, envdir, toxinidir) for key, item in value.items()}
+    if isinstance(value, (set, frozenset)):
+        return sorted(normalize(item, envdir, toxinidir) for item in value)
+    if isinstance(value, (list, tuple)):
+        return [normalize(item, envdir, toxinidir) for item in value]
+    text = str(value).replace(envdir, "{envdir}")
+    return text.replace(toxinidir, "{toxinidir}") if toxinidir else text
+
+
+def dedup_envconfigs(
+    envconfigs: Iterable[tox.config.TestenvConfig],
+    group_key: Optional[Callable[[tox.config.TestenvConfig], Any]] = None,
+) -> Tuple[List[tox.config.TestenvConfig], Dict[str, List[str]]]:
+    """
+    Return the first of each group of equivalent envconfigs (in order),
+    and envname --> the names of the other envs in its group (for groups
+    with more than one env). If group_key is given, envs are only
+    equivalent if it also returns the same (JSON-serializable) value for them.
+    """
+    groups: Dict[str, List[tox.config.TestenvConfig]] = OrderedDict()
+    for env in envconfigs:
+        key = env_fingerprint(env)
+        if group_key is not None:
+            key += json.dumps(group_key(env))
+        groups.setdefault(key, []).append(env)
+    unique = [envs[0] for envs in groups.values()]
+    aliases = {
+        envs[0].envname: [env.envname for env in envs[1:]]
+        for envs in groups.values()
+        if len(envs) > 1
+    }
+    return unique, aliases
@@ -0,0 +1,110 @@
+import json
+import pathlib
+import statistics
+import xml.etree.ElementTree as ElementTree
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from tox.exception import ConfigError
+
+# Estimated duration for envs with no timing data, when there's
+# no other timing data to extrapolate from.
+DEFAULT_DURATION = 60.0
+
+# tox.ini commonly uses `pytest --junitxml {toxworkdir}/junit.{envname}.xml`
+JUNIT_PREFIX = "junit."
+JUNIT_SUFFIX = ".xml"
+
+# The run history store (see tox_gh_matrix.history)
+HISTORY_SUFFIX = ".jsonl"
+
+
+def load_durations(paths: Iterable[str]) -> Dict[str, float]:
+    """
+    Load per-env durations (in seconds) from timing files.
+
+    Each path can be a JSON file with an object mapping envname
+    to seconds, a junit XML file named junit.{envname}.xml,
+    a directory (searched recursively) containing junit XML files,
+    or a .jsonl run history store (using each env's median time).
+    If there are multiple timings for an env, they are averaged.
+    """
+    timings: Dict[str, List[float]] = defaultdict(list)
+    for path in paths:
+        path = pathlib.Path(path)
+        if path.is_dir():
+            for junit_path in sorted(path.rglob(f"{JUNIT_PREFIX}*{JUNIT_SUFFIX}")):
+                add_junit_timing(timings, junit_path)
+        elif path.suffix == JUNIT_SUFFIX:
+            add_junit_timing(timings, path)
+        elif path.suffix == HISTORY_SUFFIX:
+            # (Import here to avoid a circular import.)
+            from .history import history_stats, load_history
+
+            for envname, stats in history_stats(load_history(path)).items():
+                timings[envname].append(stats["p50"])
+        else:
+            for envname, seconds in read_json_timings(path).items():
+                timings[envname].append(seconds)
+    return {envname: statistics.mean(values) for envname, values in timings.items()}
+
+
+def read_json_timings(path: pathlib.Path) -> Dict[str, float]:
+    """Read a JSON {envname: seconds} timings file"""
+    try:
+        with path.open(encoding="utf-8") as f:
+            data = json.load(f)
+        return {str(envname): float(seconds) for envname, seconds in data.items()}
+    except (OSError, ValueError, TypeError, AttributeError) as error:
+        raise ConfigError(f"Invalid tox-gh-matrix timings file {str(path)!r}: {error}")
+
+
+def add_junit_timing(timings: Dict[str, List[float]], path: pathlib.Path):
+    envname = junit_path_to_envname(path)
+    seconds = read_junit_duration(path)
+    if envname and seconds is not None:
+        timings[envname].append(seconds)
+
+
+def junit_path_to_envname(path: pathlib.Path) -> str:
+    """Return the envname from a junit.{envname}.xml path"""
+    name = path.name
+    if name.startswith(JUNIT_PREFIX) and name.endswith(JUNIT_SUFFIX):
+        return name[: -len(JUNIT_SUFFIX)].partition(JUNIT_PREFIX)[2]
+    return path.stem
+
+
+def read_junit_duration(path: pathlib.Path) -> Optional[float]:
+    """Return the total test time recorded in a junit XML file, or None if unreadable"""
+    summary = read_junit_summary(path)
+    return summary[0] if summary else None
+
+
+def read_junit_summary(path: pathlib.Path) -> Optional[Tuple[float, int]]:
+    """
+    Return (total seconds, number of failures and errors)
+    from a junit XML file, or None if unreadable
+    """
+    try:
+        root = ElementTree.parse(str(path)).getroot()
+        # Root is either a single <testsuite> or <testsuites> containing them.
+        suites = [root] if root.tag == "testsuite" else root.findall("testsuite")
+        if root.tag == "testsuites" and root.get("time") is not None:
+            seconds = float(root.get("time"))
+        else:
+            seconds = sum(float(suite.get("time", 0)) for suite in suites)
+        problems = sum(
+            int(suite.get("failures", 0)) + int(suite.get("errors", 0)) for suite in suites
+        )
+    except (OSError, ElementTree.ParseError, ValueError):
+        return None
+    return seconds, problems
+
+
+def estimate_durations(envnames: Iterable[str], durations: Dict[str, float]) -> Dict[str, float]:
+    """
+    Return estimated durations for envnames: the known duration where
+    available, else the median of the known durations (or DEFAULT_DURATION).
+    """
+    default = statistics.median(durations.values()) if durations else DEFAULT_DURATION
+    return {envname: durations.get(envname, default) for envname in envnames}
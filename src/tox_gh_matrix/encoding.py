@@ -0,0 +1,100 @@
+"""
+Compact matrix encoding.
+
+Rather than a list of matrix items, the compact encoding is an object:
+
+    {"envs": [{"name": "py38-django32", "python": "3.8"}, ...],
+     "python": {"3.8": {"version": "3.8", "spec": "3.8.0-alpha - 3.8"}, ...}}
+
+Each item in `envs` omits `factors` (which is just the name split on "-"),
+and replaces its `python` object with its python.version, which is a key
+into the shared `python` table. Everything else is unchanged, so `envs`
+still works as a workflow matrix (`fromJSON(output).envs`), and the full
+python object for an item is `fromJSON(output).python[matrix.tox.python]`.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List
+
+from .packing import unique
+
+# json.dumps separators without any whitespace
+COMPACT_SEPARATORS = (",", ":")
+
+
+def encode_compact_matrix(matrix: Iterable[Dict]) -> Dict:
+    """
+    Return the compact encoding of matrix. (If matrix is an iterator,
+    the returned `envs` is also an iterator, and the `python` table
+    is only complete once `envs` has been consumed.)
+    """
+    pythons: Dict[str, Dict] = OrderedDict()
+    return OrderedDict([("envs", encode_compact_items(matrix, pythons)), ("python", pythons)])
+
+
+def encode_compact_items(matrix: Iterable[Dict], pythons: Dict[str, Dict]) -> Iterator[Dict]:
+    """Generate compact matrix items, adding their python objects to pythons"""
+    for item in matrix:
+        encoded = OrderedDict((key, value) for key, value in item.items() if key != "factors")
+        if "python" in item:
+            version = item["python"]["version"]
+            pythons.setdefault(version, item["python"])
+            encoded["python"] = version
+        if "envs" in item:
+            # A packed item (whose envs share the same python table)
+            encoded["envs"] = list(encode_compact_items(item["envs"], pythons))
+        yield encoded
+
+
+def decode_compact_matrix(data: Dict) -> List[Dict]:
+    """
+    Return the matrix items from a compact encoding
+    (raises ValueError if it isn't valid)
+    """
+    validate_compact_matrix(data)
+    return [decode_compact_item(item, data["python"]) for item in data["envs"]]
+
+
+def decode_compact_item(item: Dict, pythons: Dict[str, Dict]) -> Dict:
+    envnames = item["name"].split(",")
+    decoded = OrderedDict(
+        [
+            ("name", item["name"]),
+            ("factors", unique(f for envname in envnames for f in envname.split("-"))),
+        ]
+    )
+    decoded.update(item)
+    if "python" in item:
+        decoded["python"] = pythons[item["python"]]
+    if "envs" in item:
+        decoded["envs"] = [decode_compact_item(env, pythons) for env in item["envs"]]
+    return decoded
+
+
+def validate_compact_matrix(data: Dict):
+    """Raise ValueError if data isn't a valid compact matrix encoding"""
+    if not isinstance(data, dict) or set(data) != {"envs", "python"}:
+        raise ValueError("Compact matrix must be an object with 'envs' and 'python'")
+    pythons = data["python"]
+    if not isinstance(pythons, dict):
+        raise ValueError("Compact matrix 'python' must be an object")
+    for version, python in pythons.items():
+        if not isinstance(python, dict) or python.get("version") != version:
+            raise ValueError(f"Compact matrix python {version!r} must have version {version!r}")
+    if not isinstance(data["envs"], list):
+        raise ValueError("Compact matrix 'envs' must be a list")
+    for item in data["envs"]:
+        validate_compact_item(item, pythons)
+
+
+def validate_compact_item(item, pythons: Dict[str, Dict]):
+    if not isinstance(item, dict) or not isinstance(item.get("name"), str) or not item["name"]:
+        raise ValueError(f"Compact matrix item {item!r} must be an object with a name")
+    if "factors" in item:
+        raise ValueError(f"Compact matrix item {item['name']!r} must not have factors")
+    if "python" in item and (not isinstance(item["python"], str) or item["python"] not in pythons):
+        raise ValueError(
+            f"Compact matrix item {item['name']!r} has unknown python {item['python']!r}"
+        )
+    for env in item.get("envs", ()):
+        validate_compact_item(env, pythons)
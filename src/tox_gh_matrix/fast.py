@@ -0,0 +1,324 @@
+"""
+A fast path for generating the matrix without tox's full config parsing.
+
+tox constructs a complete TestenvConfig for every env (resolving deps,
+setenv, commands, and all their substitutions) before plugins get a
+chance to run. The matrix only needs a few of those settings, so this
+module reads just those, with tox's own SectionReader (to get identical
+factor-conditional and substitution handling), and provides lightweight
+stand-ins for tox's Config and TestenvConfig that work with
+tox_config_to_gh_matrix.
+"""
+
+import argparse
+import itertools
+import os
+import re
+import sys
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+
+import py
+import tox
+from tox.config import (
+    DepConfig,
+    DepOption,
+    SectionReader,
+    VenvAttribute,
+    get_homedir,
+    get_plugin_manager,
+    testenvprefix,
+)
+from tox.exception import ConfigError
+from tox.interpreters import Interpreters
+
+# Factor-conditional setting lines: "py38,py39: value"
+FACTOR_LINE_RE = re.compile(r"^([\w{}.!,-]+):\s+", re.MULTILINE)
+# Brace groups in envlist entries: "py{38,39}"
+ENVSTR_GROUP_RE = re.compile(r"{([^}]+)}")
+WHITESPACE_RE = re.compile(r"\s+")
+# Like tox.config.DepOption: ":indexserver: dep"
+INDEXSERVER_DEP_RE = re.compile(r":\w+:\s*(\S+)")
+
+
+class FastParser:
+    """
+    Just enough of tox.config.Parser for tox_addoption: collects
+    command line options in an argparse parser, and tracks the
+    testenv attributes plugins have added.
+    """
+
+    def __init__(self, prog: Optional[str] = None):
+        self.argparser = argparse.ArgumentParser(prog=prog)
+        self.testenv_attributes: List[VenvAttribute] = []
+
+    def add_argument(self, *args, **kwargs):
+        return self.argparser.add_argument(*args, **kwargs)
+
+    def add_testenv_attribute(self, name, type, help, default=None, postprocess=None):
+        self.testenv_attributes.append(VenvAttribute(name, type, default, help, postprocess))
+
+    def parse_args(self, args: List[str]) -> argparse.Namespace:
+        return self.argparser.parse_args(args)
+
+
+class FastConfig:
+    """Just enough of tox.config.Config for tox_config_to_gh_matrix"""
+
+    def __init__(self, option: argparse.Namespace, toxinipath: py.path.local):
+        self.option = option
+        self.toxinipath = toxinipath
+        self.toxinidir = toxinipath.dirpath()
+        self.setupdir = self.toxinidir
+        self.envlist: List[str] = []
+        self.envconfigs: Dict[str, FastTestenvConfig] = OrderedDict()
+        self.interpreters = Interpreters(hook=get_plugin_manager().hook)
+
+
+class FastTestenvConfig:
+    """Just enough of tox.config.TestenvConfig for tox_testenv_to_gh_config"""
+
+    def __init__(
+        self,
+        envname: str,
+        config: FastConfig,
+        reader: SectionReader,
+        testenv_attributes: Iterable[VenvAttribute] = (),
+    ):
+        self.envname = envname
+        self.config = config
+        self.factors = set(envname.split("-"))
+        self.basepython = get_basepython(self, reader)
+        self.ignore_outcome = reader.getbool("ignore_outcome", False)
+        self.depends = tuple(expand_envlist(reader.getstring("depends", replace=False)))
+        self.platform = reader.getstring("platform", ".*")
+        # (Settings that determine the cache_key.)
+        self.deps = read_deps(self, reader)
+        self.extras = reader.getlist("extras", sep="\n")
+        self.install_command = reader.getargv_install_command(
+            "install_command", tox.config.InstallcmdOption.default
+        )
+        self.skip_install = reader.getbool("skip_install", False)
+        self.usedevelop = reader.getbool("usedevelop", False)
+        for attribute in testenv_attributes:
+            setattr(self, attribute.name, read_testenv_attribute(self, reader, attribute))
+
+    @property
+    def python_info(self):
+        return self.config.interpreters.get_info(envconfig=self)
+
+
+def parse_fast_config(
+    option: argparse.Namespace,
+    inipath: Optional[str] = None,
+    testenv_attributes: Iterable[VenvAttribute] = (),
+) -> FastConfig:
+    """
+    Load the settings tox-gh-matrix needs from a tox.ini (or setup.cfg) file.
+
+    inipath can be a file or a directory containing one
+    (default: the current directory). option must provide
+    the tox options tox-gh-matrix uses (env, discover, etc.).
+    testenv_attributes are additional per-env settings to read
+    (e.g., from FastParser.testenv_attributes).
+    """
+    toxinipath = find_config_file(inipath)
+    cfg = py.iniconfig.IniConfig(toxinipath)
+    tox.config.ParseIni.expand_section_names(cfg)
+    config = FastConfig(option, toxinipath)
+
+    if toxinipath.basename == "setup.cfg":
+        reader = SectionReader("tox", cfg, prefix="tox")
+    else:
+        reader = SectionReader("tox", cfg)
+    reader.addsubstitutions(toxinidir=config.toxinidir, homedir=get_homedir())
+    config.toxworkdir = reader.getpath("toxworkdir", "{toxinidir}/.tox")
+    reader.addsubstitutions(toxworkdir=config.toxworkdir)
+    config.setupdir = reader.getpath("setupdir", "{toxinidir}")
+    config.ignore_basepython_conflict = reader.getbool("ignore_basepython_conflict", False)
+    isolated_build = reader.getbool("isolated_build", False)
+    package_env = reader.getstring("isolated_build_env", ".package") if isolated_build else None
+
+    stated_envlist = reader.getstring("envlist", replace=False)
+    config.envlist = select_envlist(cfg, option, stated_envlist, package_env)
+
+    known_factors = list_section_factors(cfg, "testenv")
+    known_factors.update({"py", "python"})
+    for env in expand_envlist(stated_envlist):
+        known_factors.update(env.split("-"))
+
+    for name in config.envlist:
+        if name in config.envconfigs:
+            continue
+        section = f"{testenvprefix}{name}"
+        factors = set(name.split("-"))
+        if (
+            section in cfg
+            or factors <= known_factors
+            or all(tox.PYTHON.PY_FACTORS_RE.match(factor) for factor in factors - known_factors)
+        ):
+            env_reader = SectionReader(section, cfg, fallbacksections=["testenv"], factors=factors)
+            env_reader.addsubstitutions(envname=name, **reader._subs)
+            config.envconfigs[name] = FastTestenvConfig(
+                name, config, env_reader, testenv_attributes
+            )
+    return config
+
+
+def find_config_file(inipath: Optional[str] = None) -> py.path.local:
+    """Locate the tox config file: inipath itself, or tox.ini or setup.cfg in a directory"""
+    path = py.path.local(inipath or os.curdir)
+    if path.check(file=True):
+        return path
+    for basename in ("tox.ini", "setup.cfg"):
+        candidate = path.join(basename)
+        if candidate.check(file=True):
+            if basename == "setup.cfg" and "tox:tox" not in py.iniconfig.IniConfig(candidate):
+                continue
+            return candidate
+    raise ConfigError(f"tox-gh-matrix --fast found no tox.ini or setup.cfg in {path}")
+
+
+def select_envlist(
+    cfg: py.iniconfig.IniConfig,
+    option: argparse.Namespace,
+    stated_envlist: Optional[str],
+    package_env: Optional[str],
+) -> List[str]:
+    """
+    Determine the envlist the same way tox would: from -e, TOXENV,
+    or the config envlist (handling "ALL", and defaulting to all envs).
+    """
+    from_option = option.env  # list (from action="append") or None
+    from_environ = os.environ.get("TOXENV")
+    if from_option:
+        requested = expand_envlist(",".join(from_option))
+    elif from_environ:
+        requested = expand_envlist(from_environ)
+    else:
+        requested = expand_envlist(stated_envlist)
+
+    def all_envs() -> List[str]:
+        envs = OrderedDict.fromkeys(expand_envlist(stated_envlist))
+        envs.update((env, None) for env in requested if env != "ALL")
+        # (Sections generated by expand_section_names have no line number.)
+        for section in sorted(cfg.sections, key=lambda name: cfg.lineof(name) or 0):
+            if section.startswith(testenvprefix):
+                section_env = section.replace(testenvprefix, "", 1)
+                if section_env != package_env:
+                    envs[section_env] = None
+        return list(envs) or ["python"]
+
+    if not requested or "ALL" in requested:
+        return all_envs()
+    return requested
+
+
+def expand_envlist(envlist: Optional[str]) -> List[str]:
+    """
+    Expand a tox envlist string to a list of envnames.
+
+    Handles comma and newline separators, comments, and brace groups:
+    >>> expand_envlist("py{38,39}-django{32,40}, docs  # comment")
+    ['py38-django32', 'py38-django40', 'py39-django32', 'py39-django40', 'docs']
+    """
+    if not envlist:
+        return []
+    lines = (line.split("#", 1)[0].strip() for line in envlist.splitlines())
+    envlist = ",".join(line for line in lines if line)
+    return [name for entry in split_outside_braces(envlist) for name in expand_braces(entry)]
+
+
+def split_outside_braces(envlist: str) -> List[str]:
+    """Split envlist on commas that aren't inside {brace groups}"""
+    entries = []
+    current = []
+    depth = 0
+    for char in envlist:
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+        elif char == "," and depth == 0:
+            entries.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    entries.append("".join(current))
+    return [entry.strip() for entry in entries if entry.strip()]
+
+
+def expand_braces(entry: str) -> List[str]:
+    """Expand the product of all {a,b} groups in a single envlist entry"""
+    # re.split with a capture group alternates literal, group, literal, ...
+    tokens = ENVSTR_GROUP_RE.split(entry)
+    parts = [WHITESPACE_RE.sub("", token).split(",") for token in tokens]
+    return ["".join(variant) for variant in itertools.product(*parts)]
+
+
+def list_section_factors(cfg: py.iniconfig.IniConfig, section: str) -> Set[str]:
+    """Return the factors used in factor-conditional settings in section"""
+    factors = set()
+    if section in cfg:
+        for _, value in cfg[section].items():
+            for expr in FACTOR_LINE_RE.findall(value):
+                for env in expand_envlist(expr):
+                    factors.update(factor.lstrip("!") for factor in env.split("-"))
+    return factors
+
+
+def read_deps(env: FastTestenvConfig, reader: SectionReader) -> List[DepConfig]:
+    """Read env's deps, like tox.config.DepOption (but ignoring indexservers)"""
+    lines = []
+    for line in reader.getlist("deps"):
+        match = INDEXSERVER_DEP_RE.match(line)
+        lines.append(match.group(1) if match else line)
+    return DepOption().postprocess(testenv_config=env, value=lines)
+
+
+def read_testenv_attribute(
+    env: FastTestenvConfig, reader: SectionReader, attribute: VenvAttribute
+):
+    """Read a plugin-defined testenv attribute, like tox.config.ParseIni.make_envconfig"""
+    atype = attribute.type
+    if atype == "string":
+        value = reader.getstring(attribute.name, attribute.default)
+    elif atype == "bool":
+        value = reader.getbool(attribute.name, attribute.default)
+    elif atype == "line-list":
+        value = reader.getlist(attribute.name, sep="\n")
+    elif atype == "space-separated-list":
+        value = reader.getlist(attribute.name, sep=" ")
+    elif atype == "env-list":
+        value = tuple(expand_envlist(reader.getstring(attribute.name, replace=False)))
+    else:
+        raise ConfigError(
+            f"tox-gh-matrix --fast doesn't support {atype!r} setting {attribute.name}"
+        )
+    if attribute.postprocess:
+        value = attribute.postprocess(testenv_config=env, value=value)
+    return value
+
+
+def get_basepython(env: FastTestenvConfig, reader: SectionReader) -> str:
+    """
+    Determine env's basepython (either set explicitly or implied by
+    a py* factor), following tox.config's basepython_default.
+    """
+    implied_python = None
+    for factor in env.factors:
+        match = tox.PYTHON.PY_FACTORS_RE.match(factor)
+        if match:
+            base_exe = {"py": "python"}.get(match.group(1), match.group(1))
+            version_s = match.group(2) or ""
+            if len(version_s) > 1:
+                version_s = f"{version_s[0]}.{version_s[1:]}"
+            implied_python = f"{base_exe}{version_s}"
+            break
+
+    if env.config.ignore_basepython_conflict and implied_python is not None:
+        return implied_python
+    value = reader.getstring("basepython", None)
+    if value is None:
+        return implied_python or sys.executable
+    return str(value)
@@ -0,0 +1,148 @@
+"""
+Matrix item fields, for --gh-matrix-fields.
+
+Each top-level field of a matrix item has a provider, which is only
+called if that field is selected. So fields nobody asks for cost nothing:
+e.g., with --gh-matrix-fields=name,factors tox never has to find
+(or probe) any Python interpreters.
+
+A provider is called as provider(env, subfields, python_info), where
+subfields is the set of selected subfields (e.g., {"spec"} for python.spec),
+or None for the whole field. It returns the field's value, or None to
+leave the field out of the item.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+import tox.config
+from tox.exception import ConfigError
+
+from .cache_keys import env_cache_key
+from .interpreters import PythonInfo
+from .version_utils import basepython_to_gh_python_version, gh_python_config
+
+FieldProvider = Callable[[tox.config.TestenvConfig, Optional[Set[str]], Optional[PythonInfo]], Any]
+
+# field --> selected subfields (or None for all of them), in FIELD_PROVIDERS order
+FieldSelection = Dict[str, Optional[Set[str]]]
+
+
+def get_basepython(env: tox.config.TestenvConfig) -> str:
+    try:
+        return env.basepython
+    except AttributeError:  # pragma: no cover
+        raise ConfigError(
+            "tox-gh-matrix is not compatible with this version of tox"
+            " (missing TestenvConfig.basepython)"
+        )
+
+
+def name_field(env, subfields, python_info) -> str:
+    return env.envname
+
+
+def factors_field(env, subfields, python_info) -> list:
+    # Converting set env.factors to a list doesn't result
+    # in consistent ordering, so just re-split the envname.
+    return env.envname.split("-")
+
+
+def python_field(env, subfields, python_info) -> Optional[Dict[str, str]]:
+    basepython = get_basepython(env)
+    if not basepython_to_gh_python_version(basepython):
+        return None
+    if needs_python_info({"python": subfields}):
+        if python_info is None:
+            python_info = env.python_info
+    else:
+        python_info = None
+    python = gh_python_config(basepython, python_info)
+    if subfields is not None:
+        python = {key: value for key, value in python.items() if key in subfields}
+    return python or None
+
+
+def ignore_outcome_field(env, subfields, python_info) -> Optional[bool]:
+    return env.ignore_outcome or None
+
+
+def cache_key_field(env, subfields, python_info) -> str:
+    python_version = basepython_to_gh_python_version(get_basepython(env)) or ""
+    return env_cache_key(env, python_version=python_version)
+
+
+FIELD_PROVIDERS: Dict[str, FieldProvider] = OrderedDict(
+    [
+        ("name", name_field),
+        ("factors", factors_field),
+        ("python", python_field),
+        ("ignore_outcome", ignore_outcome_field),
+        ("cache_key", cache_key_field),
+    ]
+)
+
+# field --> its allowed subfields
+SUBFIELDS: Dict[str, Set[str]] = {"python": {"version", "spec", "installed"}}
+
+# The fields in an item if --gh-matrix-fields isn't used
+DEFAULT_FIELDS = ["name", "factors", "python", "ignore_outcome"]
+
+
+def default_fields(cache_key: bool = False) -> FieldSelection:
+    return select_fields(DEFAULT_FIELDS + (["cache_key"] if cache_key else []))
+
+
+def parse_fields(spec: str) -> FieldSelection:
+    """Parse a --gh-matrix-fields spec: comma-separated fields and field.subfields"""
+    return select_fields(field.strip() for field in spec.split(",") if field.strip())
+
+
+def select_fields(fields: Iterable[str]) -> FieldSelection:
+    """
+    Return the FieldSelection for fields (each a field or field.subfield).
+    The name field is always selected (matrix processing needs it).
+    """
+    selected: Dict[str, Optional[Set[str]]] = {"name": None}
+    for field in fields:
+        name, _, subfield = field.partition(".")
+        if name not in FIELD_PROVIDERS:
+            raise ConfigError(
+                f"Unknown matrix field {field!r} (choices: {', '.join(FIELD_PROVIDERS)})"
+            )
+        if subfield:
+            allowed = SUBFIELDS.get(name, set())
+            if subfield not in allowed:
+                raise ConfigError(
+                    f"Unknown matrix field {field!r}"
+                    + (f" (choices: {', '.join(sorted(allowed))})" if allowed else "")
+                )
+            if name not in selected:
+                selected[name] = set()
+            if selected[name] is not None:
+                selected[name].add(subfield)
+        else:
+            selected[name] = None
+    return OrderedDict((name, selected[name]) for name in FIELD_PROVIDERS if name in selected)
+
+
+def needs_python_info(fields: FieldSelection) -> bool:
+    """Whether fields include anything that requires probing interpreters"""
+    if "python" not in fields:
+        return False
+    subfields = fields["python"]
+    return subfields is None or "installed" in subfields
+
+
+def testenv_fields(
+    env: tox.config.TestenvConfig,
+    fields: FieldSelection,
+    python_info: Optional[PythonInfo] = None,
+) -> Dict:
+    """Construct a matrix item with the selected fields for env"""
+    item = {}
+    for name, subfields in fields.items():
+        value = FIELD_PROVIDERS[name](env, subfields, python_info)
+        if value is not None:
+            item[name] = value
+    return item
@@ -0,0 +1,81 @@
+import re
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from tox.exception import ConfigError
+
+from .fast import expand_envlist
+
+EnvFilter = Callable[[str], bool]
+
+# Prefix that marks a --gh-matrix filter as a regular expression
+REGEX_FILTER_PREFIX = "re:"
+
+
+def parse_gh_matrix_spec(spec: str) -> Tuple[str, Optional[EnvFilter]]:
+    """
+    Parse a --gh-matrix `VAR` or `VAR=FILTER` spec into the output
+    name and an envname filter function (None if no FILTER).
+    """
+    name, sep, filter_spec = spec.partition("=")
+    name = name.strip()
+    if not name:
+        raise ConfigError(f"--gh-matrix {spec!r} is missing an output name")
+    if not sep:
+        return name, None
+    return name, make_env_filter(filter_spec)
+
+
+def parse_gh_matrix_specs(specs: Iterable[str]) -> Dict[str, Optional[EnvFilter]]:
+    """
+    Parse --gh-matrix specs into output name --> envname filter (None if no FILTER),
+    in order. Raises ConfigError if an output name is repeated.
+    """
+    filters: Dict[str, Optional[EnvFilter]] = OrderedDict()
+    for spec in specs:
+        name, env_filter = parse_gh_matrix_spec(spec)
+        if name in filters:
+            raise ConfigError(f"--gh-matrix output {name!r} is repeated (use one FILTER for it)")
+        filters[name] = env_filter
+    return filters
+
+
+def make_env_filter(filter_spec: str) -> EnvFilter:
+    """
+    Return a function that tests whether an envname matches filter_spec.
+
+    A filter_spec starting with "re:" is a Python regular expression
+    that must match the start of the envname (like TOX_SKIP_ENV).
+    Otherwise, filter_spec uses tox's factor-conditional syntax:
+    comma-separated alternatives, each a dash-separated list of factors
+    that must all be present (or absent, if prefixed with "!"):
+
+    >>> env_filter = make_env_filter("mac,py39-!win")
+    >>> [env_filter(env) for env in ("py38-mac", "py39-linux", "py39-win")]
+    [True, True, False]
+    """
+    if filter_spec.startswith(REGEX_FILTER_PREFIX):
+        _, _, pattern = filter_spec.partition(REGEX_FILTER_PREFIX)
+        try:
+            regex = re.compile(pattern)
+        except re.error as error:
+            raise ConfigError(f"Invalid --gh-matrix filter {filter_spec!r}: {error}")
+        return lambda envname: regex.match(envname) is not None
+
+    alternatives = []
+    # (expand_envlist handles commas and any {brace,groups})
+    for expr in expand_envlist(filter_spec):
+        factors = expr.split("-")
+        included = {factor for factor in factors if not factor.startswith("!")}
+        excluded = {factor[1:] for factor in factors if factor.startswith("!")}
+        alternatives.append((included, excluded))
+    if not alternatives:
+        raise ConfigError(f"Invalid --gh-matrix filter {filter_spec!r}: no factors")
+
+    def env_filter(envname: str) -> bool:
+        factors = set(envname.split("-"))
+        return any(
+            included <= factors and not (excluded & factors) for included, excluded in alternatives
+        )
+
+    return env_filter
@@ -0,0 +1,115 @@
+"""
+Flaky-aware matrix fields from the run history store, for --gh-matrix-flaky.
+
+From each env's recent runs (see history):
+
+    flaky_score   how often its outcome flips between consecutive runs (0-1)
+    retry_count   for flaky envs, how many retries should make a pass likely
+    run_first     true for envs that usually fail, which are moved to the front
+                  of the matrix so fail-fast workflows can cancel sooner
+
+Everything is computed from the stored records alone (ordered by time),
+so the same history always gives the same matrix.
+"""
+
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+import tox.config
+
+from .history import Record, percentile
+from .ordering import get_depends
+
+# Only the most recent runs of each env are considered
+FLAKY_WINDOW = 20
+# Envs with fewer runs than this don't get retries or run_first
+FLAKY_MIN_RUNS = 3
+# Envs that flip at least this often are flaky
+# (and get retries, if they usually pass)
+FLAKY_THRESHOLD = 0.1
+# Retry until the chance every attempt fails is below this...
+RETRY_TARGET_FAILURE = 0.01
+# ... up to this many retries
+MAX_RETRIES = 3
+# Envs that failed at least this fraction of recent runs are run first
+RUN_FIRST_FAILURE_RATE = 0.5
+
+
+def flaky_stats(records: Iterable[Record], window: int = FLAKY_WINDOW) -> Dict[str, Dict]:
+    """Return envname --> flaky fields (and sort keys) from history records"""
+    by_env: Dict[str, List[Record]] = defaultdict(list)
+    for record in records:
+        by_env[record["env"]].append(record)
+    stats = {}
+    for env, env_records in by_env.items():
+        recent = sorted(
+            env_records, key=lambda record: (record.get("time", 0), record.get("source", ""))
+        )[-window:]
+        stats[env] = env_flaky_stats(recent)
+    return stats
+
+
+def env_flaky_stats(records: List[Record]) -> Dict:
+    """Compute the flaky fields for one env's records (in time order)"""
+    outcomes = [bool(record.get("failed")) for record in records]
+    runs = len(outcomes)
+    failure_rate = sum(outcomes) / runs
+    flips = sum(1 for before, after in zip(outcomes, outcomes[1:]) if before != after)
+    flaky_score = round(flips / (runs - 1), 3) if runs > 1 else 0.0
+
+    retry_count = 0
+    if (
+        runs >= FLAKY_MIN_RUNS
+        and flaky_score >= FLAKY_THRESHOLD
+        and 0 < failure_rate < RUN_FIRST_FAILURE_RATE
+    ):
+        attempts = math.ceil(math.log(RETRY_TARGET_FAILURE) / math.log(failure_rate))
+        retry_count = min(MAX_RETRIES, max(1, attempts - 1))
+
+    failed_seconds = sorted(
+        float(record.get("seconds", 0)) for record in records if record.get("failed")
+    )
+    return {
+        "flaky_score": flaky_score,
+        "retry_count": retry_count,
+        "run_first": runs >= FLAKY_MIN_RUNS and failure_rate >= RUN_FIRST_FAILURE_RATE,
+        "failure_rate": failure_rate,
+        "fail_seconds": percentile(failed_seconds, 50) if failed_seconds else 0.0,
+    }
+
+
+def flaky_fields(stats: Dict) -> Dict:
+    """Return the matrix item fields for an env's flaky_stats (which may be empty)"""
+    fields = {
+        "flaky_score": stats.get("flaky_score", 0.0),
+        "retry_count": stats.get("retry_count", 0),
+    }
+    if stats.get("run_first"):
+        fields["run_first"] = True
+    return fields
+
+
+def order_run_first(
+    envconfigs: List[tox.config.TestenvConfig], stats: Dict[str, Dict]
+) -> List[tox.config.TestenvConfig]:
+    """
+    Return envconfigs with the run_first envs moved to the front: most
+    likely to fail first, then quickest to fail. Other envs keep their order,
+    and envs that depend on others in envconfigs aren't moved.
+    """
+    names = {env.envname for env in envconfigs}
+    first = [
+        env
+        for env in envconfigs
+        if stats.get(env.envname, {}).get("run_first")
+        and not any(name in names for name in get_depends(env))
+    ]
+    first.sort(
+        key=lambda env: (
+            -stats[env.envname]["failure_rate"],
+            stats[env.envname]["fail_seconds"],
+        )
+    )
+    moved = {env.envname for env in first}
+    return first + [env for env in envconfigs if env.envname not in moved]
@@ -0,0 +1,224 @@
+"""
+A local store of per-env run history, fed by junit XML files.
+
+The store is a JSON-lines file with one record per env run:
+{"env": envname, "time": unix timestamp, "seconds": duration,
+"failed": bool, "source": identifies the junit file it came from}.
+
+A record's time is when its tests ran (from the junit file's testsuite
+timestamps), and its source is the junit file's name and a digest of its
+contents, so copies of the same file (e.g., downloaded artifacts, whose
+mtimes vary) are only recorded once.
+"""
+
+import datetime
+import json
+import math
+import os
+import pathlib
+import re
+import time
+import xml.etree.ElementTree as ElementTree
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from tox import reporter as report
+
+from .cache_keys import file_digest
+from .durations import JUNIT_PREFIX, JUNIT_SUFFIX, junit_path_to_envname, read_junit_summary
+
+HISTORY_FILENAME = "gh-matrix-history.jsonl"
+
+# Records older than this are pruned
+HISTORY_MAX_AGE = 90 * 24 * 60 * 60  # seconds
+# Only the most recent runs of each env are kept
+HISTORY_MAX_RUNS = 100
+
+Record = Dict
+
+# <testsuite timestamp> formats (pytest writes local time, without or with an offset)
+JUNIT_TIMESTAMP_FORMATS = (
+    "%Y-%m-%dT%H:%M:%S.%f%z",
+    "%Y-%m-%dT%H:%M:%S%z",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+)
+UTC_OFFSET_RE = re.compile(r"(?:Z|[+-]\d\d:\d\d)$")
+
+
+def default_history_path(toxworkdir) -> pathlib.Path:
+    return pathlib.Path(str(toxworkdir)) / HISTORY_FILENAME
+
+
+def load_history(path: pathlib.Path) -> List[Record]:
+    """Load all records from the history store (empty if it doesn't exist)"""
+    records = []
+    try:
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # e.g., partial line from an interrupted write
+                if isinstance(record, dict) and "env" in record and "seconds" in record:
+                    records.append(record)
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def record_junit_files(
+    path: pathlib.Path,
+    junit_paths: Iterable[pathlib.Path],
+    now: Optional[float] = None,
+    max_age: float = HISTORY_MAX_AGE,
+    max_runs: int = HISTORY_MAX_RUNS,
+) -> Tuple[int, int]:
+    """
+    Add the runs recorded in junit_paths (files or directories to search)
+    to the history store at path, skipping files that were already added,
+    and prune expired records.
+
+    Returns (number of records added, number of records pruned).
+    """
+    now = time.time() if now is None else now
+    records = load_history(path)
+    seen_sources = {record.get("source") for record in records}
+
+    new_records = []
+    for junit_path in find_junit_files(junit_paths):
+        source = junit_source_key(junit_path)
+        if source in seen_sources:
+            continue
+        record = read_junit_record(junit_path)
+        if record is not None:
+            record["source"] = source
+            new_records.append(record)
+            seen_sources.add(source)
+
+    kept = prune_history(records + new_records, now, max_age, max_runs)
+    pruned = len(records) + len(new_records) - len(kept)
+    if pruned:
+        write_history(path, kept)
+    elif new_records:
+        # Just append, rather than rewriting the whole store.
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as f:
+            f.writelines(json.dumps(record) + "\n" for record in new_records)
+    return len(new_records), pruned
+
+
+def find_junit_files(paths: Iterable[pathlib.Path]) -> List[pathlib.Path]:
+    """Expand directories in paths to the junit.*.xml files they contain"""
+    found = []
+    for path in paths:
+        path = pathlib.Path(path)
+        if path.is_dir():
+            found.extend(sorted(path.rglob(f"{JUNIT_PREFIX}*{JUNIT_SUFFIX}")))
+        elif path.is_file():
+            found.append(path)
+    return found
+
+
+def junit_source_key(path: pathlib.Path) -> str:
+    """Identify a particular junit file (so it is only recorded once)"""
+    return f"{path.name}:{file_digest(str(path))}"
+
+
+def parse_junit_timestamp(value: str) -> Optional[float]:
+    """
+    Return the unix time for a junit timestamp attribute (ISO 8601,
+    in local time if it has no UTC offset), or None if it can't be parsed
+    """
+    # (Python 3.6's %z doesn't accept "Z", or a colon in the offset.)
+    value = UTC_OFFSET_RE.sub(
+        lambda match: "+0000" if match.group() == "Z" else match.group().replace(":", ""),
+        value.strip(),
+    )
+    for fmt in JUNIT_TIMESTAMP_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+def read_junit_timestamp(path: pathlib.Path) -> Optional[float]:
+    """Return when the tests in a junit XML file started (None if not recorded)"""
+    try:
+        root = ElementTree.parse(str(path)).getroot()
+    except (OSError, ElementTree.ParseError):
+        return None
+    suites = [root] if root.tag == "testsuite" else root.findall("testsuite")
+    times = [
+        parse_junit_timestamp(suite.get("timestamp")) for suite in suites if suite.get("timestamp")
+    ]
+    times = [value for value in times if value is not None]
+    return min(times) if times else None
+
+
+def read_junit_record(path: pathlib.Path) -> Optional[Record]:
+    """Construct a history record from a junit.{envname}.xml file (None if unreadable)"""
+    summary = read_junit_summary(path)
+    if summary is None:
+        report.verbosity1(f"tox-gh-matrix: skipping unreadable junit file {path}")
+        return None
+    seconds, problems = summary
+    timestamp = read_junit_timestamp(path)
+    return {
+        "env": junit_path_to_envname(path),
+        "time": path.stat().st_mtime if timestamp is None else timestamp,
+        "seconds": seconds,
+        "failed": problems > 0,
+    }
+
+
+def prune_history(
+    records: List[Record], now: float, max_age: float, max_runs: int
+) -> List[Record]:
+    """Drop records older than max_age, and all but the latest max_runs for each env"""
+    by_env: Dict[str, List[Record]] = defaultdict(list)
+    for record in records:
+        if now - record.get("time", 0) <= max_age:
+            by_env[record["env"]].append(record)
+    keep = set()
+    for env_records in by_env.values():
+        latest = sorted(env_records, key=lambda record: record.get("time", 0))[-max_runs:]
+        keep.update(id(record) for record in latest)
+    return [record for record in records if id(record) in keep]
+
+
+def write_history(path: pathlib.Path, records: List[Record]):
+    """Replace the history store (atomically) with records"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+    os.replace(str(tmp_path), str(path))
+
+
+def history_stats(records: Iterable[Record]) -> Dict[str, Dict]:
+    """
+    Summarize records per env: number of runs, p50 and p95 duration
+    (seconds), and failure rate (0-1).
+    """
+    by_env: Dict[str, List[Record]] = defaultdict(list)
+    for record in records:
+        by_env[record["env"]].append(record)
+    stats = {}
+    for env, env_records in by_env.items():
+        durations = sorted(float(record["seconds"]) for record in env_records)
+        failures = sum(1 for record in env_records if record.get("failed"))
+        stats[env] = {
+            "runs": len(env_records),
+            "p50": percentile(durations, 50),
+            "p95": percentile(durations, 95),
+            "failure_rate": failures / len(env_records),
+        }
+    return stats
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of a (non-empty) sorted list"""
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
@@ -0,0 +1,173 @@
+import inspect
+import json
+import os
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Union
+
+import tox.config
+from tox import reporter as report
+from tox.interpreters import InterpreterInfo, NoInterpreterInfo
+
+from .timings import timed
+
+PythonInfo = Union[InterpreterInfo, NoInterpreterInfo]
+
+# Name of the interpreter cache file within the cache dir.
+INTERPRETER_CACHE_FILENAME = "interpreters.json"
+
+# Bump this if the cached data format changes.
+INTERPRETER_CACHE_VERSION = 2
+
+# The InterpreterInfo attributes needed to reconstruct it from the cache.
+INTERPRETER_INFO_FIELDS = (
+    "implementation",
+    "executable",
+    "version_info",
+    "sysplatform",
+    "is_64",
+    "os_sep",
+    "extra_version_info",
+)
+
+
+def default_cache_dir() -> pathlib.Path:
+    """
+    The directory where tox-gh-matrix keeps data between runs:
+    $TOX_GH_MATRIX_CACHE_DIR, else $XDG_CACHE_HOME/tox-gh-matrix,
+    else ~/.cache/tox-gh-matrix.
+    """
+    cache_dir = os.environ.get("TOX_GH_MATRIX_CACHE_DIR")
+    if cache_dir:
+        return pathlib.Path(cache_dir)
+    cache_home = os.environ.get("XDG_CACHE_HOME") or pathlib.Path.home() / ".cache"
+    return pathlib.Path(cache_home) / "tox-gh-matrix"
+
+
+def probe_interpreters(
+    config: tox.config.Config,
+    envconfigs: Iterable[tox.config.TestenvConfig],
+    cache_dir: Optional[pathlib.Path] = None,
+    max_workers: Optional[int] = None,
+) -> Dict[str, PythonInfo]:
+    """
+    Return a dict of basepython --> python_info for the distinct
+    basepythons used by envconfigs.
+
+    Each basepython is probed only once (using the first env that
+    asks for it), and separate basepythons are probed concurrently.
+    If cache_dir is given, InterpreterInfo for a basepython found earlier
+    (with the same PATH and discover paths) is loaded from the cache,
+    if its executable hasn't changed since. That avoids tox's executable
+    discovery, too, which itself runs the interpreter.
+    """
+    # basepython --> representative envconfig
+    to_probe: Dict[str, tox.config.TestenvConfig] = {}
+    for env in envconfigs:
+        to_probe.setdefault(env.basepython, env)
+    if not to_probe:
+        return {}
+
+    cache_path = cache_dir / INTERPRETER_CACHE_FILENAME if cache_dir else None
+    cache = load_interpreter_cache(cache_path) if cache_path else {}
+    cache_updated = False
+
+    def probe(env: tox.config.TestenvConfig) -> PythonInfo:
+        with timed(f"probe {env.basepython}"):
+            return probe_env(env)
+
+    def probe_env(env: tox.config.TestenvConfig) -> PythonInfo:
+        nonlocal cache_updated
+        key = interpreter_cache_key(config, env.basepython)
+        entry = cache.get(key)
+        if entry is not None and executable_mtime(entry["executable"]) == entry["mtime"]:
+            report.verbosity2(f"tox-gh-matrix: using cached info for {env.basepython}")
+            return interpreter_info_from_dict(entry["info"])
+        info = config.interpreters.get_info(env)
+        if isinstance(info, InterpreterInfo):
+            # (get_info has already found the executable.)
+            executable = str(config.interpreters.get_executable(env))
+            mtime = executable_mtime(executable)
+            if mtime is not None:
+                cache[key] = {
+                    "executable": executable,
+                    "mtime": mtime,
+                    "info": interpreter_info_to_dict(info),
+                }
+                cache_updated = True
+        return info
+
+    max_workers = max_workers or min(32, len(to_probe))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        infos = dict(zip(to_probe.keys(), executor.map(probe, to_probe.values())))
+
+    if cache_path and cache_updated:
+        save_interpreter_cache(cache_path, cache)
+    return infos
+
+
+def interpreter_cache_key(config: tox.config.Config, basepython: str) -> str:
+    """
+    Return the interpreter cache key for basepython: everything that
+    affects which executable tox would find for it
+    """
+    option = getattr(config, "option", None)
+    return json.dumps(
+        [
+            basepython,
+            os.environ.get("PATH", ""),
+            list(getattr(option, "discover", None) or []),
+            os.environ.get("TOX_DISCOVER", ""),
+        ]
+    )
+
+
+def executable_mtime(executable: str) -> Optional[int]:
+    """Return the executable's mtime (in ns), or None if it doesn't exist"""
+    try:
+        return os.stat(executable).st_mtime_ns
+    except OSError:
+        return None
+
+
+def interpreter_info_to_dict(info: InterpreterInfo) -> Dict:
+    """Return a JSON-serializable dict of an InterpreterInfo's attributes"""
+    return {field: getattr(info, field, None) for field in INTERPRETER_INFO_FIELDS}
+
+
+def interpreter_info_from_dict(data: Dict) -> InterpreterInfo:
+    """Reconstruct an InterpreterInfo from interpreter_info_to_dict output"""
+    data = dict(data)
+    for field in ("version_info", "extra_version_info"):
+        if data.get(field) is not None:
+            data[field] = tuple(data[field])  # (json turns tuples into lists)
+    # (InterpreterInfo's constructor kwargs have changed
+    # across tox versions, so only pass the ones it accepts.)
+    params = inspect.signature(InterpreterInfo).parameters
+    return InterpreterInfo(**{key: value for key, value in data.items() if key in params})
+
+
+def load_interpreter_cache(cache_path: pathlib.Path) -> Dict[str, Dict]:
+    """Load the interpreter cache, returning an empty cache if missing or invalid"""
+    try:
+        with cache_path.open(encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != INTERPRETER_CACHE_VERSION:
+        return {}
+    return data.get("interpreters", {})
+
+
+def save_interpreter_cache(cache_path: pathlib.Path, cache: Dict[str, Dict]):
+    """Write the interpreter cache (atomically, so concurrent runs can't corrupt it)"""
+    data = {"version": INTERPRETER_CACHE_VERSION, "interpreters": cache}
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(str(tmp_path), str(cache_path))
+    except OSError as error:
+        # The cache is just an optimization; don't fail the run.
+        report.verbosity1(f"tox-gh-matrix: unable to save interpreter cache: {error}")
@@ -0,0 +1,109 @@
+"""
+Incremental JSON encoding, for writing large matrices without
+building the whole JSON string (or list of items) in memory.
+"""
+
+import json
+from typing import Any, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from tox import reporter as report
+
+# Largest list or dict that's encoded in one go, rather than streamed
+SMALL_LIMIT = 16
+
+
+def iterencode(
+    value: Any,
+    indent: Optional[int] = None,
+    separators: Optional[Tuple[str, str]] = None,
+    level: int = 0,
+) -> Iterator[str]:
+    """
+    Encode value as JSON, in chunks. Mappings and other iterables
+    (including generators) are consumed one element at a time;
+    anything else is encoded as a whole. (So are small dicts and
+    lists, like each matrix item, which are much faster to encode
+    at once, unless they contain generators.)
+
+    The joined chunks are the same as json.dumps(value, indent=indent,
+    separators=separators) (with any iterables converted to lists).
+    """
+    if separators is None:
+        # (json.dumps' defaults)
+        separators = (", ", ": ") if indent is None else (",", ": ")
+    if isinstance(value, (dict, list, tuple)) and len(value) <= SMALL_LIMIT:
+        try:
+            yield encode_whole(value, indent, separators, level)
+            return
+        except TypeError:
+            pass  # (contains a generator or other iterable)
+    if isinstance(value, Mapping):
+        key_separator = separators[1]
+        entries = ((json.dumps(str(key)) + key_separator, item) for key, item in value.items())
+        yield from iterencode_entries("{", "}", entries, indent, separators, level)
+    elif isinstance(value, Iterable) and not isinstance(value, (str, bytes)):
+        entries = (("", item) for item in value)
+        yield from iterencode_entries("[", "]", entries, indent, separators, level)
+    else:
+        yield encode_whole(value, indent, separators, level)
+
+
+def encode_whole(
+    value: Any, indent: Optional[int], separators: Tuple[str, str], level: int
+) -> str:
+    encoded = json.dumps(value, indent=indent, separators=separators)
+    if indent is not None and level:
+        encoded = encoded.replace("\n", "\n" + " " * (indent * level))
+    return encoded
+
+
+def iterencode_entries(
+    start: str,
+    end: str,
+    entries: Iterable[Tuple[str, Any]],
+    indent: Optional[int],
+    separators: Tuple[str, str],
+    level: int,
+) -> Iterator[str]:
+    """Encode a JSON object or array from (prefix, value) entries"""
+    empty = True
+    for prefix, item in entries:
+        yield start if empty else separators[0]
+        empty = False
+        if indent is not None:
+            yield "\n" + " " * (indent * (level + 1))
+        yield prefix
+        yield from iterencode(item, indent, separators, level + 1)
+    if empty:
+        yield start + end
+    else:
+        if indent is not None:
+            yield "\n" + " " * (indent * level)
+        yield end
+
+
+class ReportWriter:
+    """
+    A file-like object that writes complete lines to the tox reporter
+    (and also appends them to `lines`, if provided)
+    """
+
+    def __init__(self, lines: Optional[List[str]] = None):
+        self.pending = ""
+        self.lines = lines
+
+    def write(self, text: str):
+        lines = (self.pending + text).split("\n")
+        self.pending = lines.pop()
+        for line in lines:
+            self.line(line)
+
+    def close(self):
+        if self.pending:
+            self.line(self.pending)
+            self.pending = ""
+
+    def line(self, line: str):
+        report.line(line)
+        if self.lines is not None:
+            self.lines.append(line)
@@ -0,0 +1,84 @@
+import heapq
+from collections import OrderedDict, deque
+from typing import Dict, List
+
+import tox.config
+
+
+def get_depends(env: tox.config.TestenvConfig) -> List[str]:
+    """Return the envnames env depends on (tox's `depends` setting)"""
+    return list(getattr(env, "depends", None) or ())
+
+
+def order_by_critical_path(
+    envconfigs: List[tox.config.TestenvConfig], estimates: Dict[str, float]
+) -> List[tox.config.TestenvConfig]:
+    """
+    Return envconfigs ordered so the envs on the longest chains of
+    `depends` start first, without putting any env ahead of the envs
+    it depends on. (With no depends, this is just longest-first.)
+
+    Each env's priority is its estimated duration plus the priority of
+    its highest-priority dependent: the time from when it starts until
+    everything waiting on it could finish. Envs are then listed in order
+    of priority, as soon as all their (selected) dependencies are listed.
+    Ties keep their original envlist order. Dependencies on envs that
+    aren't in envconfigs are ignored.
+    """
+    index = {env.envname: i for i, env in enumerate(envconfigs)}
+    # env index --> indexes of the (selected) envs it depends on, and that depend on it
+    depends = [
+        list(OrderedDict.fromkeys(index[name] for name in get_depends(env) if name in index))
+        for env in envconfigs
+    ]
+    dependents: List[List[int]] = [[] for _ in envconfigs]
+    for i, requires in enumerate(depends):
+        for dep in requires:
+            dependents[dep].append(i)
+
+    # Topological order (Kahn's algorithm), then any envs in (or after) a
+    # dependency cycle. Priorities are computed in reverse, so each env's
+    # dependents come first (other than through a cycle, which is ignored).
+    waiting = [len(requires) for requires in depends]
+    queue = deque(i for i, count in enumerate(waiting) if count == 0)
+    topological = []
+    while queue:
+        i = queue.popleft()
+        topological.append(i)
+        for dependent in dependents[i]:
+            waiting[dependent] -= 1
+            if waiting[dependent] == 0:
+                queue.append(dependent)
+    in_order = set(topological)
+    topological.extend(i for i in range(len(envconfigs)) if i not in in_order)
+
+    priorities = [0.0] * len(envconfigs)
+    done = [False] * len(envconfigs)
+    for i in reversed(topological):
+        downstream = (priorities[dependent] for dependent in dependents[i] if done[dependent])
+        priorities[i] = estimates[envconfigs[i].envname] + max(downstream, default=0)
+        done[i] = True
+
+    # List the highest-priority ready env next (the first of any ties).
+    # heap entries are (-priority, env index).
+    waiting = [len(requires) for requires in depends]
+    ready = [(-priorities[i], i) for i, count in enumerate(waiting) if count == 0]
+    heapq.heapify(ready)
+    # (If there's a dependency cycle, nothing is ready: just break it,
+    # with the highest-priority env that hasn't been listed.)
+    unlisted = [(-priorities[i], i) for i in range(len(envconfigs))]
+    heapq.heapify(unlisted)
+    listed = [False] * len(envconfigs)
+    ordered = []
+    while len(ordered) < len(envconfigs):
+        heap = ready if ready else unlisted
+        _, i = heapq.heappop(heap)
+        if listed[i]:
+            continue
+        listed[i] = True
+        ordered.append(envconfigs[i])
+        for dependent in dependents[i]:
+            waiting[dependent] -= 1
+            if waiting[dependent] == 0:
+                heapq.heappush(ready, (-priorities[dependent], dependent))
+    return ordered
@@ -0,0 +1,146 @@
+import heapq
+import math
+from typing import Dict, List, Optional
+
+from tox.exception import ConfigError
+
+from .durations import estimate_durations
+from .staging import stage_gh_matrix
+
+
+def parse_pack_jobs(value: str) -> Optional[int]:
+    """Parse a --gh-matrix-pack value: a positive job count, or 'auto' (None)"""
+    if value == "auto":
+        return None
+    try:
+        jobs = int(value)
+    except ValueError:
+        jobs = 0
+    if jobs < 1:
+        raise ConfigError(f"--gh-matrix-pack must be a positive number or 'auto', not {value!r}")
+    return jobs
+
+
+def pack_gh_matrix(
+    matrix: List[Dict],
+    jobs: Optional[int],
+    durations: Dict[str, float],
+    depends: Optional[Dict[str, List[str]]] = None,
+) -> List[Dict]:
+    """
+    Combine matrix items into (at most) `jobs` multi-env items,
+    balancing their estimated durations.
+
+    Uses longest-processing-time-first packing, which keeps the longest
+    job within 4/3 of optimal. If jobs is None, uses the fewest jobs that
+    shouldn't take longer than the single longest env, which avoids
+    paying runner startup overhead for jobs that wouldn't shorten the run.
+
+    Each resulting item has a comma-separated `name` (for `tox -e`),
+    the combined `factors`, the original items in `envs`, and an
+    `estimated_seconds` for the job.
+
+    If tox `depends` are provided (envname --> the envnames it depends on),
+    each dependency stage (see staging.stage_gh_matrix) is packed separately,
+    into up to `jobs` items each, and later stages' items follow earlier
+    ones. So an env like `coverage` that depends on all the others gets a
+    trailing job, rather than holding all of them in one long job.
+
+    Shards of a sharded env are always jobs of their own
+    (and aren't counted in `jobs`). Items for different runners
+    (runs_on) are packed separately, into up to `jobs` items each.
+    """
+    runners = unique(item.get("runs_on") for item in matrix)
+    if len(runners) > 1:
+        return [
+            packed
+            for runner in runners
+            for packed in pack_gh_matrix(
+                [item for item in matrix if item.get("runs_on") == runner],
+                jobs,
+                durations,
+                depends,
+            )
+        ]
+
+    if depends:
+        stages = stage_gh_matrix(matrix, depends)
+        if len(stages) > 1:
+            return [
+                packed for stage in stages for packed in pack_gh_matrix(stage, jobs, durations)
+            ]
+
+    estimates = estimate_durations([item["name"] for item in matrix], durations)
+    shards = [
+        merge_gh_items([item], estimates[item["name"]] / item["shard"]["total"])
+        for item in matrix
+        if "shard" in item
+    ]
+    matrix = [item for item in matrix if "shard" not in item]
+    if not matrix:
+        return shards
+    if jobs is None:
+        longest = max(estimates[item["name"]] for item in matrix)
+        total = sum(estimates[item["name"]] for item in matrix)
+        jobs = math.ceil(total / longest) if longest > 0 else 1
+    jobs = min(jobs, len(matrix))
+
+    # Assign each item (longest first) to the currently least-loaded job.
+    # heap entries are (load, job index); bins hold matrix indexes.
+    heap = [(0.0, index) for index in range(jobs)]
+    bins: List[List[int]] = [[] for _ in range(jobs)]
+    by_duration = sorted(range(len(matrix)), key=lambda i: -estimates[matrix[i]["name"]])
+    for i in by_duration:
+        load, index = heapq.heappop(heap)
+        bins[index].append(i)
+        heapq.heappush(heap, (load + estimates[matrix[i]["name"]], index))
+    loads = dict((index, load) for load, index in heap)
+
+    # Longest jobs first; envs within a job in their original order.
+    packed = [
+        merge_gh_items([matrix[i] for i in sorted(bins[index])], loads[index])
+        for index in sorted(range(jobs), key=lambda index: -loads[index])
+        if bins[index]
+    ]
+    return shards + packed
+
+
+def merge_gh_items(items: List[Dict], estimated_seconds: float) -> Dict:
+    """Combine matrix items into a single item that runs all of them"""
+    merged = {"name": ",".join(item["name"] for item in items)}
+    # (Items only have the fields selected with --gh-matrix-fields.)
+    if all("factors" in item for item in items):
+        merged["factors"] = unique(factor for item in items for factor in item["factors"])
+    merged["envs"] = items
+    merged["estimated_seconds"] = round(estimated_seconds)
+
+    if len(items) == 1 and "shard" in items[0]:
+        merged["shard"] = items[0]["shard"]
+    if "runs_on" in items[0]:
+        merged["runs_on"] = items[0]["runs_on"]
+
+    pythons = unique(item["python"] for item in items if "python" in item)
+    if len(pythons) == 1:
+        merged["python"] = pythons[0]
+    elif pythons:
+        # actions/setup-python accepts a multiline python-version
+        # to install several versions.
+        merged["python"] = {
+            key: "\n".join(python[key] for python in pythons)
+            for key in ("version", "spec", "installed")
+            if all(key in python for python in pythons)
+        }
+
+    # A job can only ignore failures if all its envs do.
+    if all(item.get("ignore_outcome") for item in items):
+        merged["ignore_outcome"] = True
+    return merged
+
+
+def unique(values) -> List:
+    """Return a list of the distinct values, in their original order"""
+    result = []
+    for value in values:
+        if value not in result:
+            result.append(value)
+    return result
@@ -1,63 +1,708 @@
-import json
 import os
 import pathlib
 import re
 import uuid
-from typing import Dict, Iterable, List
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import pluggy
 import tox.config
 from tox import reporter as report
 from tox.exception import ConfigError, MissingDependency
-from tox.interpreters import InterpreterInfo
 
-from .version_utils import (
-    basepython_to_gh_python_version,
-    interpreter_info_to_version,
-    python_version_to_prerelease_spec,
+from .baseline import (
+    FINGERPRINT_FIELD,
+    SKIPPED_OUTPUT,
+    clear_caches,
+    env_inputs_fingerprint,
+    item_fingerprint,
+    load_baseline,
+    split_baseline,
 )
+from .cache_keys import env_cache_files, hash_file
+from .changes import ALL_ENVS_PATTERNS, filter_changed_envs, git_changed_paths
+from .chunking import (
+    CHUNK_INDEX_SUFFIX,
+    check_gh_output_limits,
+    chunk_gh_outputs,
+    parse_chunk_count,
+)
+from .dedup import dedup_envconfigs
+from .durations import estimate_durations, load_durations
+from .encoding import COMPACT_SEPARATORS, encode_compact_matrix
+from .fast import FastConfig
+from .fields import (
+    DEFAULT_FIELDS,
+    FieldSelection,
+    default_fields,
+    needs_python_info,
+    parse_fields,
+    testenv_fields,
+)
+from .filters import EnvFilter, parse_gh_matrix_specs
+from .flaky import flaky_fields, flaky_stats, order_run_first
+from .history import default_history_path, history_stats, load_history, record_junit_files
+from .interpreters import PythonInfo, default_cache_dir, probe_interpreters
+from .json_stream import ReportWriter, iterencode
+from .ordering import get_depends, order_by_critical_path
+from .packing import pack_gh_matrix, parse_pack_jobs
+from .result_cache import (
+    FINGERPRINT_OUTPUT,
+    RESULT_CACHE_DIRNAME,
+    hash_files,
+    load_result,
+    result_fingerprint,
+    save_result,
+)
+from .runners import env_runners, expand_runners, parse_runners
+from .sharding import get_shard_count, parse_shard_specs, shard_gh_item
+from .staging import STAGE_COUNT_SUFFIX, stage_gh_outputs
+from .timings import (
+    Timings,
+    format_timings_markdown,
+    format_timings_table,
+    mark_time,
+    start_timings,
+    stop_timings,
+    timed,
+    write_timings_profile,
+)
+from .version_utils import basepython_to_gh_python_version
+from .watch import DEFAULT_WATCH_INTERVAL, MatrixWatcher, is_reparsing, watch_gh_matrix
 
 hookimpl = pluggy.HookimplMarker("tox")
 
 
 @hookimpl
 def tox_addoption(parser):
+    mark_time("addoption")
     parser.add_argument(
         "--gh-matrix",
-        action="store",
+        action="append",
         nargs="?",
         const="envlist",
         metavar="VAR",
-        help="set GitHub workflow output %(metavar)s (default: '%(const)s') to workflow matrix",
+        help="set GitHub workflow output %(metavar)s (default: '%(const)s') to workflow matrix;"
+        " use %(metavar)s=FILTER to include only envs matching FILTER (factors like"
+        " 'py39-!win,mac' or 're:REGEX'); can be repeated to set several outputs at once",
     )
     parser.add_argument(
         "--gh-matrix-dump",
         action="store_true",
         help="output JSON formatted GitHub workflow matrix",
     )
+    parser.add_argument(
+        "--gh-matrix-cache-dir",
+        action="store",
+        metavar="DIR",
+        default=None,
+        help="directory for caching interpreter info between --gh-matrix runs"
+        " (default: $TOX_GH_MATRIX_CACHE_DIR or ~/.cache/tox-gh-matrix; '' to disable)",
+    )
+    parser.add_argument(
+        "--gh-matrix-durations",
+        action="append",
+        metavar="PATH",
+        help="per-env durations for scheduling the matrix: a JSON {envname: seconds} file,"
+        " junit.{envname}.xml file, or directory of junit XML files (can be repeated)",
+    )
+    parser.add_argument(
+        "--gh-matrix-pack",
+        action="store",
+        nargs="?",
+        const="auto",
+        metavar="JOBS",
+        help="pack envs into %(metavar)s matrix items (default: '%(const)s'),"
+        " balanced using --gh-matrix-durations",
+    )
+    parser.add_argument(
+        "--gh-matrix-history",
+        action="store",
+        metavar="PATH",
+        help="run history store for --gh-matrix-record, also used as the default"
+        " --gh-matrix-durations (default: {toxworkdir}/gh-matrix-history.jsonl)",
+    )
+    parser.add_argument(
+        "--gh-matrix-record",
+        action="store",
+        nargs="*",
+        metavar="PATH",
+        help="add junit XML files (or directories of them) to the --gh-matrix-history"
+        " store and show per-env statistics (default: {toxworkdir}/junit.*.xml)",
+    )
+    parser.add_argument(
+        "--gh-matrix-flaky",
+        action="store_true",
+        help="add flaky_score, retry_count and run_first to matrix items from the"
+        " --gh-matrix-history outcomes, and list run_first envs (which usually fail) first",
+    )
+    parser.add_argument(
+        "--gh-matrix-shards",
+        action="append",
+        metavar="FILTER=N",
+        help="split envs matching FILTER into N matrix items, each with a different"
+        " shard.index (can be repeated; overrides tox.ini gh_matrix_shards)",
+    )
+    parser.add_argument(
+        "--gh-matrix-shard-target",
+        action="store",
+        type=float,
+        metavar="SECONDS",
+        help="split envs with timing data into enough shards to take about %(metavar)s each",
+    )
+    parser.add_testenv_attribute(
+        name="gh_matrix_shards",
+        type="string",
+        default=None,
+        help="number of tox-gh-matrix shards to split this env into",
+    )
+    parser.add_argument(
+        "--gh-matrix-runners",
+        action="store",
+        metavar="LABELS",
+        help="comma-separated runner LABEL or LABEL=PLATFORM: include a matrix item (with"
+        " runs_on) for each runner an env can run on, given its platform setting and factors",
+    )
+    parser.add_argument(
+        "--gh-matrix-order",
+        action="store",
+        choices=["envlist", "duration"],
+        default="envlist",
+        help="order of matrix items: 'envlist' (as listed in tox config) or 'duration'"
+        " (longest chains of depends first, using --gh-matrix-durations)",
+    )
+    parser.add_argument(
+        "--gh-matrix-stages",
+        action="store_true",
+        help="split each output VAR into VAR-stage0, VAR-stage1, ... by tox depends"
+        " (each stage's envs only depend on envs in earlier stages), and output the"
+        " number of stages in VAR-stages",
+    )
+    parser.add_argument(
+        "--gh-matrix-chunks",
+        action="store",
+        nargs="?",
+        const="auto",
+        metavar="N",
+        help="split each output VAR into %(metavar)s outputs VAR-0, VAR-1, ... (default:"
+        " '%(const)s', as few as fit GitHub's limits), balanced using --gh-matrix-durations,"
+        " and list them in a VAR-chunks output",
+    )
+    parser.add_argument(
+        "--gh-matrix-format",
+        action="store",
+        choices=["json", "compact"],
+        default="json",
+        help="matrix output format: 'json' (a list of items) or 'compact' (an object with"
+        " the items in 'envs', without factors, and python objects in a shared 'python' table)",
+    )
+    parser.add_argument(
+        "--gh-matrix-cache-keys",
+        action="store_true",
+        help="include a cache_key in each matrix item, which changes when anything"
+        " installed in the env's virtualenv might",
+    )
+    parser.add_argument(
+        "--gh-matrix-fields",
+        action="store",
+        metavar="FIELDS",
+        help="comma-separated fields to include in each matrix item (default:"
+        f" {','.join(DEFAULT_FIELDS)}; subfields like python.spec are allowed;"
+        " name is always included)",
+    )
+    parser.add_argument(
+        "--gh-matrix-dedup",
+        action="store_true",
+        help="combine envs whose effective configs are identical into a single matrix"
+        " item (the first of them), listing the others in its aliases",
+    )
+    parser.add_argument(
+        "--gh-matrix-changed-since",
+        action="store",
+        metavar="REF",
+        help="include only envs affected by files changed since git %(metavar)s"
+        " (according to tox.ini gh_matrix_paths)",
+    )
+    parser.add_testenv_attribute(
+        name="gh_matrix_paths",
+        type="line-list",
+        default=None,
+        help="files (glob patterns relative to toxinidir) that affect this env,"
+        " for tox-gh-matrix --gh-matrix-changed-since",
+    )
+    parser.add_argument(
+        "--gh-matrix-baseline",
+        action="store",
+        metavar="FILE",
+        help="add a fingerprint to each matrix item (of its config and source files),"
+        " and move the items whose fingerprints are in the JSON %(metavar)s (e.g.,"
+        f" a matrix from an earlier run) from the outputs to a {SKIPPED_OUTPUT!r} output",
+    )
+    parser.add_argument(
+        "--gh-matrix-result-cache",
+        action="store_true",
+        help="reuse the outputs of an earlier run with the same tox config, options and"
+        " environment (from --gh-matrix-cache-dir), and set a gh-matrix-fingerprint output",
+    )
+    parser.add_argument(
+        "--gh-matrix-timings",
+        action="store",
+        nargs="?",
+        const="",
+        metavar="PATH",
+        help="show how long each phase of generating the matrix took (and write them"
+        " as JSON to %(metavar)s, and to the GitHub step summary if available)",
+    )
+    parser.add_argument(
+        "--gh-matrix-watch",
+        action="store",
+        type=float,
+        nargs="?",
+        const=DEFAULT_WATCH_INTERVAL,
+        metavar="SECONDS",
+        help="show the matrix, then keep checking the tox config files every %(metavar)s"
+        f" (default {DEFAULT_WATCH_INTERVAL:g}) and show how the matrix changes"
+        " (until interrupted)",
+    )
 
 
 @hookimpl(trylast=True)
 def tox_configure(config: tox.config.Config):
+    mark_time("configure")
     # Tox's --showconfig and --list (showenvs) options are handled as special
     # cases in tox.session.Session.runcommand, but it's unclear how a plugin
     # could add to or override runcommand. Instead, just hook in here (after
     # parsing config, but before the session runs) and exit early. (This is
     # roughly how --version is handled in tox.config.parse_cli.)
+    if is_reparsing():
+        # Watch mode is loading the changed config: let it handle the options.
+        return
+    if config.option.gh_matrix_record is not None:
+        record_gh_matrix_history(config)
+        raise SystemExit(0)
+    if getattr(config.option, "gh_matrix_watch", None) is not None:
+        watch_config(config)
+        raise SystemExit(0)
     if config.option.gh_matrix or config.option.gh_matrix_dump:
-        matrix = tox_config_to_gh_matrix(config)
-        if config.option.gh_matrix_dump:
-            # Dump formatted json (useful for debugging).
-            report.line(json.dumps(matrix, indent=2))
-        if config.option.gh_matrix:
-            # Set a GitHub workflow output parameter.
-            set_gh_output(config.option.gh_matrix, json.dumps(matrix))
+        timings_path = getattr(config.option, "gh_matrix_timings", None)
+        if timings_path is not None:
+            start_timings()
+        try:
+            output_gh_matrix(config)
+        finally:
+            if timings_path is not None:
+                output_timings(stop_timings(), timings_path)
         # Exit without executing any tox environments.
         raise SystemExit(0)
 
 
-def tox_config_to_gh_matrix(config: tox.config.Config) -> List[Dict]:
-    """Construct a GitHub workflow matrix from a tox config"""
+def record_gh_matrix_history(config: tox.config.Config):
+    """Add junit files to the run history store, and report its statistics"""
+    history_path = get_history_path(config)
+    junit_paths = [pathlib.Path(path) for path in config.option.gh_matrix_record]
+    if not junit_paths:
+        junit_paths = sorted(pathlib.Path(str(config.toxworkdir)).glob("junit.*.xml"))
+    added, pruned = record_junit_files(history_path, junit_paths)
+    report.line(f"tox-gh-matrix: recorded {added} runs ({pruned} pruned) in {history_path}")
+
+    stats = history_stats(load_history(history_path))
+    width = max((len(envname) for envname in stats), default=0)
+    for envname, env_stats in sorted(stats.items()):
+        report.line(
+            f"  {envname:{width}}  runs={env_stats['runs']:<4}"
+            f" p50={env_stats['p50']:.1f}s p95={env_stats['p95']:.1f}s"
+            f" failures={env_stats['failure_rate']:.0%}"
+        )
+
+
+def watch_config(config: tox.config.Config):
+    """Show the matrix for config, then how it changes as the config files are edited"""
+    if isinstance(config, FastConfig):
+        raise ConfigError("--gh-matrix-watch needs the full tox config (it can't use --fast)")
+    option = config.option
+    # Items for unchanged envs can be reused, unless they depend on other envs'
+    # configs or on files other than the tox config.
+    incremental = not (
+        getattr(option, "gh_matrix_order", "envlist") == "duration"
+        or getattr(option, "gh_matrix_dedup", False)
+        or getattr(option, "gh_matrix_flaky", False)
+        or getattr(option, "gh_matrix_changed_since", None)
+        or getattr(option, "gh_matrix_shard_target", None)
+        or "cache_key" in get_fields(option)
+    )
+    watcher = MatrixWatcher(
+        build=lambda config, env_filter: iter_gh_matrix(config, env_filter=env_filter),
+        select=select_envconfigs,
+        incremental=incremental,
+    )
+    try:
+        watch_gh_matrix(config, watcher, interval=option.gh_matrix_watch)
+    except KeyboardInterrupt:
+        report.line("tox-gh-matrix: stopped watching")
+
+
+def output_gh_matrix(config: tox.config.Config):
+    """Generate the matrix for config, and output it as requested by config.option"""
+    with timed("result cache"):
+        fingerprint = get_result_fingerprint(
+            config.option, config.toxinipath, fast=isinstance(config, FastConfig)
+        )
+    if fingerprint is None:
+        write_gh_matrix(config)
+        return
+
+    results_dir = get_results_dir(config.option)
+    with timed("result cache"):
+        if output_cached_gh_matrix(config.option, fingerprint, results_dir):
+            return
+    result = write_gh_matrix(config, record=True)
+    with timed("result cache"):
+        result["files"] = hash_files(get_result_files(config))
+        if results_dir is not None:
+            save_result(results_dir, fingerprint, result)
+    if config.option.gh_matrix:
+        set_gh_output(FINGERPRINT_OUTPUT, fingerprint)
+
+
+def write_gh_matrix(config: tox.config.Config, record: bool = False) -> Optional[Dict]:
+    """
+    Generate the matrix for config, and write the dump and outputs it requests.
+    If record is True, returns the written dump lines and GITHUB_OUTPUT content.
+    """
+    dump_lines: Optional[List[str]] = [] if record else None
+    gh_output: Optional[List[str]] = [] if record else None
+
+    # output name --> filter (or None for all envs)
+    specs = parse_gh_matrix_specs(config.option.gh_matrix or [])
+    if not specs:
+        # Just --gh-matrix-dump: the whole matrix, not set as an output.
+        specs[None] = None
+
+    filters = list(specs.values())
+    if None in filters:
+        env_filter = None
+    else:
+        # Only need to generate items for envs that are in some output.
+        def env_filter(envname: str) -> bool:
+            return any(f(envname) for f in filters)
+
+    set_outputs = bool(config.option.gh_matrix)
+    chunks = getattr(config.option, "gh_matrix_chunks", None)
+    stages = getattr(config.option, "gh_matrix_stages", False)
+    if stages and chunks:
+        raise ConfigError("--gh-matrix-stages can't be combined with --gh-matrix-chunks")
+    matrix = iter_gh_matrix(config, env_filter=env_filter)
+    baseline = getattr(config.option, "gh_matrix_baseline", None)
+    skipped: Optional[List[Dict]] = None
+    if baseline is not None:
+        if SKIPPED_OUTPUT in specs:
+            raise ConfigError(
+                f"--gh-matrix-baseline sets a {SKIPPED_OUTPUT!r} output"
+                " (use a different --gh-matrix name)"
+            )
+        with timed("baseline"):
+            matrix, skipped = split_baseline(matrix, load_baseline(baseline))
+    if (
+        len(specs) > 1
+        or config.option.gh_matrix_pack
+        or chunks
+        or stages
+        or (config.option.gh_matrix_dump and set_outputs)
+    ):
+        # Needs more than one pass over the matrix (else it's streamed).
+        matrix = list(matrix)
+    matrices = OrderedDict(
+        (name, matrix if f is None else filter_gh_matrix(matrix, f)) for name, f in specs.items()
+    )
+
+    if stages:
+        # Split into NAME-stage0, NAME-stage1, ... outputs, plus a NAME-stages count.
+        lists = OrderedDict((name, list(value)) for name, value in matrices.items())
+        depends = {name: get_depends(env) for name, env in config.envconfigs.items()}
+        with timed("stage"):
+            matrices = stage_gh_outputs(lists, depends)
+
+    if config.option.gh_matrix_pack:
+        jobs = parse_pack_jobs(config.option.gh_matrix_pack)
+        durations = get_durations(config)
+        depends = {name: get_depends(env) for name, env in config.envconfigs.items()}
+        for name, value in matrices.items():
+            if stages and name.endswith(STAGE_COUNT_SUFFIX):
+                continue
+            value = list(value)
+            with timed("pack"):
+                matrices[name] = pack_gh_matrix(value, jobs, durations, depends)
+
+    if chunks:
+        # Split into NAME-0, NAME-1, ... outputs, plus a NAME-chunks index.
+        lists = OrderedDict((name, list(value)) for name, value in matrices.items())
+        durations = get_durations(config)
+        with timed("chunk"):
+            matrices = chunk_gh_outputs(lists, parse_chunk_count(chunks), durations)
+
+    if skipped is not None:
+        matrices = OrderedDict(
+            ("envlist" if name is None else name, value) for name, value in matrices.items()
+        )
+        matrices[SKIPPED_OUTPUT] = skipped
+
+    compact = getattr(config.option, "gh_matrix_format", "json") == "compact"
+
+    def encode(name: str, matrix: Iterable[Dict]):
+        if (
+            compact
+            and not (chunks and name.endswith(CHUNK_INDEX_SUFFIX))
+            and not (stages and name.endswith(STAGE_COUNT_SUFFIX))
+        ):
+            return encode_compact_matrix(matrix)
+        return matrix
+
+    if config.option.gh_matrix_dump:
+        # Dump formatted json (useful for debugging).
+        dump = OrderedDict((name, encode(name, value)) for name, value in matrices.items())
+        if len(dump) == 1:
+            dump = next(iter(dump.values()))
+        with timed("dump"):
+            writer = ReportWriter(dump_lines)
+            for text in iterencode(dump, indent=2):
+                writer.write(text)
+            writer.close()
+    if set_outputs:
+        # Set GitHub workflow output parameters.
+        with timed("write outputs"):
+            write_gh_matrix_outputs(
+                matrices,
+                encode=encode,
+                separators=COMPACT_SEPARATORS if compact else None,
+                record=gh_output,
+            )
+
+    if not record:
+        return None
+    return {"dump": dump_lines, "gh_output": "".join(gh_output or [])}
+
+
+def get_result_fingerprint(option: Any, toxinipath, fast: bool = False) -> Optional[str]:
+    """Return the result cache fingerprint for option, or None if it shouldn't be used"""
+    if not getattr(option, "gh_matrix_result_cache", False):
+        return None
+    if option.gh_matrix_record is not None:
+        return None
+    if option.gh_matrix_changed_since:
+        # (The matrix depends on the state of the git checkout.)
+        report.verbosity1("tox-gh-matrix: not using result cache with --gh-matrix-changed-since")
+        return None
+    if getattr(option, "gh_matrix_baseline", None) is not None:
+        # (The matrix depends on the baseline and source files.)
+        report.verbosity1("tox-gh-matrix: not using result cache with --gh-matrix-baseline")
+        return None
+    return result_fingerprint(option, toxinipath, fast=fast)
+
+
+def get_results_dir(option: Any) -> Optional[pathlib.Path]:
+    """Return the result cache dir for option, or None if caching is disabled"""
+    cache_dir = get_cache_dir(option)
+    return cache_dir / RESULT_CACHE_DIRNAME if cache_dir else None
+
+
+def get_result_files(config: tox.config.Config) -> List[str]:
+    """Return the files (found by parsing config) that a cached result depends on"""
+    files = []
+    if getattr(config.option, "gh_matrix_flaky", False) or not getattr(
+        config.option, "gh_matrix_durations", None
+    ):
+        files.append(str(get_history_path(config)))
+    if getattr(config.option, "gh_matrix_cache_keys", False):
+        for env in select_envconfigs(config):
+            files.extend(path for path in env_cache_files(env) if path not in files)
+    return files
+
+
+def output_cached_gh_matrix(
+    option: Any, fingerprint: str, results_dir: Optional[pathlib.Path]
+) -> bool:
+    """
+    Write the dump and outputs option requests from the result cache.
+    Returns False (without writing anything) if there's no cached result.
+    """
+    result = load_result(results_dir, fingerprint) if results_dir else None
+    if result is None:
+        report.verbosity1(f"tox-gh-matrix: no cached result for {fingerprint}")
+        return False
+    report.verbosity1(f"tox-gh-matrix: using cached result for {fingerprint}")
+    if option.gh_matrix_dump:
+        for line in result["dump"] or []:
+            report.line(line)
+    if option.gh_matrix:
+        with get_gh_output_path().open("a") as f:
+            f.write(result["gh_output"])
+        set_gh_output(FINGERPRINT_OUTPUT, fingerprint)
+    return True
+
+
+def output_timings(timings: Timings, profile_path: str):
+    """
+    Report timings, and write them as JSON to profile_path (unless empty)
+    and to the GitHub step summary (if running in a GitHub workflow)
+    """
+    phases = timings.as_list()
+    report.line("tox-gh-matrix timings:")
+    for line in format_timings_table(phases):
+        report.line(line)
+    if profile_path:
+        write_timings_profile(pathlib.Path(profile_path), phases)
+    step_summary = os.getenv("GITHUB_STEP_SUMMARY")
+    if step_summary:
+        with open(step_summary, "a", encoding="utf-8") as f:
+            f.write(format_timings_markdown(phases))
+
+
+def filter_gh_matrix(matrix: Iterable[Dict], env_filter: EnvFilter) -> Iterator[Dict]:
+    """Generate the matrix items whose names (or any of their aliases) pass env_filter"""
+    return (
+        item
+        for item in matrix
+        if env_filter(item["name"]) or any(env_filter(alias) for alias in item.get("aliases", ()))
+    )
+
+
+def tox_config_to_gh_matrix(
+    config: tox.config.Config,
+    env_filter: Optional[EnvFilter] = None,
+    fields: Optional[FieldSelection] = None,
+) -> List[Dict]:
+    """
+    Construct a GitHub workflow matrix from a tox config
+
+    If env_filter is provided, only envs whose names
+    pass the filter are included in the matrix.
+    If fields is provided, it overrides --gh-matrix-fields.
+    """
+    return list(iter_gh_matrix(config, env_filter=env_filter, fields=fields))
+
+
+def iter_gh_matrix(
+    config: tox.config.Config,
+    env_filter: Optional[EnvFilter] = None,
+    fields: Optional[FieldSelection] = None,
+) -> Iterator[Dict]:
+    """
+    Generate the items of the GitHub workflow matrix for a tox config
+    (see tox_config_to_gh_matrix), one at a time
+    """
+    if fields is None:
+        fields = get_fields(config.option)
+    changed_since = getattr(config.option, "gh_matrix_changed_since", None)
+    dedup = getattr(config.option, "gh_matrix_dedup", False)
+    if dedup and isinstance(config, FastConfig):
+        raise ConfigError("--gh-matrix-dedup needs the full tox config (it can't use --fast)")
+    baseline = getattr(config.option, "gh_matrix_baseline", None) is not None
+    if baseline and isinstance(config, FastConfig):
+        raise ConfigError("--gh-matrix-baseline needs the full tox config (it can't use --fast)")
+    # (Files can change between builds, e.g. in watch mode or through the API.)
+    if baseline:
+        clear_caches()
+    elif "cache_key" in fields:
+        hash_file.cache_clear()
+    order_by_duration = getattr(config.option, "gh_matrix_order", "envlist") == "duration"
+    shard_specs = parse_shard_specs(getattr(config.option, "gh_matrix_shards", None) or [])
+    shard_target = getattr(config.option, "gh_matrix_shard_target", None)
+    runners_spec = getattr(config.option, "gh_matrix_runners", None)
+    runners = parse_runners(runners_spec) if runners_spec else None
+    durations = get_durations(config) if order_by_duration or shard_target else None
+
+    # Selecting envs is cheap, so unless they must all be examined together,
+    # they're selected again for each pass rather than kept in a list.
+    envconfigs: Optional[List[tox.config.TestenvConfig]] = None
+    flaky = getattr(config.option, "gh_matrix_flaky", False)
+    if changed_since or order_by_duration or dedup or flaky:
+        with timed("select envs"):
+            envconfigs = list(select_envconfigs(config, env_filter=env_filter))
+
+    if changed_since:
+        with timed("changed files"):
+            envconfigs = filter_envs_changed_since(config, envconfigs, changed_since)
+
+    aliases: Dict[str, List[str]] = {}
+    if dedup:
+        with timed("dedup"):
+            # (Envs that run on different runners, e.g. because of their
+            # platform factors, need their own items.)
+            envconfigs, aliases = dedup_envconfigs(
+                envconfigs,
+                group_key=(lambda env: env_runners(env, runners)) if runners else None,
+            )
+        for name, others in aliases.items():
+            report.verbosity1(f"tox-gh-matrix: {name} has the same config as {', '.join(others)}")
+
+    estimates = None
+    if order_by_duration:
+        # Start the slowest work first (GitHub starts jobs roughly in matrix order).
+        with timed("order"):
+            estimates = estimate_durations((env.envname for env in envconfigs), durations)
+            envconfigs = order_by_critical_path(envconfigs, estimates)
+
+    stats: Dict[str, Dict] = {}
+    if flaky:
+        with timed("flaky"):
+            stats = flaky_stats(load_history(get_history_path(config)))
+            envconfigs = order_run_first(envconfigs, stats)
+
+    def iter_envconfigs() -> Iterator[tox.config.TestenvConfig]:
+        if envconfigs is not None:
+            return iter(envconfigs)
+        return select_envconfigs(config, env_filter=env_filter)
+
+    # Probe all the (distinct) Python interpreters we'll need up front,
+    # concurrently, rather than one env at a time.
+    python_infos: Dict[str, PythonInfo] = {}
+    if needs_python_info(fields):
+        with timed("probe interpreters"):
+            python_infos = probe_interpreters(
+                config,
+                (
+                    env
+                    for env in iter_envconfigs()
+                    if basepython_to_gh_python_version(env.basepython)
+                ),
+                cache_dir=get_cache_dir(config.option),
+            )
+
+    order = 0
+    for env in iter_envconfigs():
+        labels = None
+        if runners is not None:
+            labels = env_runners(env, runners)
+            if not labels:
+                report.verbosity1(f"tox-gh-matrix: {env.envname} can't run on any of the runners")
+                continue
+        with timed("env items"):
+            item = testenv_fields(
+                env,
+                fields,
+                python_info=python_infos.get(env.basepython) if python_infos else None,
+            )
+            if env.envname in aliases:
+                item["aliases"] = aliases[env.envname]
+            if flaky:
+                item.update(flaky_fields(stats.get(env.envname, {})))
+            inputs = env_inputs_fingerprint(env) if baseline else None
+        items = [item] if labels is None else expand_runners(item, labels)
+        shards = get_shard_count(env, shard_specs, durations, shard_target)
+        for shard_item in (shard for item in items for shard in shard_gh_item(item, shards)):
+            if estimates is not None:
+                shard_item["order"] = order
+                shard_item["estimated_seconds"] = round(estimates[env.envname] / shards)
+            if inputs is not None:
+                shard_item[FINGERPRINT_FIELD] = item_fingerprint(shard_item, inputs)
+            order += 1
+            yield shard_item
+
+
+def select_envconfigs(
+    config: tox.config.Config, env_filter: Optional[EnvFilter] = None
+) -> Iterator[tox.config.TestenvConfig]:
+    """Generate the TestenvConfigs for the envs in config's envlist that belong in the matrix"""
     try:
         envlist: Iterable[str] = config.envlist
     except AttributeError:  # pragma: no cover
@@ -66,7 +711,7 @@ def tox_config_to_gh_matrix(config: tox.config.Config) -> List[Dict]:
         )
 
     # Filter out explicitly-requested-but-not-available envnames.
-    envlist = [name for name in envlist if name in config.envconfigs]
+    envlist = (name for name in envlist if name in config.envconfigs)
 
     # Duplicate TOX_SKIP_ENV logic from tox.session.Session._evaluated_env_list,
     # because tox (as of at least 3.24) doesn't process that until after config,
@@ -74,56 +719,166 @@ def tox_config_to_gh_matrix(config: tox.config.Config) -> List[Dict]:
     tox_env_filter = os.environ.get("TOX_SKIP_ENV")
     if tox_env_filter is not None:
         tox_env_filter_re = re.compile(tox_env_filter)
-        envlist = [name for name in envlist if not tox_env_filter_re.match(name)]
+        envlist = (name for name in envlist if not tox_env_filter_re.match(name))
 
-    return [tox_testenv_to_gh_config(config.envconfigs[name]) for name in envlist]
+    if env_filter is not None:
+        envlist = (name for name in envlist if env_filter(name))
 
+    return (config.envconfigs[name] for name in envlist)
 
-def tox_testenv_to_gh_config(env: tox.config.TestenvConfig) -> Dict:
-    """Construct a GitHub workflow matrix item from a tox TestenvConfig"""
-    gh_config = {
-        "name": env.envname,
-        # Converting set env.factors to a list doesn't result
-        # in consistent ordering, so just re-split the envname.
-        # "factors": list(env.factors),
-        "factors": env.envname.split("-"),
-    }
 
-    try:
-        basepython = env.basepython
-    except AttributeError:  # pragma: no cover
-        raise ConfigError(
-            "tox-gh-matrix is not compatible with this version of tox"
-            " (missing TestenvConfig.basepython)"
-        )
+def filter_envs_changed_since(
+    config: tox.config.Config, envconfigs: List[tox.config.TestenvConfig], ref: str
+) -> List[tox.config.TestenvConfig]:
+    """Return the envconfigs affected by git changes since ref (all of them if unknown)"""
+    changed_paths = git_changed_paths(config.toxinidir, ref)
+    if changed_paths is None:
+        return envconfigs
+    all_envs_patterns = ALL_ENVS_PATTERNS + (pathlib.Path(str(config.toxinipath)).name,)
+    affected = filter_changed_envs(envconfigs, changed_paths, all_envs_patterns)
+    report.verbosity1(
+        f"tox-gh-matrix: {len(changed_paths)} files changed since {ref!r}"
+        f" affect {len(affected)} of {len(envconfigs)} envs"
+    )
+    return affected
+
+
+def get_fields(option: Any) -> FieldSelection:
+    """Return the matrix item fields selected by option"""
+    spec = getattr(option, "gh_matrix_fields", None)
+    if spec is None:
+        return default_fields(cache_key=getattr(option, "gh_matrix_cache_keys", False))
+    if getattr(option, "gh_matrix_cache_keys", False):
+        spec += ",cache_key"
+    fields = parse_fields(spec)
+    if "python" in fields and getattr(option, "gh_matrix_format", "json") == "compact":
+        # The compact encoding looks up python objects by version.
+        fields = parse_fields(spec + ",python.version")
+    return fields
+
+
+def get_cache_dir(option: Any) -> Optional[pathlib.Path]:
+    """Return the tox-gh-matrix cache dir for option, or None if caching is disabled"""
+    cache_dir = getattr(option, "gh_matrix_cache_dir", None)
+    if cache_dir is None:
+        return default_cache_dir()
+    return pathlib.Path(cache_dir) if cache_dir else None
+
 
-    python = basepython_to_gh_python_version(basepython)
-    if python:
-        gh_config["python"] = {
-            "version": python,
-            "spec": python_version_to_prerelease_spec(python),
-        }
-        if isinstance(env.python_info, InterpreterInfo):
-            # Some version of basepython is installed on this system.
-            gh_config["python"]["installed"] = interpreter_info_to_version(env.python_info)
+def get_history_path(config: tox.config.Config) -> pathlib.Path:
+    """Return the path to the run history store for config"""
+    history_path = getattr(config.option, "gh_matrix_history", None)
+    if history_path:
+        return pathlib.Path(history_path)
+    return default_history_path(config.toxworkdir)
 
-    if env.ignore_outcome:
-        gh_config["ignore_outcome"] = env.ignore_outcome
-    return gh_config
+
+def get_durations(config: tox.config.Config) -> Dict[str, float]:
+    """
+    Load per-env durations from --gh-matrix-durations,
+    or the run history store if that's not specified
+    """
+    paths = getattr(config.option, "gh_matrix_durations", None)
+    if not paths:
+        history_path = get_history_path(config)
+        paths = [history_path] if history_path.exists() else []
+    with timed("load durations"):
+        return load_durations(paths)
+
+
+def tox_testenv_to_gh_config(
+    env: tox.config.TestenvConfig,
+    python_info: Optional[PythonInfo] = None,
+    cache_key: bool = False,
+) -> Dict:
+    """
+    Construct a GitHub workflow matrix item (with the default fields)
+    from a tox TestenvConfig
+
+    If python_info is not provided, it is looked up from env
+    (which may require tox to probe the interpreter).
+    If cache_key is True, includes a cache_key for env's virtualenv.
+    """
+    return testenv_fields(env, default_fields(cache_key=cache_key), python_info=python_info)
 
 
 def set_gh_output(name: str, value: str):
     """Append an output parameter to the GITHUB_OUTPUT file"""
+    set_gh_outputs({name: value})
+
+
+def set_gh_outputs(outputs: Dict[str, str]):
+    """Append several output parameters to the GITHUB_OUTPUT file, in a single write"""
+    encoded = "".join(encode_gh_output(name, value) for name, value in outputs.items())
+    with get_gh_output_path().open("a") as f:
+        f.write(encoded)
+
+
+def write_gh_matrix_outputs(
+    matrices: Dict[str, Iterable[Dict]],
+    encode: Optional[Callable[[str, Iterable[Dict]], Any]] = None,
+    separators: Optional[Tuple[str, str]] = None,
+    record: Optional[List[str]] = None,
+):
+    """
+    Append matrices to the GITHUB_OUTPUT file as JSON output parameters,
+    encoding (and consuming) each matrix one item at a time. If anything
+    goes wrong, GITHUB_OUTPUT is truncated back to where it was, so none
+    of the outputs are set (rather than some of them, or a partial one).
+
+    If provided, encode(name, matrix) returns the value to output for matrix.
+    If record is provided, everything written is also appended to it.
+    """
+    with get_gh_output_path().open("a") as f:
+        start = f.tell()
+        recorded = len(record) if record is not None else 0
+
+        def write(text: str):
+            f.write(text)
+            if record is not None:
+                record.append(text)
+
+        try:
+            for name, matrix in matrices.items():
+                jobs = 0
+                size = 0
+
+                def count_jobs(items: Iterable[Dict]) -> Iterator[Dict]:
+                    nonlocal jobs
+                    for item in items:
+                        jobs += 1
+                        yield item
+
+                # (Compact JSON has no newlines, so never needs multiline syntax.)
+                write(f"{name}=")
+                # (Not all outputs are matrices: e.g., a --gh-matrix-stages count.)
+                value = matrix if isinstance(matrix, int) else count_jobs(matrix)
+                if encode is not None:
+                    value = encode(name, value)
+                for text in iterencode(value, separators=separators):
+                    write(text)
+                    size += len(text)
+                write("\n")
+                check_gh_output_limits(name, jobs, size)
+        except BaseException:
+            f.truncate(start)
+            if record is not None:
+                del record[recorded:]
+            raise
+
+
+def get_gh_output_path() -> pathlib.Path:
     gh_output = os.getenv("GITHUB_OUTPUT")
     if not gh_output:
         raise MissingDependency("GITHUB_OUTPUT environment variable not set")
+    return pathlib.Path(gh_output)
+
 
+def encode_gh_output(name: str, value: str) -> str:
+    """Return GITHUB_OUTPUT file content that sets output name to value"""
     if "\n" in value:
         # Use multiline syntax, with a random terminator
         eof = f"EOF-{uuid.uuid4()}"
-        encoded = f"{name}<<{eof}\n{value}\n{eof}\n"
+        return f"{name}<<{eof}\n{value}\n{eof}\n"
     else:
-        encoded = f"{name}={value}\n"
-
-    with pathlib.Path(gh_output).open("a") as f:
-        f.write(encoded)
+        return f"{name}={value}\n"
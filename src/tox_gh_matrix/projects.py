@@ -0,0 +1,90 @@
+"""
+Multi-project (monorepo) matrices, for python -m tox_gh_matrix --projects.
+
+Finds the tox.ini files under a root directory, builds each project's
+matrix (in parallel worker processes), and merges them into one matrix,
+with a `project` field on each item: the project's directory, relative
+to the root. Projects are merged in sorted path order, so the result
+doesn't depend on which workers finish first. A project whose matrix
+can't be built is reported (and left out), without affecting the others.
+"""
+
+import os
+import pathlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .api import build_matrix
+from .changes import walk_project
+
+
+def find_projects(root: pathlib.Path) -> List[pathlib.Path]:
+    """Return the tox.ini files under root, in sorted order"""
+    found = []
+    for dirpath, _dirnames, filenames in walk_project(str(root)):
+        if "tox.ini" in filenames:
+            found.append(pathlib.Path(dirpath, "tox.ini"))
+    return sorted(found, key=lambda path: path.parent.relative_to(root).parts)
+
+
+def project_name(ini_path: pathlib.Path, root: pathlib.Path) -> str:
+    """Return the `project` field for ini_path: its directory relative to root"""
+    return ini_path.parent.relative_to(root).as_posix()
+
+
+def build_project_matrix(
+    ini_path: str, args: Sequence[str], fast: bool, filters: Optional[List[str]]
+) -> Tuple[Optional[List[Dict]], Optional[str]]:
+    """
+    Return (matrix, None) for the project at ini_path,
+    or (None, error message) if it can't be built
+    """
+    try:
+        return build_matrix(ini_path, filters=filters, args=args, fast=fast), None
+    except (Exception, SystemExit) as error:
+        return None, f"{type(error).__name__}: {error}"
+
+
+def build_projects_matrix(
+    root: pathlib.Path,
+    args: Sequence[str] = (),
+    fast: bool = False,
+    filters: Optional[List[str]] = None,
+    jobs: Optional[int] = None,
+) -> Tuple[List[Dict], Dict[str, str]]:
+    """
+    Build and merge the matrices for all projects under root, using up to
+    jobs worker processes (default: one per CPU).
+
+    Returns the merged matrix, and project --> error message
+    for projects that couldn't be built.
+    """
+    ini_paths = find_projects(root)
+    ini_args = [str(path) for path in ini_paths]
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(ini_paths))
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            # (map returns the results in order, however they're scheduled.)
+            results = list(
+                executor.map(
+                    build_project_matrix, ini_args, repeat(args), repeat(fast), repeat(filters)
+                )
+            )
+    else:
+        results = [build_project_matrix(path, args, fast, filters) for path in ini_args]
+
+    matrix: List[Dict] = []
+    errors: Dict[str, str] = OrderedDict()
+    for ini_path, (project_matrix, error) in zip(ini_paths, results):
+        project = project_name(ini_path, root)
+        if error is not None:
+            errors[project] = error
+            continue
+        for item in project_matrix:
+            item["project"] = project
+            matrix.append(item)
+    return matrix, errors
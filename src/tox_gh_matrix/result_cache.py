@@ -0,0 +1,189 @@
+"""
+Cache of generated matrix outputs, keyed by a fingerprint of their inputs.
+
+The fingerprint covers everything known before tox parses its config:
+the contents of the config file (and setup files next to it), the
+tox-gh-matrix options, the environment variables the config uses,
+--gh-matrix-durations files, and the tox-gh-matrix, tox and Python versions.
+Inputs only known after parsing (like requirements files for cache keys)
+are recorded with each result and re-checked before it's used.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import re
+import sys
+from typing import Any, Dict, Iterable, Optional
+
+import tox
+from tox import reporter as report
+
+from . import __version__
+from .cache_keys import SETUP_FILES, file_digest
+from .history import find_junit_files
+
+# Directory of result files within the tox-gh-matrix cache dir
+RESULT_CACHE_DIRNAME = "results"
+
+# Bump this if the fingerprint inputs or result file format change.
+RESULT_CACHE_VERSION = 1
+
+# Limits on the result cache (least recently used results are evicted first)
+RESULT_CACHE_MAX_SIZE = 16 * 1024 * 1024  # bytes
+RESULT_CACHE_MAX_ENTRIES = 100
+
+# Length of the hex digest used as the fingerprint
+FINGERPRINT_LENGTH = 20
+
+# The GitHub output that's set to the fingerprint
+FINGERPRINT_OUTPUT = "gh-matrix-fingerprint"
+
+# Environment variables that always affect the matrix
+FINGERPRINT_ENVIRON = ("TOXENV", "TOX_SKIP_ENV", "PATH")
+
+# Tox options (other than --gh-matrix-*) that affect the matrix
+FINGERPRINT_OPTIONS = ("env", "discover")
+
+# --gh-matrix-* options that don't affect the outputs
+FINGERPRINT_IGNORED_OPTIONS = ("gh_matrix_timings",)
+
+# Like tox's {env:NAME} and {env:NAME:DEFAULT} substitutions
+ENV_SUBSTITUTION_RE = re.compile(r"{env:([^:}]+)")
+
+
+def result_fingerprint(option: Any, toxinipath: pathlib.Path, fast: bool = False) -> str:
+    """
+    Return the fingerprint of the matrix outputs for the tox config file
+    at toxinipath with (tox or FastParser) options.
+    """
+    data = result_fingerprint_data(option, toxinipath, fast)
+    digest = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()[:FINGERPRINT_LENGTH]
+
+
+def result_fingerprint_data(option: Any, toxinipath: pathlib.Path, fast: bool) -> Dict:
+    """Collect the (JSON-serializable) inputs to the result fingerprint"""
+    toxinipath = pathlib.Path(str(toxinipath))
+    try:
+        config_text = toxinipath.read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError):
+        config_text = ""
+    environ_names = set(FINGERPRINT_ENVIRON) | set(ENV_SUBSTITUTION_RE.findall(config_text))
+    options = {
+        name: value
+        for name, value in vars(option).items()
+        if (name.startswith("gh_matrix") or name in FINGERPRINT_OPTIONS)
+        and name not in FINGERPRINT_IGNORED_OPTIONS
+    }
+    return {
+        "version": RESULT_CACHE_VERSION,
+        "tox_gh_matrix": __version__,
+        "tox": tox.__version__,
+        "python": [sys.executable, sys.version, sys.platform],
+        "fast": fast,
+        "config": [toxinipath.name, file_digest(str(toxinipath))],
+        "setup_files": {
+            name: file_digest(str(toxinipath.with_name(name))) for name in SETUP_FILES
+        },
+        "options": options,
+        "environ": {name: os.environ.get(name) for name in sorted(environ_names)},
+        "durations": hash_files(
+            str(path) for path in find_junit_files(option.gh_matrix_durations or [])
+        ),
+    }
+
+
+def hash_files(paths: Iterable[str]) -> Dict[str, Optional[str]]:
+    """Return path --> content hash (None if missing) for paths"""
+    return {str(path): file_digest(str(path)) for path in paths}
+
+
+def result_path(results_dir: pathlib.Path, fingerprint: str) -> pathlib.Path:
+    return results_dir / f"{fingerprint}.json"
+
+
+def load_result(results_dir: pathlib.Path, fingerprint: str) -> Optional[Dict]:
+    """
+    Return the cached result for fingerprint, or None if there isn't one
+    (or it's invalid, or any of the files it was generated from have changed)
+    """
+    path = result_path(results_dir, fingerprint)
+    try:
+        with path.open(encoding="utf-8") as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (
+        not isinstance(result, dict)
+        or result.get("version") != RESULT_CACHE_VERSION
+        or result.get("fingerprint") != fingerprint
+    ):
+        return None
+    files = result.get("files", {})
+    if hash_files(files) != files:
+        report.verbosity1("tox-gh-matrix: cached result is out of date")
+        return None
+    try:
+        # Mark as recently used (for eviction).
+        os.utime(str(path))
+    except OSError:
+        pass
+    return result
+
+
+def save_result(
+    results_dir: pathlib.Path,
+    fingerprint: str,
+    result: Dict,
+    max_size: int = RESULT_CACHE_MAX_SIZE,
+    max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+):
+    """Store result for fingerprint (atomically), then evict old results"""
+    data = dict(result, version=RESULT_CACHE_VERSION, fingerprint=fingerprint)
+    path = result_path(results_dir, fingerprint)
+    try:
+        results_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(str(tmp_path), str(path))
+    except OSError as error:
+        # The cache is just an optimization; don't fail the run.
+        report.verbosity1(f"tox-gh-matrix: unable to save result cache: {error}")
+        return
+    evict_results(results_dir, max_size, max_entries)
+
+
+def evict_results(
+    results_dir: pathlib.Path,
+    max_size: int = RESULT_CACHE_MAX_SIZE,
+    max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+):
+    """
+    Remove the least recently used results until there are at most
+    max_entries, totalling at most max_size bytes
+    """
+    entries = []
+    for path in results_dir.glob("*.json"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+    entries.sort(key=lambda entry: entry[0], reverse=True)
+
+    kept = 0
+    size = 0
+    for _mtime, entry_size, path in entries:
+        if kept < max_entries and size + entry_size <= max_size:
+            kept += 1
+            size += entry_size
+            continue
+        try:
+            path.unlink()
+        except OSError:
+            pass
+        else:
+            report.verbosity2(f"tox-gh-matrix: evicted cached result {path.name}")
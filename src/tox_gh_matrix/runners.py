@@ -0,0 +1,100 @@
+"""
+Runner-aware matrix expansion, for --gh-matrix-runners.
+
+Rather than crossing an `os` matrix dimension with the whole envlist
+(which includes envs that tox would skip on some of those runners),
+each env gets a matrix item for each runner it can actually run on,
+with the runner's label in `runs_on`.
+
+An env can run on a runner if its tox `platform` setting (a regular
+expression matched against sys.platform) matches the runner's platform,
+and it doesn't have a factor naming some other platform (like `win`
+on a linux runner).
+"""
+
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import tox.config
+from tox.exception import ConfigError
+
+# (label, sys.platform of the runner)
+Runner = Tuple[str, str]
+
+# Runner label prefix --> sys.platform (for GitHub-hosted runner labels)
+LABEL_PLATFORMS = OrderedDict(
+    [
+        ("ubuntu", "linux"),
+        ("linux", "linux"),
+        ("windows", "win32"),
+        ("win", "win32"),
+        ("macos", "darwin"),
+        ("mac", "darwin"),
+    ]
+)
+
+# Conventional tox factor --> the sys.platform it's for
+PLATFORM_FACTORS = {
+    "linux": "linux",
+    "ubuntu": "linux",
+    "win": "win32",
+    "windows": "win32",
+    "win32": "win32",
+    "mac": "darwin",
+    "macos": "darwin",
+    "osx": "darwin",
+    "darwin": "darwin",
+}
+
+
+def parse_runners(spec: str) -> List[Runner]:
+    """
+    Parse a --gh-matrix-runners spec: comma-separated runner labels,
+    each optionally LABEL=PLATFORM to give its sys.platform (required
+    for labels that don't start with ubuntu, windows, macos, etc.)
+    """
+    runners = []
+    for runner_spec in spec.split(","):
+        label, sep, platform = (part.strip() for part in runner_spec.partition("="))
+        if not label:
+            continue
+        if not sep:
+            platform = label_platform(label)
+            if platform is None:
+                raise ConfigError(
+                    f"--gh-matrix-runners can't tell the platform of runner {label!r}"
+                    f" (use {label}=PLATFORM, e.g., {label}=linux)"
+                )
+        runners.append((label, platform))
+    if not runners:
+        raise ConfigError(f"--gh-matrix-runners {spec!r} doesn't list any runners")
+    return runners
+
+
+def label_platform(label: str) -> Optional[str]:
+    """Return the sys.platform for a GitHub runner label, or None if unknown"""
+    lower = label.lower()
+    for prefix, platform in LABEL_PLATFORMS.items():
+        if lower.startswith(prefix):
+            return platform
+    return None
+
+
+def env_runners(env: tox.config.TestenvConfig, runners: List[Runner]) -> List[str]:
+    """Return the labels of the runners env can run on"""
+    platform_re = getattr(env, "platform", None) or ".*"
+    factor_platforms = {
+        PLATFORM_FACTORS[factor] for factor in env.envname.split("-") if factor in PLATFORM_FACTORS
+    }
+    return [
+        label
+        for label, platform in runners
+        if re.match(platform_re, platform)
+        and (not factor_platforms or platform in factor_platforms)
+    ]
+
+
+def expand_runners(item: Dict, labels: List[str]) -> List[Dict]:
+    """Return a copy of item for each runner label, with runs_on"""
+    return [dict(item, runs_on=label) for label in labels]
@@ -0,0 +1,67 @@
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import tox.config
+from tox.exception import ConfigError
+
+from .filters import EnvFilter, make_env_filter
+
+ShardSpec = Tuple[EnvFilter, int]
+
+
+def parse_shard_count(value: str, source: str) -> int:
+    """Parse a shard count from source (for error messages), which must be >= 1"""
+    try:
+        count = int(value)
+    except ValueError:
+        count = 0
+    if count < 1:
+        raise ConfigError(f"{source} must be a positive number, not {value!r}")
+    return count
+
+
+def parse_shard_specs(specs: Iterable[str]) -> List[ShardSpec]:
+    """
+    Parse --gh-matrix-shards FILTER=N specs, where FILTER selects envs
+    (see filters.make_env_filter) and N is the number of shards.
+    """
+    parsed = []
+    for spec in specs:
+        filter_spec, sep, count = spec.rpartition("=")
+        if not sep or not filter_spec:
+            raise ConfigError(f"--gh-matrix-shards {spec!r} must be FILTER=N")
+        parsed.append((make_env_filter(filter_spec), parse_shard_count(count, spec)))
+    return parsed
+
+
+def get_shard_count(
+    env: tox.config.TestenvConfig,
+    shard_specs: List[ShardSpec],
+    durations: Optional[Dict[str, float]] = None,
+    target: Optional[float] = None,
+) -> int:
+    """
+    Return the number of shards for env: from the first matching
+    --gh-matrix-shards spec; else env's gh_matrix_shards setting;
+    else enough shards for each to take about target seconds, if
+    durations has timing data for env; else 1.
+    """
+    for env_filter, count in shard_specs:
+        if env_filter(env.envname):
+            return count
+    setting = getattr(env, "gh_matrix_shards", None)
+    if setting:
+        return parse_shard_count(setting, f"[testenv:{env.envname}] gh_matrix_shards")
+    if target and durations and env.envname in durations:
+        return max(1, math.ceil(durations[env.envname] / target))
+    return 1
+
+
+def shard_gh_item(item: Dict, total: int) -> List[Dict]:
+    """
+    Expand a matrix item into `total` items with shard.index (0-based)
+    and shard.total. (A single shard is left unchanged.)
+    """
+    if total <= 1:
+        return [item]
+    return [dict(item, shard={"index": index, "total": total}) for index in range(total)]
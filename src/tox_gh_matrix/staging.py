@@ -0,0 +1,91 @@
+"""
+Dependency-staged matrices, for --gh-matrix-stages.
+
+Splits each matrix output by tox's `depends`: stage 0 has the envs that
+don't depend on any other env in the matrix, stage 1 the envs that only
+depend on envs in stage 0, and so on. A workflow can then run one job
+per stage, each needing the one before.
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from tox.exception import ConfigError
+
+STAGE_SUFFIX = "-stage"
+STAGE_COUNT_SUFFIX = "-stages"
+
+
+def assign_stages(names: List[str], depends: Dict[str, List[str]]) -> Dict[str, int]:
+    """
+    Return name --> stage for names, where each name's stage is one more than
+    the latest stage of the names it depends on. Dependencies on names that
+    aren't in names are ignored. Raises ConfigError for a dependency cycle.
+    """
+    selected = set(names)
+    stages: Dict[str, int] = {}
+
+    def stage(name: str, visiting: Set[str]) -> int:
+        if name not in stages:
+            if name in visiting:
+                raise ConfigError(
+                    f"--gh-matrix-stages: envs {', '.join(sorted(visiting))}"
+                    " have circular depends"
+                )
+            visiting = visiting | {name}
+            requires = [dep for dep in depends.get(name, ()) if dep in selected and dep != name]
+            stages[name] = 1 + max((stage(dep, visiting) for dep in requires), default=-1)
+        return stages[name]
+
+    for name in names:
+        stage(name, set())
+    return stages
+
+
+def stage_gh_matrix(matrix: List[Dict], depends: Dict[str, List[str]]) -> List[List[Dict]]:
+    """
+    Split matrix into stages (see assign_stages). An item with aliases
+    (from --gh-matrix-dedup) also covers its aliases' dependents.
+    Items keep their original relative order within each stage.
+    """
+    # envname --> the name of the item that runs it
+    item_names: Dict[str, str] = OrderedDict()
+    for item in matrix:
+        item_names.setdefault(item["name"], item["name"])
+        for alias in item.get("aliases", ()):
+            item_names.setdefault(alias, item["name"])
+    item_depends: Dict[str, List[str]] = {}
+    for envname, name in item_names.items():
+        item_depends.setdefault(name, []).extend(
+            item_names[dep] for dep in depends.get(envname, ()) if dep in item_names
+        )
+    stages = assign_stages(list(unique_names(matrix)), item_depends)
+
+    staged: List[List[Dict]] = [[] for _ in range(max(stages.values(), default=-1) + 1)]
+    for item in matrix:
+        staged[stages[item["name"]]].append(item)
+    return staged
+
+
+def unique_names(matrix: List[Dict]) -> List[str]:
+    return list(OrderedDict.fromkeys(item["name"] for item in matrix))
+
+
+def stage_gh_outputs(
+    matrices: Dict[Optional[str], List[Dict]],
+    depends: Dict[str, List[str]],
+    default_name: str = "envlist",
+) -> Dict[str, object]:
+    """
+    Split each matrix into stages (see stage_gh_matrix) named NAME-stage0,
+    NAME-stage1, etc., and add a NAME-stages output with the number of stages.
+    (A matrix named None uses default_name.)
+    """
+    outputs: Dict[str, object] = OrderedDict()
+    for name, matrix in matrices.items():
+        name = default_name if name is None else name
+        stages = stage_gh_matrix(matrix, depends)
+        for number, stage in enumerate(stages):
+            outputs[f"{name}{STAGE_SUFFIX}{number}"] = stage
+        outputs[f"{name}{STAGE_COUNT_SUFFIX}"] = len(stages)
+    return outputs
@@ -0,0 +1,142 @@
+"""
+Phase timing instrumentation for --gh-matrix-timings.
+
+Code marks a phase with `with timed("name"):`. Unless timings have been
+started, that's a shared no-op context manager, so instrumented code
+costs close to nothing when --gh-matrix-timings is off.
+
+Phases can nest (and when the matrix is streamed, generating items
+happens inside writing the outputs), so each phase's time includes
+any phases within it.
+"""
+
+import json
+import pathlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# time.perf_counter() when tox started loading this plugin, and when it
+# called our tox_addoption and tox_configure hooks (see mark_time)
+MARKS: Dict[str, float] = {}
+
+
+class Timings:
+    """Wall time and call count for each phase (thread safe)"""
+
+    def __init__(self):
+        self.phases: Dict[str, List] = OrderedDict()  # name --> [calls, seconds]
+        self.lock = threading.Lock()
+
+    def add(self, name: str, seconds: float, calls: int = 1):
+        with self.lock:
+            phase = self.phases.setdefault(name, [0, 0.0])
+            phase[0] += calls
+            phase[1] += seconds
+
+    def as_list(self) -> List[Dict]:
+        with self.lock:
+            return [
+                {"name": name, "calls": calls, "seconds": round(seconds, 6)}
+                for name, (calls, seconds) in self.phases.items()
+            ]
+
+
+class TimedPhase:
+    """Context manager that adds its wall time to a phase"""
+
+    def __init__(self, timings: Timings, name: str):
+        self.timings = timings
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timings.add(self.name, time.perf_counter() - self.started)
+
+
+class UntimedPhase:
+    """No-op stand-in for TimedPhase"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+UNTIMED_PHASE = UntimedPhase()
+
+# The active Timings, if recording
+_timings: Optional[Timings] = None
+
+
+def timed(name: str):
+    """Return a context manager that times phase name (if recording timings)"""
+    if _timings is None:
+        return UNTIMED_PHASE
+    return TimedPhase(_timings, name)
+
+
+def timings_enabled() -> bool:
+    return _timings is not None
+
+
+def mark_time(name: str):
+    """Remember when name happened (cheap enough to do unconditionally)"""
+    MARKS[name] = time.perf_counter()
+
+
+def start_timings() -> Timings:
+    """
+    Start recording timings, with phases for what happened before
+    (from MARKS): importing the plugin, and parsing the tox config
+    """
+    global _timings
+    _timings = Timings()
+    now = time.perf_counter()
+    marks = [("import", "plugin import"), ("addoption", "config parse"), ("configure", None)]
+    for (mark, phase), (next_mark, _) in zip(marks, marks[1:]):
+        if mark in MARKS:
+            _timings.add(phase, MARKS.get(next_mark, now) - MARKS[mark])
+    return _timings
+
+
+def stop_timings() -> Optional[Timings]:
+    """Stop recording timings, and return what was recorded"""
+    global _timings
+    timings, _timings = _timings, None
+    return timings
+
+
+def format_timings_table(phases: List[Dict]) -> List[str]:
+    """Return lines of a text table of phases (from Timings.as_list)"""
+    width = max([len("phase")] + [len(phase["name"]) for phase in phases])
+    lines = [f"  {'phase':{width}}  {'calls':>6}  {'seconds':>9}"]
+    for phase in phases:
+        lines.append(f"  {phase['name']:{width}}  {phase['calls']:>6}  {phase['seconds']:>9.4f}")
+    return lines
+
+
+def format_timings_markdown(phases: List[Dict]) -> str:
+    """Return a GitHub step summary section for phases (from Timings.as_list)"""
+    lines = [
+        "### tox-gh-matrix timings",
+        "",
+        "| Phase | Calls | Seconds |",
+        "| --- | ---: | ---: |",
+    ]
+    for phase in phases:
+        lines.append(f"| {phase['name']} | {phase['calls']} | {phase['seconds']:.4f} |")
+    return "\n".join(lines) + "\n\n"
+
+
+def write_timings_profile(path: pathlib.Path, phases: List[Dict]):
+    """Write phases (from Timings.as_list) to path as a JSON profile"""
+    with path.open("w", encoding="utf-8") as f:
+        json.dump({"phases": phases}, f, indent=2)
+        f.write("\n")
@@ -1,5 +1,7 @@
+import functools
 import re
 import sys
+from typing import Dict, Optional
 
 from tox.interpreters import InterpreterInfo
 
@@ -7,7 +9,38 @@ from tox.interpreters import InterpreterInfo
 # if the testenv doesn't ask for something more specific.
 TOX_DEFAULT_BASEPYTHON = sys.executable
 
+# (See `basepython_default` in tox.config for potential values
+# of basepython, from tox factors like py310 or pypy38.)
+BASEPYTHON_RE = re.compile(r"(python|pypy|jython)(\d+(\.\d+)?)?")
+# GH python-version strings basepython_to_gh_python_version generates for N.M versions
+GH_PYTHON_VERSION_RE = re.compile(r"(|pypy-|jython-)(\d+\.\d+)")
 
+# The same few basepythons (and interpreters) tend to repeat
+# across all the envs in a large envlist.
+VERSION_CACHE_SIZE = 256
+
+
+def gh_python_config(basepython: str, python_info=None) -> Optional[Dict[str, str]]:
+    """
+    Return the matrix `python` field for a tox basepython:
+    {"version": GH python-version, "spec": a prerelease-inclusive spec,
+    "installed": the version of python_info (if it's an InterpreterInfo)};
+    or None if basepython doesn't call for a specific Python version.
+
+    >>> gh_python_config("python3.10")
+    {'version': '3.10', 'spec': '3.10.0-alpha - 3.10'}
+    """
+    version = basepython_to_gh_python_version(basepython)
+    if not version:
+        return None
+    python = {"version": version, "spec": python_version_to_prerelease_spec(version)}
+    if isinstance(python_info, InterpreterInfo):
+        # Some version of basepython is installed on this system.
+        python["installed"] = interpreter_info_to_version(python_info)
+    return python
+
+
+@functools.lru_cache(maxsize=VERSION_CACHE_SIZE)
 def basepython_to_gh_python_version(basepython: str) -> str:
     """
     Map a tox TestenvConfig basepython string to a
@@ -15,13 +48,11 @@ def basepython_to_gh_python_version(basepython: str) -> str:
 
     E.g.: "python3.10" --> "3.10" or "pypy3.8" --> "pypy-3.8"
     """
-    # (See `basepython_default` in tox.config for potential values
-    # of basepython, from tox factors like py310 or pypy38.)
     # ??? Maybe use tox.interpreters.py_spec.PythonSpec.from_name instead?
     if basepython == TOX_DEFAULT_BASEPYTHON:
         return ""
 
-    match = re.fullmatch(r"(python|pypy|jython)(\d+(\.\d+)?)?", basepython)
+    match = BASEPYTHON_RE.fullmatch(basepython)
     if not match:
         raise ValueError(f"Unexpected basepython format {basepython!r}")
 
@@ -35,14 +66,27 @@ def basepython_to_gh_python_version(basepython: str) -> str:
         return implementation
 
 
+@functools.lru_cache(maxsize=VERSION_CACHE_SIZE)
 def python_version_to_prerelease_spec(python: str) -> str:
     """
     Expand a python-version string to allow prerelease Python,
-    using SemVer ranges. (Doesn't currently handle pypy.)
+    using SemVer ranges.
 
     >>> python_version_to_prerelease_spec("3.7")
     '3.7.0-alpha - 3.7'
 
+    setup-python selects PyPy by the Python version it implements
+    ("pypy-3.8" is the latest PyPy release for Python 3.8), but its PyPy
+    forms don't accept SemVer ranges: a prerelease must be named exactly
+    ("pypy-3.7-v7.3.3rc1"), or be a nightly ("pypy3.9-nightly"), and
+    neither falls back to a release. So there's no prerelease-inclusive
+    spec for PyPy, and it's left as-is. (setup-python doesn't support
+    Jython at all.)
+    >>> python_version_to_prerelease_spec("pypy-3.8")
+    'pypy-3.8'
+    >>> python_version_to_prerelease_spec("jython-3.5")
+    'jython-3.5'
+
     Only handles tox-factor-generated N.M versions
     (not N and not N.M.P):
     >>> python_version_to_prerelease_spec("3")
@@ -50,22 +94,33 @@ def python_version_to_prerelease_spec(python: str) -> str:
     >>> python_version_to_prerelease_spec("3.5.7")
     '3.5.7'
     """
-    match = re.fullmatch(r"^(|pypy-|jython-)(\d+\.\d+)$", python)
+    match = GH_PYTHON_VERSION_RE.fullmatch(python)
     if match:
         implementation = match[1]
         version = match[2]
         if implementation == "":
-            python = f"{implementation}{version}.0-alpha - {version}"
+            python = f"{version}.0-alpha - {version}"
     return python
 
 
 def interpreter_info_to_version(python_info: InterpreterInfo) -> str:
     """Format a GH python-version string from tox InterpreterInfo"""
-    version = format_version_info(python_info.version_info)
-    if python_info.extra_version_info:
-        extra_version = format_version_info(python_info.extra_version_info)
+    extra_version_info = python_info.extra_version_info
+    return implementation_version(
+        python_info.implementation,
+        tuple(python_info.version_info),
+        tuple(extra_version_info) if extra_version_info else None,
+    )
+
+
+@functools.lru_cache(maxsize=VERSION_CACHE_SIZE)
+def implementation_version(implementation: str, version_info, extra_version_info) -> str:
+    """Format a GH python-version string from (hashable) interpreter version fields"""
+    version = format_version_info(version_info)
+    if extra_version_info:
+        extra_version = format_version_info(extra_version_info)
         version = f"{version}-{extra_version}"
-    implementation = python_info.implementation.lower()
+    implementation = implementation.lower()
     if implementation != "cpython":
         version = f"{implementation}-{version}"
     return version
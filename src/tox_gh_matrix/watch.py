@@ -0,0 +1,204 @@
+"""
+Watch mode, for --gh-matrix-watch.
+
+Polls the tox config files for changes, and after each change re-parses
+the config and shows a diff of the matrix: added, removed and changed
+items (with each changed field, like python.spec). Items for envs whose
+effective config didn't change are reused from the previous matrix,
+rather than computed again (which can mean probing interpreters).
+"""
+
+import json
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import tox.config
+from tox import reporter as report
+
+from .cache_keys import file_digest, hash_file
+from .dedup import env_fingerprint
+
+# Files (in toxinidir) that can change the tox config
+WATCHED_FILES = ("tox.ini", "setup.cfg", "pyproject.toml")
+
+DEFAULT_WATCH_INTERVAL = 1.0  # seconds
+
+# Matrix item identity: (name, runs_on, shard index)
+ItemKey = Tuple[str, Optional[str], Optional[int]]
+
+# Set while re-parsing the config, so the plugin doesn't handle it as a command
+_reparsing = False
+
+
+def is_reparsing() -> bool:
+    return _reparsing
+
+
+def reparse_config(config: tox.config.Config) -> tox.config.Config:
+    """Parse config's tox config again (with the same command line)"""
+    global _reparsing
+    _reparsing = True
+    try:
+        return tox.config.parseconfig(list(config.args))
+    finally:
+        _reparsing = False
+
+
+def watched_paths(config: tox.config.Config) -> List[str]:
+    paths = [str(config.toxinipath)]
+    for name in WATCHED_FILES:
+        path = str(config.toxinidir.join(name))
+        if path not in paths:
+            paths.append(path)
+    return paths
+
+
+def snapshot(paths: Iterable[str]) -> Dict[str, Optional[str]]:
+    """Return path --> content digest (None if missing) for paths"""
+    return {path: file_digest(path) for path in paths}
+
+
+def item_key(item: Dict) -> ItemKey:
+    return (item["name"], item.get("runs_on"), item.get("shard", {}).get("index"))
+
+
+def diff_items(old: Dict, new: Dict, prefix: str = "") -> List[str]:
+    """Describe the differences between two matrix items, one field per line"""
+    lines = []
+    for key in list(old) + [key for key in new if key not in old]:
+        path = f"{prefix}{key}"
+        before, after = old.get(key), new.get(key)
+        if before == after:
+            continue
+        if isinstance(before, dict) and isinstance(after, dict):
+            lines.extend(diff_items(before, after, prefix=f"{path}."))
+        else:
+            lines.append(f"{path}: {json.dumps(before)} -> {json.dumps(after)}")
+    return lines
+
+
+def describe_key(key: ItemKey) -> str:
+    name, runs_on, shard = key
+    return name + (f" on {runs_on}" if runs_on else "") + (f" shard {shard}" if shard else "")
+
+
+def diff_matrices(old: List[Dict], new: List[Dict]) -> List[str]:
+    """Describe the items added to, removed from and changed between two matrices"""
+    old_items = OrderedDict((item_key(item), item) for item in old)
+    new_items = OrderedDict((item_key(item), item) for item in new)
+    lines = []
+    for key, item in new_items.items():
+        if key not in old_items:
+            lines.append(f"+ {describe_key(key)}: {json.dumps(item)}")
+    for key in old_items:
+        if key not in new_items:
+            lines.append(f"- {describe_key(key)}")
+    for key, item in new_items.items():
+        if key in old_items and item != old_items[key]:
+            lines.append(f"~ {describe_key(key)}")
+            lines.extend(f"    {line}" for line in diff_items(old_items[key], item))
+    if [item_key(item) for item in old if item_key(item) in new_items] != [
+        key for key in new_items if key in old_items
+    ]:
+        lines.append("(items reordered)")
+    return lines
+
+
+class MatrixWatcher:
+    """
+    Builds the matrix for successive versions of a tox config, reusing the
+    items for envs whose (fingerprinted) config is unchanged.
+
+    build(config, env_filter) generates matrix items (like iter_gh_matrix),
+    and select(config) the envconfigs they're built from, in matrix order.
+    If incremental is False (for options that relate envs to each other,
+    like --gh-matrix-dedup), every env is rebuilt each time.
+    """
+
+    def __init__(self, build: Callable, select: Callable, incremental: bool = True):
+        self.build = build
+        self.select = select
+        self.incremental = incremental
+        self.fingerprints: Dict[str, str] = {}
+        self.items: Dict[str, List[Dict]] = {}  # envname --> its items
+        self.rebuilt: Set[str] = set()  # envnames built (not reused) last time
+
+    def update(self, config: tox.config.Config) -> List[Dict]:
+        """Return (and remember) the matrix for config"""
+        # Files referenced by the config may have changed, too.
+        hash_file.cache_clear()
+        if not self.incremental:
+            matrix = list(self.build(config, None))
+            self.rebuilt = {item["name"] for item in matrix}
+            return matrix
+
+        fingerprints = OrderedDict(
+            (env.envname, env_fingerprint(env)) for env in self.select(config)
+        )
+        changed = {
+            name
+            for name, fingerprint in fingerprints.items()
+            if name not in self.fingerprints or self.fingerprints[name] != fingerprint
+        }
+        built: Dict[str, List[Dict]] = {}
+        if changed:
+            for item in self.build(config, lambda envname: envname in changed):
+                built.setdefault(item["name"], []).append(item)
+
+        items: Dict[str, List[Dict]] = OrderedDict()
+        for name in fingerprints:
+            env_items = built.get(name) if name in changed else self.items.get(name)
+            if env_items:
+                items[name] = env_items
+        self.fingerprints = fingerprints
+        self.items = items
+        self.rebuilt = changed
+        return [item for env_items in items.values() for item in env_items]
+
+
+def watch_gh_matrix(
+    config: tox.config.Config,
+    watcher: MatrixWatcher,
+    interval: float = DEFAULT_WATCH_INTERVAL,
+    sleep: Optional[Callable[[float], None]] = None,
+    max_polls: Optional[int] = None,
+):
+    """
+    Show config's matrix, then poll its files every interval seconds,
+    showing a diff of the matrix after each change (until interrupted,
+    or max_polls polls).
+    """
+    if sleep is None:
+        sleep = time.sleep
+    matrix = watcher.update(config)
+    report.line(json.dumps(matrix, indent=2))
+    paths = watched_paths(config)
+    report.line(f"tox-gh-matrix: watching {', '.join(paths)} (Ctrl-C to stop)")
+    files = snapshot(paths)
+    polls = 0
+    while max_polls is None or polls < max_polls:
+        sleep(interval)
+        polls += 1
+        current = snapshot(paths)
+        if current == files:
+            continue
+        files = current
+        try:
+            config = reparse_config(config)
+            new_matrix = watcher.update(config)
+        except Exception as error:  # (Keep watching: the config may be mid-edit.)
+            # (Tox's errors start with their type, and can include a traceback.)
+            message = (str(error).splitlines() or [""])[0]
+            if not message.startswith(type(error).__name__):
+                message = f"{type(error).__name__}: {message}"
+            report.error(f"tox-gh-matrix: {message}")
+            continue
+        lines = diff_matrices(matrix, new_matrix)
+        matrix = new_matrix
+        report.line(
+            f"tox-gh-matrix: config changed ({len(new_matrix)} items,"
+            f" {len(watcher.rebuilt)} envs rebuilt)"
+        )
+        for line in lines or ["no matrix changes"]:
+            report.line(line)
@@ -43,3 +43,11 @@ def ignore_extra_kwargs():
         return _func(*args, **supported_kwargs)
 
     yield _call
+
+
+@pytest.fixture(autouse=True)
+def gh_matrix_cache_dir(tmp_path, monkeypatch):
+    """Keep tox-gh-matrix's on-disk caches out of the user's home dir during tests"""
+    cache_dir = tmp_path / "tox-gh-matrix-cache"
+    monkeypatch.setenv("TOX_GH_MATRIX_CACHE_DIR", str(cache_dir))
+    yield cache_dir
@@ -2,11 +2,10 @@
 import re
 import uuid
 from pathlib import Path
-from typing import Dict, Tuple
 
 import pytest
-from tox.interpreters import InterpreterInfo, Interpreters, NoInterpreterInfo
-from tox.interpreters.py_spec import PythonSpec
+
+from mock_interpreters import MockInterpreters
 
 
 @pytest.fixture
@@ -26,7 +25,7 @@ def tox_ini(initproj):
 
 
 @pytest.fixture
-def mock_interpreter(monkeypatch, ignore_extra_kwargs):
+def mock_interpreter(monkeypatch):
     """
     Override the Python interpreters that tox discovers.
 
@@ -45,65 +44,9 @@ def mock_interpreter(monkeypatch, ignore_extra_kwargs):
         # Now cmd() will _also_ find PyPy 3.8.0-final.0-3.7.0.final.0
     """
 
-    # basepython --> InterpreterInfo
-    interpreter_infos: Dict[str, InterpreterInfo] = {}
-
-    def mock_get_info(_self, envconfig):
-        name = envconfig.basepython
-        try:
-            return interpreter_infos[name]
-        except KeyError:
-            return NoInterpreterInfo(name=name)
-
-    monkeypatch.setattr(Interpreters, "get_info", mock_get_info)
-
-    def mock_get_executable(_self, envconfig):
-        name = envconfig.basepython
-        try:
-            return interpreter_infos[name].executable
-        except KeyError:
-            return None
-
-    monkeypatch.setattr(Interpreters, "get_executable", mock_get_executable)
-
-    def install(
-        name: str,
-        *,
-        version_info: Tuple[int, int, int, str, int] = None,
-        extra_version_info: Tuple[int, int, int, str, int] = None,
-        platform=None,
-    ):
-        spec = PythonSpec.from_name(name)
-        if version_info is None:
-            version_info = (spec.major, spec.minor, 0, "final", 0)
-        if version_info[:2] != (spec.major, spec.minor):
-            raise ValueError(f"{name} couldn't have version_info={version_info!r}")
-
-        implementation = {
-            "python": "CPython",
-            "pypy": "PyPy",
-            "jython": "Jython",
-            "ipython": "IronPython",
-        }.get(spec.name, spec.name)
-
-        if extra_version_info is None and implementation == "PyPy":
-            # PyPy always has extra_version_info.
-            extra_version_info = (3, 7, 0, "final", 0)
-
-        # (InterpreterInfo constructor has changed required kwargs
-        # over time, in ways which aren't relevant to this plugin.)
-        interpreter_infos[name] = ignore_extra_kwargs(
-            InterpreterInfo,
-            implementation=implementation,
-            executable=f"/mock_interpreter/{name}/python",
-            version_info=version_info,
-            sysplatform=platform if platform is not None else "linux",
-            is_64=True,
-            os_sep={"win32": "\\"}.get(platform, "/"),
-            extra_version_info=extra_version_info,
-        )
-
-    yield install
+    interpreters = MockInterpreters()
+    interpreters.patch(monkeypatch.setattr)
+    yield interpreters.install
 
 
 def parse_github_action_envfile(content: str) -> dict:
@@ -115,9 +58,9 @@ def parse_github_action_envfile(content: str) -> dict:
     items = {}
     for match in re.finditer(
         # name=value | name<<EOF\nvalue...\n...\nEOF
-        r"(^(?P<sname>\w+)=(?P<svalue>.*)\n)"
+        r"(^(?P<sname>[\w-]+)=(?P<svalue>.*)\n)"
         r"|"
-        r"(^(?P<mname>\w+)<<(?P<eof>.*)\n(?P<mvalue>(?s:.*))^(?P=eof)\n)",
+        r"(^(?P<mname>[\w-]+)<<(?P<eof>.*)\n(?P<mvalue>(?s:.*))^(?P=eof)\n)",
         content,
         re.MULTILINE,
     ):
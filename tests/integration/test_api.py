@@ -0,0 +1,122 @@
+import io
+import json
+import subprocess
+import sys
+from textwrap import dedent
+
+import pytest
+import tox.config
+
+from tox_gh_matrix import build_matrix, load_config
+from tox_gh_matrix.__main__ import main
+from tox_gh_matrix.plugin import tox_config_to_gh_matrix
+
+TOX_INI = """
+    [tox]
+    envlist = py{38,39}-{unit,integration},lint
+    [testenv]
+    ignore_outcome =
+        integration: true
+"""
+
+
+@pytest.fixture
+def ini_path(tmp_path):
+    path = tmp_path / "tox.ini"
+    path.write_text(dedent(TOX_INI))
+    yield path
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_build_matrix(ini_path, mock_interpreter, fast):
+    mock_interpreter("python3.9", version_info=(3, 9, 7, "final", 0))
+    expected = tox_config_to_gh_matrix(tox.config.parseconfig(["-c", str(ini_path)]))
+    assert build_matrix(ini_path, fast=fast) == expected
+    assert build_matrix(str(ini_path.parent), fast=fast) == expected
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_filters(ini_path, mock_interpreter, fast):
+    def names(matrix):
+        return [item["name"] for item in matrix]
+
+    config = load_config(ini_path, fast=fast)
+    assert config.envlist == [
+        "py38-unit",
+        "py38-integration",
+        "py39-unit",
+        "py39-integration",
+        "lint",
+    ]
+    assert names(config.build_matrix(filters=["py39-unit"])) == ["py39-unit"]
+    assert names(config.build_matrix(filters=["lint", "re:py38-"])) == [
+        "py38-unit",
+        "py38-integration",
+        "lint",
+    ]
+    assert names(config.build_matrix(filters=[lambda name: "-" not in name])) == ["lint"]
+    assert names(config.build_matrix(filters=[])) == config.envlist
+
+
+def test_args(ini_path, mock_interpreter):
+    matrix = build_matrix(ini_path, args=["-e", "lint", "--gh-matrix-cache-keys"])
+    assert [item["name"] for item in matrix] == ["lint"]
+    assert matrix[0]["cache_key"].startswith("lint-")
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_fields(ini_path, fast):
+    config = load_config(ini_path, args=["--gh-matrix-fields=factors"], fast=fast)
+    assert config.build_matrix(filters=["lint"]) == [{"name": "lint", "factors": ["lint"]}]
+    assert config.build_matrix(filters=["py39-unit"], fields=["python.version"]) == [
+        {"name": "py39-unit", "python": {"version": "3.9"}}
+    ]
+
+
+def test_cache_keys_files(ini_path, mock_interpreter):
+    """Requirements file changes between builds from the same config change the cache keys"""
+    ini_path.write_text(ini_path.read_text() + "deps = -rrequirements.txt\n")
+    requirements = ini_path.parent / "requirements.txt"
+    requirements.write_text("pytest\n")
+    config = load_config(ini_path, args=["--gh-matrix-cache-keys"])
+    first = config.build_matrix(filters=["lint"], fields=["cache_key"])
+    requirements.write_text("pytest\ncoverage\n")
+    second = config.build_matrix(filters=["lint"], fields=["cache_key"])
+    assert second[0]["cache_key"] != first[0]["cache_key"]
+
+
+def test_baseline_fingerprints(ini_path):
+    """Source changes between builds from the same config change the fingerprints"""
+    baseline = ini_path.parent / "baseline.json"
+    config = load_config(ini_path, args=[f"--gh-matrix-baseline={baseline}"])
+    first = config.build_matrix(filters=["lint"], fields=["name"])
+    assert config.build_matrix(filters=["lint"], fields=["name"]) == first
+    (ini_path.parent / "module.py").write_text("x = 1\n")
+    second = config.build_matrix(filters=["lint"], fields=["name"])
+    assert second[0]["fingerprint"] != first[0]["fingerprint"]
+
+
+def test_command_args_not_allowed(ini_path):
+    with pytest.raises(ValueError, match="--gh-matrix"):
+        load_config(ini_path, args=["--gh-matrix=envlist"])
+
+
+def test_import_is_lazy():
+    # (In a fresh process, since tests have already imported tox.)
+    code = "import sys, tox_gh_matrix; print('tox' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], stdout=subprocess.PIPE, check=True, universal_newlines=True
+    )
+    assert result.stdout.strip() == "False"
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_main_batch(ini_path, mock_interpreter, monkeypatch, capsys, fast):
+    monkeypatch.setattr("sys.stdin", io.StringIO("py39-unit\n\nre:lint\n"))
+    main(["--fast", "--batch", str(ini_path)] if fast else ["--batch", str(ini_path)])
+    lines = capsys.readouterr().out.splitlines()[-3:]
+    assert [[item["name"] for item in json.loads(line)] for line in lines] == [
+        ["py39-unit"],
+        ["py38-unit", "py38-integration", "py39-unit", "py39-integration", "lint"],
+        ["lint"],
+    ]
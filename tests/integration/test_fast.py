@@ -0,0 +1,258 @@
+import json
+from pathlib import Path
+from textwrap import dedent
+
+import pytest
+import tox.config
+from tox.exception import ConfigError
+
+from tox_gh_matrix.__main__ import main, make_fast_parser
+from tox_gh_matrix.fast import expand_envlist, parse_fast_config
+from tox_gh_matrix.plugin import tox_config_to_gh_matrix
+
+REPO_TOX_INI = Path(__file__).parents[2] / "tox.ini"
+
+TOX_INIS = {
+    "factors": """
+        [tox]
+        envlist = django{32,40}-py{38,39},docs
+    """,
+    "multiline": """
+        [tox]
+        envlist =
+            # comment
+            py{36,37}-{unix, win}  # trailing comment
+            pypy{37,38}, jython
+            lint
+    """,
+    "basepython": """
+        [tox]
+        envlist = check,build,lint-old
+        [testenv]
+        basepython =
+            old: python3.6
+            !old: python3.9
+        [testenv:build]
+        basepython = python3.9
+    """,
+    "ignore_basepython_conflict": """
+        [tox]
+        envlist = py38,py39
+        ignore_basepython_conflict = true
+        [testenv]
+        basepython = python3.10
+    """,
+    "ignore_outcome": """
+        [tox]
+        envlist = py{38,311},dev,exp
+        [testenv]
+        ignore_outcome =
+            py311: {env:TOX_GH_MATRIX_TEST_UNSET:true}
+        [testenv:dev]
+        ignore_outcome = true
+        [testenv:exp]
+        ignore_outcome = {[testenv:dev]ignore_outcome}
+    """,
+    "platform": """
+        [tox]
+        envlist = lint,test-{linux,win,mac}
+        [testenv:lint]
+        platform = {env:TOX_GH_MATRIX_TEST_UNSET:linux|darwin}
+    """,
+    "depends": """
+        [tox]
+        envlist = lint,py{38,39},coverage
+        [testenv:coverage]
+        depends =
+            py{38,39}
+            lint
+    """,
+    "shards": """
+        [tox]
+        envlist = py{38,39}-{unit,integration}
+        [testenv]
+        gh_matrix_shards =
+            integration: 3
+        [testenv:py39-unit]
+        gh_matrix_shards = {env:TOX_GH_MATRIX_TEST_UNSET:2}
+    """,
+    "paths": """
+        [tox]
+        envlist = py39,docs
+        [testenv]
+        gh_matrix_paths =
+            src
+            !docs: tests
+        [testenv:docs]
+        gh_matrix_paths = docs
+    """,
+    "install": """
+        [tox]
+        envlist = py{38,39}-django{32,40},lint,docs
+        indexserver =
+            alternate = https://example.com/simple
+        [testenv]
+        deps =
+            django32: Django~=3.2  # LTS
+            django40: Django~=4.0
+            -r{toxinidir}/requirements.txt
+            -c constraints.txt
+            :alternate: extra-package
+        extras = test
+        usedevelop = py39: true
+        install_command = python -m pip install --no-compile {opts} {packages}
+        [testenv:lint]
+        skip_install = true
+        deps = flake8
+        [testenv:docs]
+        extras =
+            docs
+            test
+    """,
+    "no_envlist": """
+        [tox]
+        isolated_build = true
+        [testenv:lint]
+        [testenv:py{38,39}-test]
+    """,
+    "empty": """
+        [tox]
+    """,
+}
+
+
+@pytest.fixture(params=sorted(TOX_INIS))
+def ini_path(request, tmp_path):
+    path = tmp_path / "tox.ini"
+    path.write_text(dedent(TOX_INIS[request.param]))
+    yield path
+
+
+def plugin_matrix(ini_path, *args):
+    config = tox.config.parseconfig(["-c", str(ini_path), *args])
+    return tox_config_to_gh_matrix(config)
+
+
+def fast_matrix(ini_path, *args):
+    parser = make_fast_parser()
+    option = parser.parse_args(list(args))
+    config = parse_fast_config(option, str(ini_path), parser.testenv_attributes)
+    return tox_config_to_gh_matrix(config)
+
+
+def test_conformance(ini_path, mock_interpreter):
+    mock_interpreter("python3.9", version_info=(3, 9, 7, "final", 0))
+    mock_interpreter("pypy3.8")
+    assert fast_matrix(ini_path) == plugin_matrix(ini_path)
+
+
+def test_conformance_cache_keys(ini_path, mock_interpreter):
+    (ini_path.parent / "requirements.txt").write_text("pytest\n")
+    assert fast_matrix(ini_path, "--gh-matrix-cache-keys") == plugin_matrix(
+        ini_path, "--gh-matrix-cache-keys"
+    )
+
+
+def test_conformance_runners(ini_path, mock_interpreter):
+    args = ["--gh-matrix-runners=ubuntu-latest,windows-latest,macos-latest"]
+    assert fast_matrix(ini_path, *args) == plugin_matrix(ini_path, *args)
+
+
+def test_conformance_repo_tox_ini(tmp_path, mock_interpreter):
+    # (No mock interpreters installed: the plugin path needs real ones
+    # to resolve {envsitepackagesdir} in this tox.ini's commands.)
+    path = tmp_path / "tox.ini"
+    path.write_text(REPO_TOX_INI.read_text())
+    assert fast_matrix(path, "--gh-matrix-cache-keys") == plugin_matrix(
+        path, "--gh-matrix-cache-keys"
+    )
+
+
+@pytest.mark.parametrize(
+    "args,toxenv,skip_env",
+    [
+        (["-e", "py38,unknown-env"], None, None),
+        (["-e", "py39", "-e", "py{36,37}"], None, None),
+        ([], "py38,lint", None),
+        ([], "ALL", None),
+        ([], None, ".*-win"),
+        (["--gh-matrix-order=duration"], None, None),
+    ],
+)
+def test_conformance_env_selection(
+    ini_path, mock_interpreter, monkeypatch, args, toxenv, skip_env
+):
+    if toxenv is not None:
+        monkeypatch.setenv("TOXENV", toxenv)
+    if skip_env is not None:
+        monkeypatch.setenv("TOX_SKIP_ENV", skip_env)
+    assert fast_matrix(ini_path, *args) == plugin_matrix(ini_path, *args)
+
+
+def test_setup_cfg(tmp_path, mock_interpreter):
+    (tmp_path / "setup.cfg").write_text(dedent("""
+                [tox:tox]
+                envlist = py{38,39},docs
+            """))
+    assert fast_matrix(tmp_path) == plugin_matrix(tmp_path / "setup.cfg")
+
+
+def test_main_fast(tmp_path, mock_interpreter, github_output):
+    (tmp_path / "tox.ini").write_text("[tox]\nenvlist = lint,py39\n")
+    with pytest.raises(SystemExit) as exc_info:
+        main(["--fast", str(tmp_path / "tox.ini"), "--gh-matrix=custom"])
+    assert exc_info.value.code == 0
+    assert json.loads(github_output()["custom"]) == [
+        {"name": "lint", "factors": ["lint"]},
+        {
+            "name": "py39",
+            "factors": ["py39"],
+            "python": {"version": "3.9", "spec": "3.9.0-alpha - 3.9"},
+        },
+    ]
+
+
+def test_dedup_not_supported(tmp_path):
+    (tmp_path / "tox.ini").write_text("[tox]\nenvlist = lint,py39\n")
+    with pytest.raises(ConfigError, match="--gh-matrix-dedup"):
+        fast_matrix(tmp_path, "--gh-matrix-dedup")
+
+
+def test_baseline_not_supported(tmp_path):
+    (tmp_path / "tox.ini").write_text("[tox]\nenvlist = lint,py39\n")
+    with pytest.raises(ConfigError, match="--gh-matrix-baseline"):
+        fast_matrix(tmp_path, f"--gh-matrix-baseline={tmp_path / 'baseline.json'}")
+
+
+def test_expand_envlist():
+    assert expand_envlist("py{38,39}-django{32,40}, docs  # comment") == [
+        "py38-django32",
+        "py38-django40",
+        "py39-django32",
+        "py39-django40",
+        "docs",
+    ]
+    assert expand_envlist("py{ 36 , 37 }\n\n# only comment\nlint") == ["py36", "py37", "lint"]
+    assert expand_envlist(None) == []
+
+
+@pytest.mark.parametrize("fast", [True, False])
+def test_main_result_cache(tmp_path, mock_interpreter, github_output, monkeypatch, fast):
+    """A cached result is found before parsing the tox config"""
+    (tmp_path / "tox.ini").write_text("[tox]\nenvlist = lint,py39\n")
+    args = [str(tmp_path / "tox.ini"), "--gh-matrix", "--gh-matrix-result-cache"]
+    if fast:
+        args.insert(0, "--fast")
+    with pytest.raises(SystemExit):
+        main(args)
+    expected = github_output()
+
+    def not_called(*args, **kwargs):
+        raise AssertionError("tox config parsed despite cached result")
+
+    monkeypatch.setattr("tox_gh_matrix.__main__.parse_fast_config", not_called)
+    monkeypatch.setattr("tox.cmdline", not_called)
+    with pytest.raises(SystemExit) as exc_info:
+        main(args)
+    assert exc_info.value.code == 0
+    assert github_output() == expected
@@ -0,0 +1,132 @@
+import json
+from textwrap import dedent
+
+import pytest
+
+from tox_gh_matrix.__main__ import main, split_command_args
+from tox_gh_matrix.projects import build_projects_matrix
+
+PROJECTS = {
+    "core": """
+        [tox]
+        envlist = py{38,39},lint
+    """,
+    "plugins/extra": """
+        [tox]
+        envlist = py39-extra
+    """,
+    "docs": """
+        [tox]
+        envlist = docs
+    """,
+}
+
+
+@pytest.fixture
+def root(tmp_path):
+    for project, tox_ini in PROJECTS.items():
+        (tmp_path / project).mkdir(parents=True)
+        (tmp_path / project / "tox.ini").write_text(dedent(tox_ini))
+    yield tmp_path
+
+
+def names(matrix):
+    return [(item["project"], item["name"]) for item in matrix]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_build_projects_matrix(root, jobs):
+    # (--gh-matrix-fields avoids probing interpreters in worker processes.)
+    matrix, errors = build_projects_matrix(root, args=["--gh-matrix-fields=factors"], jobs=jobs)
+    assert errors == {}
+    assert names(matrix) == [
+        ("core", "py38"),
+        ("core", "py39"),
+        ("core", "lint"),
+        ("docs", "docs"),
+        ("plugins/extra", "py39-extra"),
+    ]
+    assert matrix[-1] == {
+        "name": "py39-extra",
+        "factors": ["py39", "extra"],
+        "project": "plugins/extra",
+    }
+
+
+def test_errors_are_isolated(root):
+    (root / "broken").mkdir()
+    (root / "broken" / "tox.ini").write_text("[tox\nenvlist = py39\n")
+    matrix, errors = build_projects_matrix(root, filters=["py39"], jobs=1)
+    assert list(errors) == ["broken"]
+    assert "ParseError" in errors["broken"]
+    assert names(matrix) == [("core", "py39"), ("plugins/extra", "py39-extra")]
+
+
+def test_split_command_args():
+    args = ["--gh-matrix", "envlist", "-e", "py39", "--gh-matrix=docs=docs", "--gh-matrix-dump"]
+    assert split_command_args(args) == ["-e", "py39"]
+    assert split_command_args(["--gh-matrix", "--gh-matrix-fields=factors"]) == [
+        "--gh-matrix-fields=factors"
+    ]
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_main_projects(root, mock_interpreter, github_output, fast):
+    mock_interpreter("python3.9", version_info=(3, 9, 7, "final", 0))
+    args = ["--projects", "--projects-jobs=1", str(root), "--gh-matrix", "--gh-matrix=docs=docs"]
+    main(["--fast", *args] if fast else args)
+    gh_output = github_output()
+    envlist = json.loads(gh_output["envlist"])
+    assert len(envlist) == 5
+    assert envlist[1]["python"]["installed"] == "3.9.7"
+    assert names(json.loads(gh_output["docs"])) == [("docs", "docs")]
+    # (A single write to GITHUB_OUTPUT.)
+    assert gh_output.content.count("envlist=") == 1
+
+
+def test_main_projects_errors(root, github_output):
+    (root / "broken").mkdir()
+    (root / "broken" / "tox.ini").write_text("[tox\nenvlist = py39\n")
+    with pytest.raises(SystemExit) as exc_info:
+        main(["--projects", "--projects-jobs=1", str(root), "--gh-matrix=lint=lint"])
+    assert exc_info.value.code == 1
+    assert names(json.loads(github_output()["lint"])) == [("core", "lint")]
+
+
+@pytest.mark.parametrize(
+    "option",
+    [
+        "--gh-matrix-pack=1",
+        "--gh-matrix-chunks=2",
+        "--gh-matrix-format=compact",
+        "--gh-matrix-stages",
+        "--gh-matrix-baseline=baseline.json",
+    ],
+)
+def test_main_projects_unsupported_options(root, github_output, capsys, option):
+    with pytest.raises(SystemExit) as exc_info:
+        main(["--projects", str(root), "--gh-matrix", option])
+    assert exc_info.value.code == 2
+    assert f"--projects doesn't support {option.split('=')[0]}" in capsys.readouterr().out
+    assert github_output().content == ""
+
+
+def test_main_projects_repeated_output(root, github_output, capsys):
+    with pytest.raises(SystemExit) as exc_info:
+        main(["--projects", str(root), "--gh-matrix=envs=py38", "--gh-matrix=envs=py39"])
+    assert exc_info.value.code == 2
+    assert "--gh-matrix output 'envs' is repeated" in capsys.readouterr().out
+    assert github_output().content == ""
+
+
+@pytest.mark.parametrize("jobs", ["--projects-jobs=two", "--projects-jobs=0", "--projects-jobs"])
+def test_main_projects_jobs_invalid(root, github_output, capsys, jobs):
+    with pytest.raises(SystemExit) as exc_info:
+        main(["--projects", str(root), "--gh-matrix", jobs])
+    assert exc_info.value.code == 2
+    assert "--projects-jobs" in capsys.readouterr().out
+
+
+def test_main_projects_jobs_separate_value(root, mock_interpreter, github_output):
+    main(["--projects", "--projects-jobs", "1", str(root), "--gh-matrix"])
+    assert len(json.loads(github_output()["envlist"])) == 5
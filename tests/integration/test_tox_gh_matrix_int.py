@@ -1,6 +1,14 @@
 import json
+import subprocess
+from pathlib import Path
 from textwrap import dedent
 
+import pytest
+
+import tox_gh_matrix.plugin
+from tox_gh_matrix.cache_keys import hash_file
+from tox_gh_matrix.encoding import decode_compact_matrix
+
 
 def test_gh_matrix(tox_ini, cmd, mock_interpreter, github_output):
     tox_ini(
@@ -220,3 +228,737 @@ def test_matrix_dump(tox_ini, cmd, mock_interpreter):
         """
     )
     assert result.out.strip() == expected.strip()
+
+
+def test_multiple_outputs(tox_ini, cmd, mock_interpreter, github_output):
+    """--gh-matrix can be repeated with filters to set several outputs in one run"""
+    tox_ini(
+        """
+            [tox]
+            envlist = py{38,39}-{unix,win,mac},lint
+        """
+    )
+    result = cmd(
+        "--gh-matrix=mac-envlist=mac",
+        "--gh-matrix=win-envlist=py39-win",
+        "--gh-matrix=other=re:.*-unix|lint",
+        "--gh-matrix",
+    )
+    result.assert_success(is_run_test_env=False)
+    gh_output = github_output()
+    envnames = {
+        name: [env["name"] for env in json.loads(value)] for name, value in gh_output.items()
+    }
+    assert envnames == {
+        "mac-envlist": ["py38-mac", "py39-mac"],
+        "win-envlist": ["py39-win"],
+        "other": ["py38-unix", "py39-unix", "lint"],
+        "envlist": [
+            "py38-unix",
+            "py38-win",
+            "py38-mac",
+            "py39-unix",
+            "py39-win",
+            "py39-mac",
+            "lint",
+        ],
+    }
+    # All outputs written together, in order:
+    assert list(gh_output.keys()) == ["mac-envlist", "win-envlist", "other", "envlist"]
+
+
+def test_repeated_output(tox_ini, cmd, github_output):
+    """--gh-matrix can't set the same output twice (rather than ignore one FILTER)"""
+    tox_ini("[tox]\nenvlist = py39-{unix,win}\n")
+    result = cmd("--gh-matrix=envs=unix", "--gh-matrix=envs=win")
+    result.assert_fail()
+    assert "--gh-matrix output 'envs' is repeated" in result.err
+    assert github_output().content == ""
+
+
+def test_multiple_outputs_dump(tox_ini, cmd, github_output):
+    """--gh-matrix-dump shows each named matrix when there are several"""
+    tox_ini(
+        """
+            [tox]
+            envlist = lint,test
+        """
+    )
+    result = cmd("--gh-matrix-dump", "--gh-matrix=a=lint", "--gh-matrix=b=test")
+    result.assert_success(is_run_test_env=False)
+    assert json.loads(result.out) == {
+        "a": [{"name": "lint", "factors": ["lint"]}],
+        "b": [{"name": "test", "factors": ["test"]}],
+    }
+
+
+def test_pack(tox_ini, cmd, tmp_path, github_output):
+    """--gh-matrix-pack combines envs into balanced multi-env jobs"""
+    tox_ini(
+        """
+            [tox]
+            envlist = lint,test,docs
+        """
+    )
+    timings = tmp_path / "timings.json"
+    timings.write_text(json.dumps({"lint": 10, "test": 100, "docs": 50}))
+    result = cmd("--gh-matrix", "--gh-matrix-pack=2", f"--gh-matrix-durations={timings}")
+    result.assert_success(is_run_test_env=False)
+    envlist = json.loads(github_output()["envlist"])
+    assert envlist == [
+        {
+            "name": "test",
+            "factors": ["test"],
+            "envs": [{"name": "test", "factors": ["test"]}],
+            "estimated_seconds": 100,
+        },
+        {
+            "name": "lint,docs",
+            "factors": ["lint", "docs"],
+            "envs": [{"name": "lint", "factors": ["lint"]}, {"name": "docs", "factors": ["docs"]}],
+            "estimated_seconds": 60,
+        },
+    ]
+
+
+def test_pack_depends(tox_ini, cmd, tmp_path, github_output):
+    """--gh-matrix-pack packs each depends stage separately, earlier stages first"""
+    tox_ini(
+        """
+            [tox]
+            envlist = lint,test{1,2,3},coverage
+            [testenv:coverage]
+            depends = lint,test{1,2,3}
+        """
+    )
+    timings = tmp_path / "timings.json"
+    timings.write_text(json.dumps({"lint": 60, "test1": 100, "test2": 50, "test3": 80}))
+    args = ["--gh-matrix", "--gh-matrix-fields=name", f"--gh-matrix-durations={timings}"]
+    result = cmd(*args, "--gh-matrix-pack=3")
+    result.assert_success(is_run_test_env=False)
+    envlist = json.loads(github_output()["envlist"])
+    assert [item["name"] for item in envlist] == ["lint,test2", "test1", "test3", "coverage"]
+
+    # With stages, each stage is its own output.
+    result = cmd(*args, "--gh-matrix-pack=3", "--gh-matrix-stages")
+    result.assert_success(is_run_test_env=False)
+    gh_output = github_output()
+    assert [item["name"] for item in json.loads(gh_output["envlist-stage0"])] == [
+        "lint,test2",
+        "test1",
+        "test3",
+    ]
+    assert [item["name"] for item in json.loads(gh_output["envlist-stage1"])] == ["coverage"]
+
+
+def test_order_by_duration(tox_ini, cmd, tmp_path, github_output):
+    """--gh-matrix-order=duration starts the longest chains of work first"""
+    tox_ini(
+        """
+            [tox]
+            envlist = lint,test{1,2},coverage
+            [testenv:coverage]
+            depends = test{1,2}
+        """
+    )
+    timings = tmp_path / "timings.json"
+    timings.write_text(json.dumps({"lint": 60, "test1": 100, "test2": 50, "coverage": 10}))
+    result = cmd("--gh-matrix", "--gh-matrix-order=duration", f"--gh-matrix-durations={timings}")
+    result.assert_success(is_run_test_env=False)
+    envlist = json.loads(github_output()["envlist"])
+    assert [(env["name"], env["order"], env["estimated_seconds"]) for env in envlist] == [
+        ("test1", 0, 100),
+        ("lint", 1, 60),
+        ("test2", 2, 50),
+        ("coverage", 3, 10),
+    ]
+
+
+def test_record_history(tox_ini, cmd, github_output):
+    """--gh-matrix-record adds junit files to history, used as default durations"""
+    tox_ini(
+        """
+            [tox]
+            envlist = fast,slow
+        """
+    )
+    toxworkdir = Path(".tox")
+    toxworkdir.mkdir()
+    for envname, seconds in [("fast", 5), ("slow", 500)]:
+        (toxworkdir / f"junit.{envname}.xml").write_text(
+            f'<testsuites><testsuite failures="0" errors="0" time="{seconds}"/></testsuites>'
+        )
+    result = cmd("--gh-matrix-record")
+    result.assert_success(is_run_test_env=False)
+    assert "recorded 2 runs" in result.out
+    assert "slow" in result.out and "p50=500.0s" in result.out
+
+    result = cmd("--gh-matrix", "--gh-matrix-order=duration")
+    result.assert_success(is_run_test_env=False)
+    envlist = json.loads(github_output()["envlist"])
+    assert [env["name"] for env in envlist] == ["slow", "fast"]
+
+
+def test_shards(tox_ini, cmd, github_output):
+    """Envs can be split into shards via tox.ini or --gh-matrix-shards"""
+    tox_ini(
+        """
+            [tox]
+            envlist = py{38,39}-{unit,integration},lint
+            [testenv]
+            gh_matrix_shards =
+                integration: 3
+        """
+    )
+    result = cmd("--gh-matrix", "--gh-matrix-shards=py39-unit=2")
+    result.assert_success(is_run_test_env=False)
+    envlist = json.loads(github_output()["envlist"])
+    assert [(env["name"], env.get("shard")) for env in envlist] == [
+        ("py38-unit", None),
+        ("py38-integration", {"index": 0, "total": 3}),
+        ("py38-integration", {"index": 1, "total": 3}),
+        ("py38-integration", {"index": 2, "total": 3}),
+        ("py39-unit", {"index": 0, "total": 2}),
+        ("py39-unit", {"index": 1, "total": 2}),
+        ("py39-integration", {"index": 0, "total": 3}),
+        ("py39-integration", {"index": 1, "total": 3}),
+        ("py39-integration", {"index": 2, "total": 3}),
+        ("lint", None),
+    ]
+
+
+def test_changed_since(tox_ini, cmd, github_output):
+    """--gh-matrix-changed-since includes only envs affected by a git diff"""
+    tox_ini(
+        """
+            [tox]
+            envlist = py{38,39},docs,lint
+            [testenv]
+            gh_matrix_paths =
+                src
+                tests
+            [testenv:docs]
+            gh_matrix_paths = docs
+            [testenv:lint]
+            gh_matrix_paths =
+        """
+    )
+
+    def git(*args):
+        subprocess.run(["git", *args], check=True, stdout=subprocess.DEVNULL)
+
+    git("init", "-q")
+    git("add", "-A")
+    git("-c", "user.name=test", "-c", "user.email=test@example.com", "commit", "-qm", "init")
+
+    Path("docs").mkdir()
+    Path("docs", "index.rst").write_text("Docs\n")
+    git("add", "docs")
+    result = cmd("--gh-matrix", "--gh-matrix-changed-since=HEAD")
+    result.assert_success(is_run_test_env=False)
+    envlist = json.loads(github_output()["envlist"])
+    assert [env["name"] for env in envlist] == ["docs", "lint"]
+
+    # Changing tox.ini affects all envs
+    with Path("tox.ini").open("a") as f:
+        f.write("\n# changed\n")
+    result = cmd("--gh-matrix", "--gh-matrix-changed-since=HEAD")
+    result.assert_success(is_run_test_env=False)
+    envlist = json.loads(github_output()["envlist"])
+    assert [env["name"] for env in envlist] == ["py38", "py39", "docs", "lint"]
+
+
+def test_changed_since_unknown_ref(tox_ini, cmd, github_output):
+    """If git can't compare to the ref, all envs are included"""
+    tox_ini(
+        """
+            [tox]
+            envlist = py39,docs
+            [testenv:docs]
+            gh_matrix_paths = docs
+        """
+    )
+    result = cmd("--gh-matrix", "--gh-matrix-changed-since=no-such-ref")
+    result.assert_success(is_run_test_env=False)
+    assert "can't get changes since 'no-such-ref'" in result.out
+    envlist = json.loads(github_output()["envlist"])
+    assert [env["name"] for env in envlist] == ["py39", "docs"]
+
+
+def test_chunks(tox_ini, cmd, tmp_path, github_output):
+    """--gh-matrix-chunks splits outputs into duration-balanced chunks"""
+    tox_ini(
+        """
+            [tox]
+            envlist = py{38,39,310},docs
+        """
+    )
+    durations = tmp_path / "durations.json"
+    durations.write_text(json.dumps({"py38": 300, "py39": 200, "py310": 100, "docs": 50}))
+    result = cmd("--gh-matrix", "--gh-matrix-chunks=2", f"--gh-matrix-durations={durations}")
+    result.assert_success(is_run_test_env=False)
+    outputs = github_output()
+    assert sorted(outputs) == ["envlist-0", "envlist-1", "envlist-chunks"]
+    assert [env["name"] for env in json.loads(outputs["envlist-0"])] == ["py38", "docs"]
+    assert [env["name"] for env in json.loads(outputs["envlist-1"])] == ["py39", "py310"]
+    assert json.loads(outputs["envlist-chunks"]) == [
+        {"name": "envlist-0", "jobs": 2, "estimated_seconds": 350},
+        {"name": "envlist-1", "jobs": 2, "estimated_seconds": 300},
+    ]
+
+
+def test_output_limits_warning(tox_ini, cmd, github_output, monkeypatch):
+    """Warns about unchunked outputs that exceed GitHub's limits"""
+    monkeypatch.setattr("tox_gh_matrix.chunking.MAX_MATRIX_JOBS", 2)
+    tox_ini(
+        """
+            [tox]
+            envlist = py{38,39,310}
+        """
+    )
+    result = cmd("--gh-matrix")
+    result.assert_success(is_run_test_env=False)
+    assert "output 'envlist' (3 jobs" in result.out
+    assert "consider --gh-matrix-chunks" in result.out
+    assert len(json.loads(github_output()["envlist"])) == 3
+
+
+@pytest.mark.parametrize("extra_args", [[], ["--gh-matrix-pack=2"], ["--gh-matrix-chunks=2"]])
+def test_compact_format(tox_ini, cmd, mock_interpreter, github_output, extra_args):
+    """--gh-matrix-format=compact decodes to the same matrix"""
+    mock_interpreter("python3.9", version_info=(3, 9, 7, "final", 0))
+    tox_ini(
+        """
+            [tox]
+            envlist = py{38,39}-django{32,40},docs
+            [testenv]
+            ignore_outcome =
+                django40: true
+            gh_matrix_shards =
+                py39-django32: 2
+        """
+    )
+    args = ["--gh-matrix", "--gh-matrix-cache-keys", *extra_args]
+    cmd(*args).assert_success(is_run_test_env=False)
+    expected = github_output()
+    cmd(*args, "--gh-matrix-format=compact").assert_success(is_run_test_env=False)
+    compact = github_output()  # (later outputs replace earlier ones)
+    assert set(compact) == set(expected)
+    for name, value in compact.items():
+        assert " " not in value.replace("alpha - ", "")  # (minimal separators)
+        if name.endswith("-chunks"):
+            assert json.loads(value) == json.loads(expected[name])
+        else:
+            assert decode_compact_matrix(json.loads(value)) == json.loads(expected[name])
+
+
+def test_cache_keys_python(tox_ini, cmd, mock_interpreter, github_output, monkeypatch):
+    """cache_key uses basepython's version, without probing the installed interpreters"""
+    tox_ini(
+        """
+            [tox]
+            envlist = py39,py310
+        """
+    )
+
+    def not_called(*args, **kwargs):
+        raise AssertionError("probe_interpreters shouldn't be called")
+
+    monkeypatch.setattr(tox_gh_matrix.plugin, "probe_interpreters", not_called)
+    args = ["--gh-matrix", "--gh-matrix-fields=name,cache_key"]
+
+    def cache_keys():
+        cmd(*args).assert_success(is_run_test_env=False)
+        return {item["name"]: item["cache_key"] for item in json.loads(github_output()["envlist"])}
+
+    before = cache_keys()
+    assert before["py39"] != before["py310"]
+    # (The key is the same wherever the matrix is generated.)
+    mock_interpreter("python3.9", version_info=(3, 9, 8, "final", 0))
+    assert cache_keys() == before
+
+
+def test_fields(tox_ini, cmd, mock_interpreter, github_output, monkeypatch):
+    """--gh-matrix-fields selects item fields, and skips probing interpreters if it can"""
+    mock_interpreter("python3.9", version_info=(3, 9, 7, "final", 0))
+    tox_ini(
+        """
+            [tox]
+            envlist = py39-lint,docs
+            [testenv:docs]
+            ignore_outcome = true
+        """
+    )
+
+    def not_called(*args, **kwargs):
+        raise AssertionError("probe_interpreters shouldn't be called")
+
+    probe_interpreters = tox_gh_matrix.plugin.probe_interpreters
+    monkeypatch.setattr(tox_gh_matrix.plugin, "probe_interpreters", not_called)
+    result = cmd("--gh-matrix", "--gh-matrix-fields=python.spec,ignore_outcome")
+    result.assert_success(is_run_test_env=False)
+    assert json.loads(github_output()["envlist"]) == [
+        {"name": "py39-lint", "python": {"spec": "3.9.0-alpha - 3.9"}},
+        {"name": "docs", "ignore_outcome": True},
+    ]
+
+    monkeypatch.setattr(tox_gh_matrix.plugin, "probe_interpreters", probe_interpreters)
+    result = cmd("--gh-matrix", "--gh-matrix-fields=factors,python.installed")
+    result.assert_success(is_run_test_env=False)
+    assert json.loads(github_output()["envlist"]) == [
+        {"name": "py39-lint", "factors": ["py39", "lint"], "python": {"installed": "3.9.7"}},
+        {"name": "docs", "factors": ["docs"]},
+    ]
+
+
+def test_fields_invalid(tox_ini, cmd, github_output):
+    tox_ini(
+        """
+            [tox]
+            envlist = py39
+        """
+    )
+    result = cmd("--gh-matrix", "--gh-matrix-fields=name,python.bogus")
+    result.assert_fail()
+    assert "Unknown matrix field 'python.bogus'" in result.err
+
+
+@pytest.mark.parametrize("extra_args", [["--gh-matrix-pack=1"], ["--gh-matrix-format=compact"]])
+def test_fields_with(tox_ini, cmd, github_output, extra_args):
+    """Packing and the compact format work with partial items"""
+    tox_ini(
+        """
+            [tox]
+            envlist = py{38,39}-lint
+        """
+    )
+    result = cmd("--gh-matrix", "--gh-matrix-fields=python.spec", *extra_args)
+    result.assert_success(is_run_test_env=False)
+    assert "factors" not in github_output()["envlist"]
+
+
+def test_dedup(tox_ini, cmd, github_output):
+    """--gh-matrix-dedup combines envs with the same effective config"""
+    tox_ini(
+        """
+            [tox]
+            envlist = py39-{a,b,c},lint
+            [testenv]
+            deps =
+                pytest
+                c: six
+            commands = {envpython} -m pytest
+        """
+    )
+    result = cmd("--gh-matrix", "--gh-matrix=b=py39-b", "--gh-matrix-dedup", "-v")
+    result.assert_success(is_run_test_env=False)
+    assert "py39-a has the same config as py39-b" in result.out
+    gh_output = github_output()
+    envlist = json.loads(gh_output["envlist"])
+    assert [(item["name"], item.get("aliases")) for item in envlist] == [
+        ("py39-a", ["py39-b"]),
+        ("py39-c", None),
+        ("lint", None),
+    ]
+    # (Outputs include items covering any of their envs.)
+    assert [item["name"] for item in json.loads(gh_output["b"])] == ["py39-a"]
+
+
+def test_runners(tox_ini, cmd, github_output):
+    """--gh-matrix-runners includes only the runners each env can run on"""
+    tox_ini(
+        """
+            [tox]
+            envlist = lint,test-{linux,win},posix
+            [testenv:posix]
+            platform = linux|darwin
+        """
+    )
+    result = cmd(
+        "--gh-matrix",
+        "--gh-matrix-fields=name",
+        "--gh-matrix-runners=ubuntu-latest,windows-latest,macos-latest",
+    )
+    result.assert_success(is_run_test_env=False)
+    envlist = json.loads(github_output()["envlist"])
+    assert [(item["name"], item["runs_on"]) for item in envlist] == [
+        ("lint", "ubuntu-latest"),
+        ("lint", "windows-latest"),
+        ("lint", "macos-latest"),
+        ("test-linux", "ubuntu-latest"),
+        ("test-win", "windows-latest"),
+        ("posix", "ubuntu-latest"),
+        ("posix", "macos-latest"),
+    ]
+
+    # Packing doesn't combine envs for different runners.
+    result = cmd(
+        "--gh-matrix",
+        "--gh-matrix-fields=name",
+        "--gh-matrix-runners=ubuntu-latest,windows-latest",
+        "--gh-matrix-pack=1",
+    )
+    result.assert_success(is_run_test_env=False)
+    envlist = json.loads(github_output()["envlist"])
+    assert [(item["name"], item["runs_on"]) for item in envlist] == [
+        ("lint,test-linux,posix", "ubuntu-latest"),
+        ("lint,test-win", "windows-latest"),
+    ]
+
+
+def test_runners_dedup(tox_ini, cmd, github_output):
+    """--gh-matrix-dedup doesn't combine envs that run on different runners"""
+    tox_ini(
+        """
+            [tox]
+            envlist = py311-{linux,win}
+        """
+    )
+    result = cmd(
+        "--gh-matrix",
+        "--gh-matrix-fields=name",
+        "--gh-matrix-dedup",
+        "--gh-matrix-runners=ubuntu-latest,windows-latest",
+    )
+    result.assert_success(is_run_test_env=False)
+    envlist = json.loads(github_output()["envlist"])
+    assert envlist == [
+        {"name": "py311-linux", "runs_on": "ubuntu-latest"},
+        {"name": "py311-win", "runs_on": "windows-latest"},
+    ]
+
+
+def test_stages(tox_ini, cmd, github_output):
+    """--gh-matrix-stages splits outputs by depends"""
+    tox_ini(
+        """
+            [tox]
+            envlist = py{38,39},lint,coverage
+            [testenv:coverage]
+            depends = py{38,39}
+        """
+    )
+    result = cmd("--gh-matrix", "--gh-matrix=cov=coverage", "--gh-matrix-stages")
+    result.assert_success(is_run_test_env=False)
+    gh_output = github_output()
+    assert json.loads(gh_output["envlist-stages"]) == 2
+    assert [item["name"] for item in json.loads(gh_output["envlist-stage0"])] == [
+        "py38",
+        "py39",
+        "lint",
+    ]
+    assert [item["name"] for item in json.loads(gh_output["envlist-stage1"])] == ["coverage"]
+    # (Depends on envs that aren't in an output are ignored.)
+    assert json.loads(gh_output["cov-stages"]) == 1
+
+    result = cmd("--gh-matrix", "--gh-matrix-stages", "--gh-matrix-chunks")
+    result.assert_fail()
+    assert "can't be combined with --gh-matrix-chunks" in result.err
+
+
+def test_flaky(tox_ini, cmd, tmp_path, github_output):
+    """--gh-matrix-flaky adds fields from outcome history, and moves run_first envs first"""
+    tox_ini(
+        """
+            [tox]
+            envlist = lint,py39,py310,docs
+        """
+    )
+    history = tmp_path / "history.jsonl"
+    outcomes = {"py39": ".F..F.", "py310": "FFFF.F", "docs": "......"}
+    history.write_text(
+        "".join(
+            json.dumps({"env": env, "time": 1000 + n, "seconds": 60, "failed": outcome == "F"})
+            + "\n"
+            for env, env_outcomes in outcomes.items()
+            for n, outcome in enumerate(env_outcomes)
+        )
+    )
+    result = cmd(
+        "--gh-matrix",
+        "--gh-matrix-fields=name",
+        "--gh-matrix-flaky",
+        f"--gh-matrix-history={history}",
+    )
+    result.assert_success(is_run_test_env=False)
+    assert json.loads(github_output()["envlist"]) == [
+        {"name": "py310", "flaky_score": 0.4, "retry_count": 0, "run_first": True},
+        {"name": "lint", "flaky_score": 0.0, "retry_count": 0},
+        {"name": "py39", "flaky_score": 0.8, "retry_count": 3},
+        {"name": "docs", "flaky_score": 0.0, "retry_count": 0},
+    ]
+
+
+def test_watch(tox_ini, cmd, monkeypatch):
+    """--gh-matrix-watch shows how the matrix changes as tox.ini is edited"""
+    tox_ini(
+        """
+            [tox]
+            envlist = py39,docs
+            [testenv:docs]
+            basepython = python3.9
+        """
+    )
+    edits = [
+        "[tox]\nenvlist = py39,docs\n[testenv:docs]\nbasepython = python3.10\n",
+        "[tox]\nenvlist = py39,docs\n[testenv]\ndeps = {[nope]x}\n",  # (invalid)
+        "[tox]\nenvlist = py39,py310\n",
+    ]
+
+    def fake_sleep(seconds):
+        assert seconds == 0.5
+        if not edits:
+            raise KeyboardInterrupt
+        Path("tox.ini").write_text(edits.pop(0))
+
+    monkeypatch.setattr("time.sleep", fake_sleep)
+    result = cmd("--gh-matrix-watch=0.5", "--gh-matrix-fields=name,python.spec")
+    result.assert_success(is_run_test_env=False)
+    out = result.out
+    assert '"spec": "3.9.0-alpha - 3.9"' in out  # (the initial matrix)
+    assert "tox-gh-matrix: watching" in out
+    assert "config changed (2 items, 1 envs rebuilt)" in out
+    assert '~ docs\n    python.spec: "3.9.0-alpha - 3.9" -> "3.10.0-alpha - 3.10"' in out
+    assert "ERROR: tox-gh-matrix: ConfigError:" in out
+    assert "substitution key '[nope]x' not found" in out
+    assert '+ py310: {"name": "py310", "python": {"spec": "3.10.0-alpha - 3.10"}}\n- docs' in out
+    assert "stopped watching" in out
+
+
+def test_baseline(tox_ini, cmd, tmp_path, github_output):
+    """--gh-matrix-baseline outputs only items changed since the baseline matrix"""
+    tox_ini(
+        """
+            [tox]
+            envlist = py{38,39},docs
+            [testenv:docs]
+            gh_matrix_paths = docs
+        """
+    )
+    Path("docs").mkdir()
+    Path("docs", "index.rst").write_text("Docs\n")
+    baseline = tmp_path / "baseline.json"
+    args = ["--gh-matrix", "--gh-matrix-fields=name", f"--gh-matrix-baseline={baseline}"]
+
+    def run():
+        result = cmd(*args)
+        result.assert_success(is_run_test_env=False)
+        output = github_output()
+        return json.loads(output["envlist"]), json.loads(output["skipped"])
+
+    # Without a baseline (yet), everything runs.
+    envlist, skipped = run()
+    assert [item["name"] for item in envlist] == ["py38", "py39", "docs"]
+    assert all(len(item["fingerprint"]) == 20 for item in envlist)
+    assert skipped == []
+    baseline.write_text(json.dumps(envlist))
+
+    # Nothing changed.
+    envlist, skipped = run()
+    assert envlist == []
+    assert [item["name"] for item in skipped] == ["py38", "py39", "docs"]
+
+    # Source files (other than docs/) may affect the py envs.
+    Path("src").mkdir()
+    Path("src", "module.py").write_text("x = 1\n")
+    envlist, skipped = run()
+    assert [item["name"] for item in envlist] == ["py38", "py39"]
+    assert [item["name"] for item in skipped] == ["docs"]
+
+    # Env config changes.
+    baseline.write_text(json.dumps(envlist + skipped))
+    with Path("tox.ini").open("a") as f:
+        f.write("[testenv:py39]\ndeps = pytest\n")
+    envlist, skipped = run()
+    assert [item["name"] for item in envlist] == ["py39"]
+    assert [item["name"] for item in skipped] == ["py38", "docs"]
+
+
+def test_baseline_output_name(tox_ini, cmd, tmp_path, github_output):
+    tox_ini("[tox]\nenvlist = py39\n")
+    result = cmd("--gh-matrix=skipped", f"--gh-matrix-baseline={tmp_path / 'baseline.json'}")
+    result.assert_fail()
+    assert "--gh-matrix-baseline sets a 'skipped' output" in result.err
+
+
+def test_result_cache(tox_ini, cmd, mock_interpreter, github_output, monkeypatch):
+    """--gh-matrix-result-cache reuses the outputs of an earlier run with the same config"""
+    mock_interpreter("python3.9", version_info=(3, 9, 7, "final", 0))
+    tox_ini(
+        """
+            [tox]
+            envlist = py{38,39},docs
+        """
+    )
+    args = ["--gh-matrix", "--gh-matrix=py39=py39", "--gh-matrix-dump", "--gh-matrix-result-cache"]
+    result = cmd(*args)
+    result.assert_success(is_run_test_env=False)
+    expected = github_output()
+    assert set(expected) == {"envlist", "py39", "gh-matrix-fingerprint"}
+
+    iter_gh_matrix = tox_gh_matrix.plugin.iter_gh_matrix
+
+    def not_called(*args, **kwargs):
+        raise AssertionError("matrix generated despite cached result")
+
+    monkeypatch.setattr(tox_gh_matrix.plugin, "iter_gh_matrix", not_called)
+    cached = cmd(*args)
+    cached.assert_success(is_run_test_env=False)
+    assert cached.outlines == result.outlines
+    assert github_output() == expected
+    assert github_output().content.count("py39=") == 2
+
+    # Changing the config invalidates the cached result.
+    monkeypatch.setattr(tox_gh_matrix.plugin, "iter_gh_matrix", iter_gh_matrix)
+    Path("tox.ini").write_text("[tox]\nenvlist = py39,docs\n")
+    cmd(*args).assert_success(is_run_test_env=False)
+    changed = github_output()
+    assert changed["gh-matrix-fingerprint"] != expected["gh-matrix-fingerprint"]
+    assert [item["name"] for item in json.loads(changed["envlist"])] == ["py39", "docs"]
+
+
+def test_result_cache_files(tox_ini, cmd, mock_interpreter, github_output):
+    """Cached results are invalidated by changes to files found while parsing the config"""
+    tox_ini(
+        """
+            [tox]
+            envlist = py39
+            [testenv]
+            deps = -rrequirements.txt
+        """
+    )
+    Path("requirements.txt").write_text("pytest\n")
+    args = ["--gh-matrix", "--gh-matrix-cache-keys", "--gh-matrix-result-cache"]
+    cmd(*args).assert_success(is_run_test_env=False)
+    before = json.loads(github_output()["envlist"])
+    Path("requirements.txt").write_text("pytest\ncoverage\n")
+    hash_file.cache_clear()  # (as if in a new process)
+    cmd(*args).assert_success(is_run_test_env=False)
+    after = json.loads(github_output()["envlist"])
+    assert after[0]["cache_key"] != before[0]["cache_key"]
+
+
+def test_timings(tox_ini, cmd, mock_interpreter, github_output, tmp_path, monkeypatch):
+    """--gh-matrix-timings reports how long each phase took"""
+    mock_interpreter("python3.9")
+    tox_ini(
+        """
+            [tox]
+            envlist = py{38,39},docs
+        """
+    )
+    step_summary = tmp_path / "step-summary.md"
+    monkeypatch.setenv("GITHUB_STEP_SUMMARY", str(step_summary))
+    profile = tmp_path / "timings.json"
+    result = cmd("--gh-matrix", f"--gh-matrix-timings={profile}")
+    result.assert_success(is_run_test_env=False)
+    assert "tox-gh-matrix timings:" in result.outlines
+    assert len(json.loads(github_output()["envlist"])) == 3
+
+    phases = {phase["name"]: phase for phase in json.loads(profile.read_text())["phases"]}
+    for name in ("plugin import", "config parse", "probe interpreters", "write outputs"):
+        assert phases[name]["calls"] == 1
+    assert phases["env items"]["calls"] == 3
+    assert phases["probe python3.8"]["calls"] == 1
+    assert phases["probe python3.9"]["calls"] == 1
+    assert "| probe python3.9 | 1 |" in step_summary.read_text()
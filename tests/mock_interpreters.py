@@ -0,0 +1,99 @@
+"""
+Mock Python interpreters for tox's interpreter discovery.
+
+Shared by the integration tests' mock_interpreter fixture and the
+benchmarks (which can't use pytest fixtures), so the two can't drift.
+"""
+
+import inspect
+from typing import Callable, Dict, Tuple
+
+from tox.interpreters import InterpreterInfo, Interpreters, NoInterpreterInfo
+from tox.interpreters.py_spec import PythonSpec
+
+VersionInfo = Tuple[int, int, int, str, int]
+
+KWARG_PARAM_TYPES = (
+    inspect.Parameter.KEYWORD_ONLY,
+    inspect.Parameter.POSITIONAL_OR_KEYWORD,
+)
+
+
+class MockInterpreters:
+    """
+    The (mock) interpreters tox can find: none until install()ed.
+
+    patch(setattr) overrides tox's discovery with them,
+    using setattr (e.g., pytest's monkeypatch.setattr).
+    """
+
+    def __init__(self):
+        # basepython --> InterpreterInfo
+        self.infos: Dict[str, InterpreterInfo] = {}
+
+    def patch(self, setattr: Callable = setattr):
+        setattr(Interpreters, "get_info", lambda _self, envconfig: self.get_info(envconfig))
+        setattr(
+            Interpreters,
+            "get_executable",
+            lambda _self, envconfig: self.get_executable(envconfig),
+        )
+
+    def get_info(self, envconfig):
+        name = envconfig.basepython
+        try:
+            return self.infos[name]
+        except KeyError:
+            return NoInterpreterInfo(name=name)
+
+    def get_executable(self, envconfig):
+        name = envconfig.basepython
+        try:
+            return self.infos[name].executable
+        except KeyError:
+            return None
+
+    def install(
+        self,
+        name: str,
+        *,
+        version_info: VersionInfo = None,
+        extra_version_info: VersionInfo = None,
+        platform=None,
+    ):
+        spec = PythonSpec.from_name(name)
+        if version_info is None:
+            version_info = (spec.major, spec.minor, 0, "final", 0)
+        if version_info[:2] != (spec.major, spec.minor):
+            raise ValueError(f"{name} couldn't have version_info={version_info!r}")
+
+        implementation = {
+            "python": "CPython",
+            "pypy": "PyPy",
+            "jython": "Jython",
+            "ipython": "IronPython",
+        }.get(spec.name, spec.name)
+
+        if extra_version_info is None and implementation == "PyPy":
+            # PyPy always has extra_version_info.
+            extra_version_info = (3, 7, 0, "final", 0)
+
+        # (InterpreterInfo constructor has changed required kwargs
+        # over time, in ways which aren't relevant to this plugin.)
+        kwargs = dict(
+            implementation=implementation,
+            executable=f"/mock_interpreter/{name}/python",
+            version_info=version_info,
+            sysplatform=platform if platform is not None else "linux",
+            is_64=True,
+            os_sep={"win32": "\\"}.get(platform, "/"),
+            extra_version_info=extra_version_info,
+        )
+        parameters = inspect.signature(InterpreterInfo).parameters
+        self.infos[name] = InterpreterInfo(
+            **{
+                key: value
+                for key, value in kwargs.items()
+                if key in parameters and parameters[key].kind in KWARG_PARAM_TYPES
+            }
+        )
@@ -0,0 +1,108 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+from tox.exception import ConfigError
+
+from tox_gh_matrix.baseline import (
+    clear_caches,
+    item_fingerprint,
+    iter_fingerprints,
+    load_baseline,
+    project_files,
+    sources_digest,
+    split_baseline,
+)
+
+
+@pytest.fixture
+def project(tmp_path):
+    for path in [
+        "tox.ini",
+        "src/pkg/__init__.py",
+        "src/pkg/__pycache__/__init__.cpython-39.pyc",
+        "docs/index.rst",
+        ".git/HEAD",
+        ".tox/py39/pyvenv.cfg",
+        "venv/pyvenv.cfg",
+        "venv/lib/site.py",
+    ]:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text(path)
+    yield tmp_path
+    clear_caches()
+
+
+def test_project_files(project):
+    assert project_files(str(project)) == ("docs/index.rst", "src/pkg/__init__.py", "tox.ini")
+
+
+def test_project_files_git(project):
+    """In a git checkout, only the files git tracks are project files"""
+    for path in ["build/lib/pkg/__init__.py", "src/pkg.egg-info/PKG-INFO"]:
+        (project / path).parent.mkdir(parents=True, exist_ok=True)
+        (project / path).write_text(path)
+    shutil.rmtree(str(project / ".git"))  # (not a real repo)
+    subprocess.run(["git", "init", "-q"], cwd=str(project), check=True)
+    subprocess.run(["git", "add", "tox.ini", "src/pkg/__init__.py"], cwd=str(project), check=True)
+    assert project_files(str(project / "src")) == ("pkg/__init__.py",)
+    assert project_files(str(project)) == ("src/pkg/__init__.py", "tox.ini")
+
+
+def test_sources_digest(project):
+    root = str(project)
+    everything = sources_digest(root)
+    src = sources_digest(root, ("src",))
+    assert src != everything
+    assert sources_digest(root, ("docs/*.rst",)) not in (src, everything)
+    assert sources_digest(root, None, ("tox.ini",)) != everything
+
+    (project / "docs" / "index.rst").write_text("changed")
+    assert sources_digest(root) == everything  # (cached)
+    clear_caches()
+    assert sources_digest(root, ("src",)) == src
+    assert sources_digest(root) != everything
+
+
+def test_item_fingerprint():
+    item = {"name": "py39", "python": {"version": "3.9"}}
+    fingerprint = item_fingerprint(item, "inputs")
+    assert len(fingerprint) == 20
+    # (Fields that don't change the job don't change its fingerprint.)
+    assert item_fingerprint(dict(item, order=3, estimated_seconds=10), "inputs") == fingerprint
+    assert item_fingerprint(dict(item, fingerprint="old"), "inputs") == fingerprint
+    assert item_fingerprint(dict(item, runs_on="windows-latest"), "inputs") != fingerprint
+    assert item_fingerprint(item, "other inputs") != fingerprint
+
+
+def test_iter_fingerprints():
+    dump = {
+        "envlist": [{"name": "py39", "fingerprint": "a"}],
+        "packed": [{"name": "py38,py37", "envs": [{"fingerprint": "b"}, {"fingerprint": "c"}]}],
+        "compact": {"envs": [{"name": "lint", "fingerprint": "d"}], "python": {}},
+        "envlist-stages": 2,
+    }
+    assert sorted(iter_fingerprints(dump)) == ["a", "b", "c", "d"]
+
+
+def test_load_baseline(tmp_path):
+    path = tmp_path / "baseline.json"
+    assert load_baseline(str(path)) == set()
+    path.write_text(json.dumps([{"name": "py39", "fingerprint": "a"}, {"name": "docs"}]))
+    assert load_baseline(str(path)) == {"a"}
+    path.write_text("py39=[]")
+    with pytest.raises(ConfigError, match="can't read"):
+        load_baseline(str(path))
+
+
+def test_split_baseline():
+    matrix = [
+        {"name": "py38", "fingerprint": "a"},
+        {"name": "py39", "fingerprint": "b"},
+        {"name": "docs"},
+    ]
+    assert split_baseline(matrix, {"a", "x"}) == (
+        [{"name": "py39", "fingerprint": "b"}, {"name": "docs"}],
+        [{"name": "py38", "fingerprint": "a"}],
+    )
@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+import pytest
+
+from tox_gh_matrix.cache_keys import env_cache_key, hash_file, requirements_files
+
+
+@pytest.fixture(autouse=True)
+def clear_hash_file_cache():
+    hash_file.cache_clear()
+    yield
+    hash_file.cache_clear()
+
+
+@pytest.fixture
+def make_env(tmp_path):
+    (tmp_path / "setup.cfg").write_text("[metadata]\nname = pkg\n")
+    (tmp_path / "requirements.txt").write_text("pytest\n")
+    config = SimpleNamespace(toxinidir=tmp_path, setupdir=tmp_path)
+
+    def make_env(**kwargs):
+        settings = dict(
+            envname="py39",
+            config=config,
+            basepython="python3.9",
+            deps=["-rrequirements.txt", "coverage"],
+            extras=["test"],
+            install_command=["python", "-m", "pip", "install", "{opts}", "{packages}"],
+            skip_install=False,
+            usedevelop=False,
+        )
+        settings.update(kwargs)
+        return SimpleNamespace(**settings)
+
+    return make_env
+
+
+def test_cache_key_is_stable(make_env):
+    key = env_cache_key(make_env(), "3.9")
+    assert key.startswith("py39-")
+    assert env_cache_key(make_env(), "3.9") == key
+    # Order of extras doesn't matter:
+    env = make_env(extras=["docs", "test"])
+    assert env_cache_key(env, "3.9") == env_cache_key(make_env(extras=["test", "docs"]), "3.9")
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"basepython": "python3.10"},
+        {"deps": ["-rrequirements.txt"]},
+        {"extras": []},
+        {"install_command": ["pip", "install", "{opts}", "{packages}"]},
+        {"usedevelop": True},
+    ],
+)
+def test_cache_key_changes(make_env, changes):
+    assert env_cache_key(make_env(**changes), "3.9") != env_cache_key(make_env(), "3.9")
+
+
+def test_cache_key_python_version(make_env):
+    assert env_cache_key(make_env(), "3.10") != env_cache_key(make_env(), "3.9")
+
+
+def test_cache_key_file_contents(make_env, tmp_path):
+    key = env_cache_key(make_env(), "3.9")
+    (tmp_path / "requirements.txt").write_text("pytest>=7\n")
+    hash_file.cache_clear()
+    requirements_key = env_cache_key(make_env(), "3.9")
+    assert requirements_key != key
+    (tmp_path / "pyproject.toml").write_text("[build-system]\n")
+    hash_file.cache_clear()
+    assert env_cache_key(make_env(), "3.9") != requirements_key
+
+
+def test_cache_key_skip_install(make_env, tmp_path):
+    env = make_env(skip_install=True)
+    key = env_cache_key(env, "3.9")
+    # Package settings and setup files don't matter:
+    (tmp_path / "setup.cfg").write_text("[metadata]\nname = changed\n")
+    hash_file.cache_clear()
+    assert env_cache_key(make_env(skip_install=True, extras=[]), "3.9") == key
+
+
+def test_cache_key_independent_of_toxinidir(make_env, tmp_path):
+    env = make_env(deps=[f"-r{tmp_path}/requirements.txt"])
+    key = env_cache_key(env, "3.9")
+    other = tmp_path / "other"
+    other.mkdir()
+    for name in ("setup.cfg", "requirements.txt"):
+        (other / name).write_text((tmp_path / name).read_text())
+    config = SimpleNamespace(toxinidir=other, setupdir=other)
+    env = make_env(config=config, deps=[f"-r{other}/requirements.txt"])
+    assert env_cache_key(env, "3.9") == key
+
+
+def test_hash_file_memoized(make_env):
+    for envname in ("py38", "py39", "py310"):
+        env_cache_key(make_env(envname=envname), "3.9")
+    info = hash_file.cache_info()
+    assert info.misses == 4  # requirements.txt and the setup files
+    assert info.hits == 8
+
+
+def test_requirements_files():
+    deps = ["-rreq.txt", "--requirement=dev.txt", "-cconstraints.txt", "pytest", "-e."]
+    assert requirements_files(deps) == ["req.txt", "dev.txt", "constraints.txt"]
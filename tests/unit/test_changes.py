@@ -0,0 +1,64 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from tox_gh_matrix.changes import filter_changed_envs, path_matches, walk_project
+
+
+@pytest.mark.parametrize(
+    "path,pattern,expected",
+    [
+        ("docs/index.rst", "docs", True),
+        ("docs/api/index.rst", "docs/", True),
+        ("docs/api/index.rst", "docs/*.rst", True),  # * matches across /
+        ("docsrc/index.rst", "docs", False),
+        ("src/pkg/core.py", "src/*.py", True),
+        ("README.md", "*.md", True),
+        ("README.md", "*.rst", False),
+    ],
+)
+def test_path_matches(path, pattern, expected):
+    assert path_matches(path, pattern) is expected
+
+
+def names(envconfigs):
+    return [env.envname for env in envconfigs]
+
+
+ENVS = [
+    SimpleNamespace(envname="docs", gh_matrix_paths=["docs", "*.rst"]),
+    SimpleNamespace(envname="py39", gh_matrix_paths=["src", "tests"]),
+    SimpleNamespace(envname="lint", gh_matrix_paths=[]),  # always affected
+]
+
+
+def test_filter_changed_envs():
+    assert names(filter_changed_envs(ENVS, ["docs/index.rst"])) == ["docs", "lint"]
+    assert names(filter_changed_envs(ENVS, ["src/pkg/core.py", "README.rst"])) == [
+        "docs",
+        "py39",
+        "lint",
+    ]
+    assert names(filter_changed_envs(ENVS, [])) == ["lint"]
+
+
+def test_filter_changed_envs_all():
+    assert names(filter_changed_envs(ENVS, ["setup.cfg"])) == ["docs", "py39", "lint"]
+    assert names(filter_changed_envs(ENVS, ["ci.ini"], all_envs_patterns=["ci.ini"])) == [
+        "docs",
+        "py39",
+        "lint",
+    ]
+
+
+def test_walk_project(tmp_path):
+    for path in ["b/2.py", "b/1.py", "a/x.py", ".git/HEAD", "__pycache__/x.pyc", "venv/site.py"]:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text(path)
+    (tmp_path / "venv" / "pyvenv.cfg").write_text("")
+    walked = [
+        (os.path.relpath(dirpath, str(tmp_path)), dirnames, filenames)
+        for dirpath, dirnames, filenames in walk_project(str(tmp_path))
+    ]
+    assert walked == [(".", ["a", "b"], []), ("a", [], ["x.py"]), ("b", [], ["1.py", "2.py"])]
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+from tox.exception import ConfigError
+
+from tox_gh_matrix import chunking
+from tox_gh_matrix.chunking import (
+    chunk_gh_matrix,
+    chunk_gh_outputs,
+    gh_item_costs,
+    parse_chunk_count,
+)
+
+
+def make_matrix(count):
+    return [{"name": f"env{n}", "factors": [f"env{n}"]} for n in range(count)]
+
+
+def names(chunks):
+    return [[item["name"] for item in chunk] for chunk in chunks]
+
+
+def test_parse_chunk_count():
+    assert parse_chunk_count("auto") is None
+    assert parse_chunk_count("3") == 3
+    for value in ["0", "-1", "many"]:
+        with pytest.raises(ConfigError, match="--gh-matrix-chunks"):
+            parse_chunk_count(value)
+
+
+def test_auto_fits_job_limit(monkeypatch):
+    monkeypatch.setattr(chunking, "MAX_MATRIX_JOBS", 4)
+    chunks = chunk_gh_matrix(make_matrix(10), None, {})
+    assert [len(chunk) for chunk in chunks] == [4, 3, 3]
+    # Order is preserved within each chunk:
+    for chunk in names(chunks):
+        assert chunk == sorted(chunk, key=lambda name: int(name[3:]))
+
+
+def test_auto_fits_size_limit(monkeypatch):
+    matrix = make_matrix(10)
+    item_size = len(json.dumps(matrix[0])) + 2
+    monkeypatch.setattr(chunking, "MAX_OUTPUT_SIZE", 3 * item_size + 2)
+    chunks = chunk_gh_matrix(matrix, None, {})
+    assert len(chunks) == 4
+    assert all(len(json.dumps(chunk)) <= chunking.MAX_OUTPUT_SIZE for chunk in chunks)
+
+
+def test_auto_single_chunk():
+    assert names(chunk_gh_matrix(make_matrix(3), None, {})) == [["env0", "env1", "env2"]]
+    assert chunk_gh_matrix([], None, {}) == []
+
+
+def test_balanced_by_cost():
+    durations = {"env0": 100, "env1": 60, "env2": 50, "env3": 40, "env4": 10}
+    chunks = chunk_gh_matrix(make_matrix(5), 2, durations)
+    assert names(chunks) == [["env0", "env3"], ["env1", "env2", "env4"]]
+
+
+def test_requested_chunks_below_limits(monkeypatch):
+    monkeypatch.setattr(chunking, "MAX_MATRIX_JOBS", 2)
+    assert len(chunk_gh_matrix(make_matrix(6), 1, {})) == 3
+    # (No more chunks than items.)
+    assert len(chunk_gh_matrix(make_matrix(2), 5, {})) == 2
+
+
+def test_item_costs():
+    matrix = [
+        {"name": "a", "factors": ["a"]},
+        {"name": "b", "factors": ["b"], "shard": {"index": 0, "total": 4}},
+        {"name": "c,d", "factors": ["c", "d"], "estimated_seconds": 30},
+    ]
+    assert gh_item_costs(matrix, {"a": 10, "b": 100}) == [10, 25, 30]
+
+
+def test_chunk_gh_outputs():
+    durations = {"env0": 20, "env1": 10, "env2": 5}
+    outputs = chunk_gh_outputs({"unit": make_matrix(3), "docs": make_matrix(1)}, 2, durations)
+    assert list(outputs) == ["unit-0", "unit-1", "unit-chunks", "docs-0", "docs-chunks"]
+    assert names([outputs["unit-0"], outputs["unit-1"]]) == [["env0"], ["env1", "env2"]]
+    assert outputs["unit-chunks"] == [
+        {"name": "unit-0", "jobs": 1, "estimated_seconds": 20},
+        {"name": "unit-1", "jobs": 2, "estimated_seconds": 15},
+    ]
+    assert outputs["docs-chunks"] == [{"name": "docs-0", "jobs": 1, "estimated_seconds": 20}]
+
+
+def test_chunk_gh_outputs_default_name():
+    outputs = chunk_gh_outputs({None: make_matrix(1)}, None, {})
+    assert list(outputs) == ["envlist-0", "envlist-chunks"]
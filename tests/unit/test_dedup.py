@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+from tox_gh_matrix.dedup import dedup_envconfigs, env_fingerprint
+
+
+def make_env(envname, **kwargs):
+    envdir = f"/project/.tox/{envname}"
+    settings = dict(
+        envname=envname,
+        envdir=envdir,
+        basepython="python3.9",
+        deps=["pytest"],
+        commands=[[f"{envdir}/bin/python", "-m", "pytest"]],
+        setenv={"TOX_ENV_NAME": envname, "TOX_ENV_DIR": envdir, "PYTHONHASHSEED": "123"},
+        passenv={"PATH", "LANG"},
+        changedir="/project",
+        ignore_outcome=False,
+    )
+    settings.update(kwargs)
+    return SimpleNamespace(**settings)
+
+
+def test_fingerprint_ignores_env_specific_paths():
+    assert env_fingerprint(make_env("py39-a")) == env_fingerprint(make_env("py39-b"))
+
+
+def test_fingerprint_covers_config():
+    fingerprint = env_fingerprint(make_env("py39"))
+    for changes in [
+        dict(basepython="python3.10"),
+        dict(deps=["pytest", "six"]),
+        dict(commands=[["pytest", "-x"]]),
+        dict(setenv={"DJANGO": "4.0"}),
+        dict(ignore_outcome=True),
+        dict(gh_matrix_shards=2),
+    ]:
+        assert env_fingerprint(make_env("py39", **changes)) != fingerprint, changes
+
+
+def test_dedup_envconfigs():
+    envs = [
+        make_env("py38-a", basepython="python3.8"),
+        make_env("py38-b", basepython="python3.8"),
+        make_env("py39-a"),
+        make_env("py39-b"),
+        make_env("py39-c", deps=["six"]),
+        make_env("py39-d"),
+    ]
+    unique, aliases = dedup_envconfigs(envs)
+    assert [env.envname for env in unique] == ["py38-a", "py39-a", "py39-c"]
+    assert aliases == {"py38-a": ["py38-b"], "py39-a": ["py39-b", "py39-d"]}
+
+
+def test_dedup_envconfigs_group_key():
+    envs = [make_env("py311-linux"), make_env("py311-win"), make_env("py311-posix")]
+    runners = {"py311-linux": ["ubuntu"], "py311-win": ["windows"], "py311-posix": ["ubuntu"]}
+    unique, aliases = dedup_envconfigs(envs, group_key=lambda env: runners[env.envname])
+    assert [env.envname for env in unique] == ["py311-linux", "py311-win"]
+    assert aliases == {"py311-linux": ["py311-posix"]}
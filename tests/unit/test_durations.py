@@ -0,0 +1,63 @@
+import json
+
+import pytest
+from tox.exception import ConfigError
+
+from tox_gh_matrix.durations import (
+    DEFAULT_DURATION,
+    estimate_durations,
+    junit_path_to_envname,
+    load_durations,
+)
+
+JUNIT_XML = """<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="pytest" errors="0" failures="0" skipped="0" tests="3"
+  time="{time}"><testcase classname="t" name="t1" time="0.1" /></testsuite></testsuites>
+"""
+
+
+def write_junit(path, time):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(JUNIT_XML.format(time=time))
+
+
+def test_load_json(tmp_path):
+    path = tmp_path / "timings.json"
+    path.write_text(json.dumps({"py38": 120, "lint": 5.5}))
+    assert load_durations([str(path)]) == {"py38": 120.0, "lint": 5.5}
+
+
+def test_load_invalid_json(tmp_path):
+    path = tmp_path / "timings.json"
+    path.write_text("[1, 2, 3]")
+    with pytest.raises(ConfigError, match="Invalid tox-gh-matrix timings file"):
+        load_durations([str(path)])
+
+
+def test_load_junit(tmp_path):
+    write_junit(tmp_path / "junit.py38-django40.xml", 42.5)
+    assert load_durations([str(tmp_path / "junit.py38-django40.xml")]) == {"py38-django40": 42.5}
+
+
+def test_load_junit_dir(tmp_path):
+    # e.g., artifacts downloaded from several runs:
+    write_junit(tmp_path / "run1" / "junit.py38.xml", 10)
+    write_junit(tmp_path / "run2" / "junit.py38.xml", 20)
+    write_junit(tmp_path / "run2" / "junit.lint.xml", 3)
+    (tmp_path / "run2" / "junit.broken.xml").write_text("<not xml")
+    (tmp_path / "run2" / "other.xml").write_text("<ignored/>")
+    assert load_durations([str(tmp_path)]) == {"py38": 15.0, "lint": 3.0}
+
+
+def test_junit_path_to_envname(tmp_path):
+    assert junit_path_to_envname(tmp_path / "junit.py310-toxDev.xml") == "py310-toxDev"
+    assert junit_path_to_envname(tmp_path / "lint.xml") == "lint"
+
+
+def test_estimate_durations():
+    assert estimate_durations(["a", "b", "c"], {"a": 10, "b": 30, "x": 50}) == {
+        "a": 10,
+        "b": 30,
+        "c": 30,  # median of known durations
+    }
+    assert estimate_durations(["a"], {}) == {"a": DEFAULT_DURATION}
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from tox_gh_matrix.encoding import (
+    COMPACT_SEPARATORS,
+    decode_compact_matrix,
+    encode_compact_matrix,
+    validate_compact_matrix,
+)
+from tox_gh_matrix.packing import pack_gh_matrix
+
+PY38 = {"version": "3.8", "spec": "3.8.0-alpha - 3.8", "installed": "3.8.10"}
+PY39 = {"version": "3.9", "spec": "3.9.0-alpha - 3.9"}
+
+MATRIX = [
+    {"name": "py38-django32", "factors": ["py38", "django32"], "python": PY38},
+    {"name": "py38-django40", "factors": ["py38", "django40"], "python": PY38},
+    {
+        "name": "py39-django40",
+        "factors": ["py39", "django40"],
+        "python": PY39,
+        "ignore_outcome": True,
+        "shard": {"index": 0, "total": 2},
+    },
+    {"name": "docs", "factors": ["docs"]},
+]
+
+
+def round_trip(matrix):
+    encoded = encode_compact_matrix(iter(matrix))
+    text = json.dumps(
+        {"envs": list(encoded["envs"]), "python": encoded["python"]},
+        separators=COMPACT_SEPARATORS,
+    )
+    return decode_compact_matrix(json.loads(text)), text
+
+
+def test_encode_compact_matrix():
+    encoded = encode_compact_matrix(MATRIX)
+    assert list(encoded["envs"]) == [
+        {"name": "py38-django32", "python": "3.8"},
+        {"name": "py38-django40", "python": "3.8"},
+        {
+            "name": "py39-django40",
+            "python": "3.9",
+            "ignore_outcome": True,
+            "shard": {"index": 0, "total": 2},
+        },
+        {"name": "docs"},
+    ]
+    assert encoded["python"] == {"3.8": PY38, "3.9": PY39}
+
+
+def test_round_trip():
+    decoded, text = round_trip(MATRIX)
+    assert decoded == MATRIX
+    assert len(text) < len(json.dumps(MATRIX))
+
+
+def test_compact_size():
+    matrix = [
+        {"name": f"py3{minor}-django{django}", "factors": [f"py3{minor}", f"django{django}"]}
+        for minor in range(7, 12)
+        for django in range(40)
+    ]
+    for item in matrix:
+        version = item["name"][2] + "." + item["name"][3:].split("-")[0]
+        item["python"] = {"version": version, "spec": f"{version}.0-alpha - {version}"}
+    decoded, text = round_trip(matrix)
+    assert decoded == matrix
+    assert len(text) < len(json.dumps(matrix)) / 2
+
+
+def test_round_trip_packed():
+    packed = pack_gh_matrix([item for item in MATRIX if "shard" not in item], 2, {})
+    decoded, _ = round_trip(packed)
+    assert decoded == packed
+
+
+@pytest.mark.parametrize(
+    "data,message",
+    [
+        ([], "must be an object with 'envs' and 'python'"),
+        ({"envs": []}, "must be an object with 'envs' and 'python'"),
+        ({"envs": {}, "python": {}}, "'envs' must be a list"),
+        ({"envs": [], "python": []}, "'python' must be an object"),
+        ({"envs": [], "python": {"3.8": PY39}}, "python '3.8' must have version '3.8'"),
+        ({"envs": [{"factors": ["a"]}], "python": {}}, "must be an object with a name"),
+        ({"envs": [{"name": "a", "factors": ["a"]}], "python": {}}, "must not have factors"),
+        ({"envs": [{"name": "py38", "python": "3.8"}], "python": {}}, "unknown python '3.8'"),
+        ({"envs": [{"name": "a", "envs": [{"name": ""}]}], "python": {}}, "with a name"),
+    ],
+)
+def test_validate_compact_matrix(data, message):
+    with pytest.raises(ValueError, match=message):
+        validate_compact_matrix(data)
@@ -0,0 +1,40 @@
+import pytest
+from tox.exception import ConfigError
+
+from tox_gh_matrix.fields import default_fields, needs_python_info, parse_fields
+
+
+def test_parse_fields():
+    assert parse_fields("factors,python") == {"name": None, "factors": None, "python": None}
+    # (always in canonical order, always including name)
+    assert list(parse_fields("cache_key, python.spec,factors")) == [
+        "name",
+        "factors",
+        "python",
+        "cache_key",
+    ]
+
+
+def test_parse_subfields():
+    assert parse_fields("python.spec,python.version")["python"] == {"spec", "version"}
+    # The whole field includes all its subfields.
+    assert parse_fields("python.spec,python")["python"] is None
+    assert parse_fields("python,python.spec")["python"] is None
+
+
+@pytest.mark.parametrize("spec", ["python.bogus", "nonsense", "name.first"])
+def test_parse_fields_invalid(spec):
+    with pytest.raises(ConfigError, match="Unknown matrix field"):
+        parse_fields(spec)
+
+
+def test_default_fields():
+    assert list(default_fields()) == ["name", "factors", "python", "ignore_outcome"]
+    assert "cache_key" in default_fields(cache_key=True)
+
+
+def test_needs_python_info():
+    assert needs_python_info(default_fields())
+    assert needs_python_info(parse_fields("python.installed"))
+    assert not needs_python_info(parse_fields("factors,python.version,python.spec"))
+    assert not needs_python_info(parse_fields("factors,cache_key"))
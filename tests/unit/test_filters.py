@@ -0,0 +1,47 @@
+import pytest
+from tox.exception import ConfigError
+
+from tox_gh_matrix.filters import make_env_filter, parse_gh_matrix_spec, parse_gh_matrix_specs
+
+
+@pytest.mark.parametrize(
+    "filter_spec,envname,expected",
+    [
+        ("mac", "py38-mac", True),
+        ("mac", "py38-macos", False),
+        ("mac,win", "py38-win", True),
+        ("py39-mac", "py38-mac", False),
+        ("py39-mac", "mac-py39-django40", True),
+        ("py39-!win", "py39-unix", True),
+        ("py39-!win", "py39-win", False),
+        ("py{38,39}-win", "py38-win", True),
+        ("re:.*-(unix|mac)", "py38-mac", True),
+        ("re:.*-(unix|mac)", "py38-win", False),
+        ("re:mac", "py38-mac", False),  # must match at start, like TOX_SKIP_ENV
+    ],
+)
+def test_env_filter(filter_spec, envname, expected):
+    assert make_env_filter(filter_spec)(envname) is expected
+
+
+@pytest.mark.parametrize("filter_spec", ["", "re:(unclosed"])
+def test_env_filter_invalid(filter_spec):
+    with pytest.raises(ConfigError, match="Invalid --gh-matrix filter"):
+        make_env_filter(filter_spec)
+
+
+def test_parse_gh_matrix_spec():
+    assert parse_gh_matrix_spec("envlist") == ("envlist", None)
+    name, env_filter = parse_gh_matrix_spec("mac-envlist=mac")
+    assert name == "mac-envlist"
+    assert env_filter("py38-mac")
+    with pytest.raises(ConfigError, match="missing an output name"):
+        parse_gh_matrix_spec("=mac")
+
+
+def test_parse_gh_matrix_specs():
+    specs = parse_gh_matrix_specs(["mac-envlist=mac", "envlist"])
+    assert list(specs) == ["mac-envlist", "envlist"]
+    assert specs["envlist"] is None
+    with pytest.raises(ConfigError, match="'envlist' is repeated"):
+        parse_gh_matrix_specs(["envlist=py38", "envlist=py39"])
@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+from tox_gh_matrix.flaky import flaky_fields, flaky_stats, order_run_first
+
+
+def records(env, outcomes, seconds=10):
+    """History records for env, one per outcome character ('F' for failed)"""
+    return [
+        {"env": env, "time": 1000 + n, "seconds": seconds, "failed": outcome == "F"}
+        for n, outcome in enumerate(outcomes)
+    ]
+
+
+def test_flaky_stats():
+    stats = flaky_stats(
+        records("stable", "......")
+        + records("broken", "..FFFF", seconds=5)
+        + records("flaky", ".F.F..F.")
+        + records("new", "F")
+    )
+    assert flaky_fields(stats["stable"]) == {"flaky_score": 0.0, "retry_count": 0}
+    assert flaky_fields(stats["broken"]) == {
+        "flaky_score": 0.2,
+        "retry_count": 0,  # (it doesn't usually pass)
+        "run_first": True,
+    }
+    assert flaky_fields(stats["flaky"]) == {"flaky_score": 0.857, "retry_count": 3}
+    # (Not enough runs to tell.)
+    assert flaky_fields(stats["new"]) == {"flaky_score": 0.0, "retry_count": 0}
+    assert flaky_fields({}) == {"flaky_score": 0.0, "retry_count": 0}
+
+
+def test_retry_count():
+    # failing 1 in 10 runs: one retry makes a pass (99%) likely
+    stats = flaky_stats(records("env", ".........F" * 2))
+    assert stats["env"]["retry_count"] == 1
+
+
+def test_uses_recent_runs_in_time_order():
+    history = records("env", "FFFFFFFFFF") + [
+        {"env": "env", "time": 2000 + n, "seconds": 10, "failed": False} for n in range(20)
+    ]
+    history.reverse()
+    assert flaky_fields(flaky_stats(history)["env"]) == {"flaky_score": 0.0, "retry_count": 0}
+
+
+def env(name, depends=()):
+    return SimpleNamespace(envname=name, depends=tuple(depends))
+
+
+def test_order_run_first():
+    stats = flaky_stats(
+        records("slow-fail", "FFFF", seconds=300)
+        + records("quick-fail", "FFFF", seconds=5)
+        + records("mostly-fail", ".FFF", seconds=1)
+        + records("coverage", "FFFF")
+        + records("ok", "....")
+    )
+    envconfigs = [
+        env("ok"),
+        env("mostly-fail"),
+        env("slow-fail"),
+        env("quick-fail"),
+        env("coverage", depends=["ok"]),
+        env("docs"),
+    ]
+    assert [env.envname for env in order_run_first(envconfigs, stats)] == [
+        "quick-fail",
+        "slow-fail",
+        "mostly-fail",
+        "ok",
+        "coverage",  # (not moved ahead of its depends)
+        "docs",
+    ]
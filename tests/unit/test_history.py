@@ -0,0 +1,137 @@
+import datetime
+import json
+import os
+
+import pytest
+
+from tox_gh_matrix.durations import load_durations
+from tox_gh_matrix.history import (
+    history_stats,
+    load_history,
+    parse_junit_timestamp,
+    percentile,
+    prune_history,
+    record_junit_files,
+)
+
+JUNIT_XML = """<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="pytest" errors="{errors}" failures="{failures}"
+  skipped="0" tests="3" time="{time}"></testsuite></testsuites>
+"""
+
+NOW = 1_700_000_000.0
+DAY = 24 * 60 * 60
+
+
+def write_junit(path, time, failures=0, errors=0, mtime=NOW):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(JUNIT_XML.format(time=time, failures=failures, errors=errors))
+    os.utime(str(path), (mtime, mtime))
+    return path
+
+
+@pytest.fixture
+def store(tmp_path):
+    yield tmp_path / "history" / "gh-matrix-history.jsonl"
+
+
+def test_record(store, tmp_path):
+    write_junit(tmp_path / "tox" / "junit.py38.xml", 12.5)
+    write_junit(tmp_path / "tox" / "junit.lint.xml", 2, failures=1)
+    assert record_junit_files(store, [tmp_path / "tox"], now=NOW) == (2, 0)
+    records = load_history(store)
+    assert [(r["env"], r["seconds"], r["failed"]) for r in records] == [
+        ("lint", 2.0, True),
+        ("py38", 12.5, False),
+    ]
+
+
+def test_record_incremental(store, tmp_path):
+    junit = write_junit(tmp_path / "junit.py38.xml", 10)
+    assert record_junit_files(store, [junit], now=NOW) == (1, 0)
+    # Same file again is skipped:
+    assert record_junit_files(store, [junit], now=NOW) == (0, 0)
+    # A new run (rewritten file) is added:
+    write_junit(junit, 20, mtime=NOW + 60)
+    assert record_junit_files(store, [junit], now=NOW + 60) == (1, 0)
+    assert [r["seconds"] for r in load_history(store)] == [10.0, 20.0]
+
+
+def test_record_copies(store, tmp_path):
+    """Copies of a junit file (with different mtimes) are only recorded once"""
+    write_junit(tmp_path / "run1" / "junit.py38.xml", 10, mtime=NOW)
+    write_junit(tmp_path / "run2" / "junit.py38.xml", 10, mtime=NOW + 60)
+    assert record_junit_files(store, [tmp_path], now=NOW) == (1, 0)
+
+
+def test_record_timestamp(store, tmp_path):
+    """A record's time comes from the junit testsuite timestamp, else the file's mtime"""
+    junit = tmp_path / "junit.py38.xml"
+    junit.write_text('<testsuite time="5" timestamp="2023-11-14T21:13:20.123+00:00"></testsuite>')
+    os.utime(str(junit), (NOW + DAY, NOW + DAY))
+    write_junit(tmp_path / "junit.lint.xml", 1, mtime=NOW - DAY)
+    assert record_junit_files(store, [tmp_path], now=NOW) == (2, 0)
+    assert {r["env"]: r["time"] for r in load_history(store)} == {
+        "py38": NOW - 3600 + 0.123,
+        "lint": NOW - DAY,
+    }
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("2023-11-14T22:13:20", datetime.datetime(2023, 11, 14, 22, 13, 20).timestamp()),
+        ("2023-11-14T22:13:20.5", datetime.datetime(2023, 11, 14, 22, 13, 20).timestamp() + 0.5),
+        ("2023-11-14T22:13:20Z", NOW),
+        ("2023-11-14T22:13:20+00:00", NOW),
+        ("2023-11-14T23:13:20.000+01:00", NOW),
+        ("2023-11-14T17:13:20-0500", NOW),
+        ("yesterday", None),
+    ],
+)
+def test_parse_junit_timestamp(value, expected):
+    assert parse_junit_timestamp(value) == expected
+
+
+def test_record_prunes(store, tmp_path):
+    old = write_junit(tmp_path / "a" / "junit.py38.xml", 10, mtime=NOW - 100 * DAY)
+    record_junit_files(store, [old], now=NOW - 100 * DAY)
+    new = write_junit(tmp_path / "b" / "junit.py38.xml", 20, mtime=NOW)
+    assert record_junit_files(store, [new], now=NOW) == (1, 1)
+    assert [r["seconds"] for r in load_history(store)] == [20.0]
+
+
+def test_prune_max_runs():
+    records = [{"env": "a", "time": NOW - i, "seconds": i} for i in range(5)]
+    records.append({"env": "b", "time": NOW, "seconds": 1})
+    kept = prune_history(records, NOW, max_age=DAY, max_runs=2)
+    assert [(r["env"], r["seconds"]) for r in kept] == [("a", 0), ("a", 1), ("b", 1)]
+
+
+def test_load_ignores_bad_lines(store):
+    store.parent.mkdir()
+    store.write_text('{"env": "a", "time": 1, "seconds": 3}\n[1, 2]\n{"env": "b", "tim')
+    assert load_history(store) == [{"env": "a", "time": 1, "seconds": 3}]
+
+
+def test_history_stats():
+    records = [{"env": "a", "seconds": s, "failed": s > 8} for s in range(1, 11)]
+    assert history_stats(records) == {
+        "a": {"runs": 10, "p50": 5.0, "p95": 10.0, "failure_rate": 0.2},
+    }
+
+
+def test_percentile():
+    assert percentile([7.0], 95) == 7.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 95) == 4.0
+
+
+def test_history_durations(store):
+    store.parent.mkdir()
+    store.write_text(
+        "".join(
+            json.dumps({"env": "py38", "time": NOW, "seconds": s}) + "\n" for s in (10, 30, 20)
+        )
+    )
+    assert load_durations([str(store)]) == {"py38": 20.0}
@@ -0,0 +1,129 @@
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+from tox.interpreters import InterpreterInfo, NoInterpreterInfo
+
+from tox_gh_matrix.interpreters import (
+    interpreter_info_from_dict,
+    interpreter_info_to_dict,
+    probe_interpreters,
+)
+
+
+class FakeInterpreters:
+    """Stand-in for tox.interpreters.Interpreters that counts probes"""
+
+    def __init__(self, executables):
+        self.executables = executables  # basepython --> executable path
+        self.probed = []
+        self.discovered = []
+        self.lock = threading.Lock()
+
+    def get_executable(self, envconfig):
+        # (tox's discovery runs the interpreter, and memoizes it by envname.)
+        with self.lock:
+            if envconfig.envname not in self.discovered:
+                self.discovered.append(envconfig.envname)
+        return self.executables.get(envconfig.basepython)
+
+    def get_info(self, envconfig):
+        with self.lock:
+            self.probed.append(envconfig.basepython)
+        executable = self.get_executable(envconfig)
+        if not executable:
+            return NoInterpreterInfo(name=envconfig.basepython)
+        return InterpreterInfo(
+            implementation="CPython",
+            executable=executable,
+            version_info=(3, 9, 7, "final", 0),
+            sysplatform="linux",
+            is_64=True,
+            os_sep="/",
+            extra_version_info=None,
+        )
+
+
+@pytest.fixture
+def fake_config(tmp_path):
+    executable = tmp_path / "bin" / "python3.9"
+    executable.parent.mkdir()
+    executable.touch()
+    interpreters = FakeInterpreters({"python3.9": str(executable)})
+    yield SimpleNamespace(interpreters=interpreters, executable=executable)
+
+
+def envs(*basepythons):
+    return [SimpleNamespace(envname=f"env{i}", basepython=bp) for i, bp in enumerate(basepythons)]
+
+
+def test_probes_each_basepython_once(fake_config):
+    infos = probe_interpreters(fake_config, envs("python3.9", "python3.9", "python2.7"))
+    assert sorted(fake_config.interpreters.probed) == ["python2.7", "python3.9"]
+    assert isinstance(infos["python3.9"], InterpreterInfo)
+    assert isinstance(infos["python2.7"], NoInterpreterInfo)
+
+
+def test_no_envs(fake_config):
+    assert probe_interpreters(fake_config, []) == {}
+
+
+def test_cache_skips_probe(fake_config, tmp_path):
+    cache_dir = tmp_path / "cache"
+    probe_interpreters(fake_config, envs("python3.9"), cache_dir=cache_dir)
+    assert fake_config.interpreters.probed == ["python3.9"]
+
+    fake_config.interpreters.discovered.clear()
+    infos = probe_interpreters(fake_config, envs("python3.9"), cache_dir=cache_dir)
+    assert fake_config.interpreters.probed == ["python3.9"]  # not probed again
+    assert fake_config.interpreters.discovered == []  # nor discovered
+    assert infos["python3.9"].version_info == (3, 9, 7, "final", 0)
+    assert infos["python3.9"].executable == str(fake_config.executable)
+
+
+def test_cache_keyed_by_path(fake_config, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    probe_interpreters(fake_config, envs("python3.9"), cache_dir=cache_dir)
+    monkeypatch.setenv("PATH", str(tmp_path / "other-bin"))
+    probe_interpreters(fake_config, envs("python3.9"), cache_dir=cache_dir)
+    assert fake_config.interpreters.probed == ["python3.9", "python3.9"]
+
+    fake_config.option = SimpleNamespace(discover=[str(tmp_path / "bin")])
+    probe_interpreters(fake_config, envs("python3.9"), cache_dir=cache_dir)
+    assert len(fake_config.interpreters.probed) == 3
+
+
+def test_cache_invalidated_by_mtime(fake_config, tmp_path):
+    cache_dir = tmp_path / "cache"
+    probe_interpreters(fake_config, envs("python3.9"), cache_dir=cache_dir)
+    stat = fake_config.executable.stat()
+    os.utime(str(fake_config.executable), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    probe_interpreters(fake_config, envs("python3.9"), cache_dir=cache_dir)
+    assert fake_config.interpreters.probed == ["python3.9", "python3.9"]
+
+
+def test_corrupt_cache_ignored(fake_config, tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    (cache_dir / "interpreters.json").write_text("not json")
+    infos = probe_interpreters(fake_config, envs("python3.9"), cache_dir=cache_dir)
+    assert isinstance(infos["python3.9"], InterpreterInfo)
+    assert fake_config.interpreters.probed == ["python3.9"]
+
+
+def test_interpreter_info_round_trip(ignore_extra_kwargs):
+    info = ignore_extra_kwargs(
+        InterpreterInfo,
+        implementation="PyPy",
+        executable="/usr/bin/pypy3",
+        version_info=(3, 8, 6, "final", 0),
+        sysplatform="linux",
+        is_64=True,
+        os_sep="/",
+        extra_version_info=(7, 3, 1, "final", 0),
+    )
+    restored = interpreter_info_from_dict(interpreter_info_to_dict(info))
+    assert restored.implementation == "PyPy"
+    assert restored.version_info == (3, 8, 6, "final", 0)
+    assert restored.extra_version_info == (7, 3, 1, "final", 0)
@@ -0,0 +1,81 @@
+import json
+from collections import OrderedDict
+
+import pytest
+
+from tox_gh_matrix.json_stream import ReportWriter, iterencode
+
+ITEMS = [
+    {"name": "py39", "factors": ["py39"], "python": {"version": "3.9", "spec": "3.9"}},
+    {"name": "docs", "factors": ["docs"], "ignore_outcome": True},
+    {"name": "lint", "factors": [], "text": "multi\nline"},
+]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize(
+    "value",
+    [
+        ITEMS,
+        [],
+        {},
+        [ITEMS[0]],
+        OrderedDict([("envlist", ITEMS), ("empty", []), ("other", ITEMS[1:])]),
+        "string",
+        None,
+    ],
+)
+def test_iterencode_matches_json_dumps(value, indent):
+    assert "".join(iterencode(value, indent=indent)) == json.dumps(value, indent=indent)
+
+
+@pytest.mark.parametrize("separators", [(",", ":"), (", ", ": ")])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_iterencode_separators(indent, separators):
+    value = OrderedDict([("envlist", ITEMS), ("other", [])])
+    expected = json.dumps(value, indent=indent, separators=separators)
+    assert "".join(iterencode(value, indent=indent, separators=separators)) == expected
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_iterencode_generator(indent):
+    consumed = []
+
+    def generate():
+        for item in ITEMS:
+            consumed.append(item["name"])
+            yield item
+
+    chunks = iterencode(generate(), indent=indent)
+    # Items are consumed as the chunks are:
+    assert next(chunks) == "["
+    assert consumed == ["py39"]
+    assert "".join(chunks) == json.dumps(ITEMS, indent=indent)[1:]
+    assert consumed == ["py39", "docs", "lint"]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_iterencode_large_and_nested(indent):
+    many = [dict(item, index=i) for i, item in enumerate(ITEMS * 10)]
+    value = OrderedDict([("envs", iter(many)), ("python", {"3.9": ITEMS[0]["python"]})])
+    expected = OrderedDict([("envs", many), ("python", {"3.9": ITEMS[0]["python"]})])
+    assert "".join(iterencode(value, indent=indent)) == json.dumps(expected, indent=indent)
+    assert "".join(iterencode([many], indent=indent)) == json.dumps([many], indent=indent)
+
+
+def test_iterencode_small_values_whole():
+    # (Small dicts and lists are encoded in a single chunk, for speed.)
+    assert list(iterencode(ITEMS[0])) == [json.dumps(ITEMS[0])]
+    assert len(list(iterencode(ITEMS * 10))) > 1
+
+
+def test_report_writer(monkeypatch):
+    lines = []
+    monkeypatch.setattr("tox.reporter.line", lines.append)
+    writer = ReportWriter()
+    writer.write("[")
+    writer.write("\n  1,\n  2")
+    assert lines == ["[", "  1,"]
+    writer.write("\n]")
+    writer.close()
+    assert lines == ["[", "  1,", "  2", "]"]
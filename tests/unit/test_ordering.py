@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+from tox_gh_matrix.ordering import order_by_critical_path
+
+
+def env(name, depends=()):
+    return SimpleNamespace(envname=name, depends=tuple(depends))
+
+
+def names(envconfigs):
+    return [env.envname for env in envconfigs]
+
+
+def test_longest_first():
+    envconfigs = [env("lint"), env("py38"), env("py39"), env("docs")]
+    estimates = {"lint": 10, "py38": 300, "py39": 300, "docs": 60}
+    # (py38 and py39 tie, so keep envlist order)
+    assert names(order_by_critical_path(envconfigs, estimates)) == [
+        "py38",
+        "py39",
+        "docs",
+        "lint",
+    ]
+
+
+def test_respects_depends():
+    envconfigs = [
+        env("py38"),
+        env("py39"),
+        env("coverage", depends=["py38", "py39"]),
+        env("lint"),
+    ]
+    estimates = {"py38": 100, "py39": 200, "coverage": 500, "lint": 150}
+    # coverage is slowest, but can't start before the tests it depends on;
+    # that chain makes py39 (and then py38) more urgent than lint.
+    assert names(order_by_critical_path(envconfigs, estimates)) == [
+        "py39",
+        "py38",
+        "coverage",
+        "lint",
+    ]
+
+
+def test_critical_path():
+    # A short env that gates a long chain goes first.
+    envconfigs = [env("big"), env("setup"), env("after", depends=["setup"])]
+    estimates = {"big": 100, "setup": 10, "after": 200}
+    assert names(order_by_critical_path(envconfigs, estimates)) == ["setup", "after", "big"]
+
+
+def test_ignores_unselected_depends_and_cycles():
+    envconfigs = [env("a", depends=["b", "missing"]), env("b", depends=["a"]), env("c")]
+    estimates = {"a": 10, "b": 20, "c": 5}
+    assert sorted(names(order_by_critical_path(envconfigs, estimates))) == ["a", "b", "c"]
+
+
+def test_cycle_breaks_by_priority():
+    envconfigs = [env("a", depends=["b"]), env("b", depends=["a"]), env("c", depends=["a"])]
+    estimates = {"a": 10, "b": 20, "c": 5}
+    # (a gates both b and c, so it goes first.)
+    assert names(order_by_critical_path(envconfigs, estimates)) == ["a", "b", "c"]
+
+
+def test_long_chain():
+    # (Priorities aren't computed recursively, so long chains are fine.)
+    count = 5000
+    envconfigs = [env(f"e{i}", depends=[f"e{i - 1}"] if i else []) for i in range(count)]
+    envconfigs.reverse()
+    estimates = {f"e{i}": 1 for i in range(count)}
+    assert names(order_by_critical_path(envconfigs, estimates)) == [f"e{i}" for i in range(count)]
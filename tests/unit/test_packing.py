@@ -0,0 +1,102 @@
+import pytest
+from tox.exception import ConfigError
+
+from tox_gh_matrix.packing import merge_gh_items, pack_gh_matrix, parse_pack_jobs
+
+
+def item(name, version=None, **kwargs):
+    result = {"name": name, "factors": name.split("-")}
+    if version:
+        result["python"] = {"version": version, "spec": f"{version}.0-alpha - {version}"}
+    result.update(kwargs)
+    return result
+
+
+DURATIONS = {"py38": 300, "py39": 280, "py310": 290, "lint": 20, "docs": 40, "pkg": 10}
+MATRIX = [item("lint"), item("py38", "3.8"), item("py39", "3.9"), item("py310", "3.10")]
+MATRIX += [item("docs"), item("pkg")]
+
+
+def test_pack_jobs():
+    packed = pack_gh_matrix(MATRIX, 3, DURATIONS)
+    # Longest job first; envs within a job in envlist order:
+    assert [job["name"] for job in packed] == ["py39,docs", "py38,pkg", "lint,py310"]
+    assert [job["estimated_seconds"] for job in packed] == [320, 310, 310]
+    assert [env["name"] for env in packed[0]["envs"]] == ["py39", "docs"]
+
+
+def test_pack_auto():
+    # Fewest jobs that don't exceed the longest env (py38, 300s):
+    # total 940s / 300s --> 4 jobs.
+    packed = pack_gh_matrix(MATRIX, None, DURATIONS)
+    assert len(packed) == 4
+    assert max(job["estimated_seconds"] for job in packed) == 300
+
+
+def test_pack_more_jobs_than_envs():
+    packed = pack_gh_matrix(MATRIX[:2], 10, DURATIONS)
+    assert [job["name"] for job in packed] == ["py38", "lint"]
+
+
+def test_pack_depends_stages():
+    # Like coverage, which combines the results of all the test envs.
+    matrix = MATRIX + [item("coverage")]
+    depends = {"coverage": ["lint", "py38", "py39", "py310", "docs", "pkg"]}
+    packed = pack_gh_matrix(matrix, 3, dict(DURATIONS, coverage=5), depends)
+    # The other envs are packed as if coverage weren't there; it follows them.
+    assert [job["name"] for job in packed] == [
+        job["name"] for job in pack_gh_matrix(MATRIX, 3, DURATIONS)
+    ] + ["coverage"]
+    assert max(job["estimated_seconds"] for job in packed) == 320
+
+    # (Including through dedup aliases.)
+    matrix = [item("py39", aliases=["py39-alias"]), item("lint"), item("coverage")]
+    packed = pack_gh_matrix(matrix, 3, DURATIONS, {"coverage": ["py39-alias"]})
+    assert [job["name"] for job in packed] == ["py39", "lint", "coverage"]
+
+
+def test_pack_auto_depends():
+    matrix = MATRIX + [item("coverage")]
+    depends = {"coverage": ["py38", "py39"]}
+    packed = pack_gh_matrix(matrix, None, dict(DURATIONS, coverage=5), depends)
+    assert len(packed) == 4 + 1
+    assert packed[-1]["name"] == "coverage"
+
+
+def test_pack_empty():
+    assert pack_gh_matrix([], 3, DURATIONS) == []
+
+
+def test_merge_items():
+    merged = merge_gh_items(
+        [
+            item("py38-django32", "3.8"),
+            item("py39-django32", "3.9"),
+            item("lint"),
+        ],
+        12.4,
+    )
+    assert merged["name"] == "py38-django32,py39-django32,lint"
+    assert merged["factors"] == ["py38", "django32", "py39", "lint"]
+    assert merged["python"] == {
+        "version": "3.8\n3.9",
+        "spec": "3.8.0-alpha - 3.8\n3.9.0-alpha - 3.9",
+    }
+    assert merged["estimated_seconds"] == 12
+    assert "ignore_outcome" not in merged
+
+
+def test_merge_same_python_and_ignore_outcome():
+    merged = merge_gh_items(
+        [item("a", "3.9", ignore_outcome=True), item("b", "3.9", ignore_outcome=True)], 0
+    )
+    assert merged["python"] == {"version": "3.9", "spec": "3.9.0-alpha - 3.9"}
+    assert merged["ignore_outcome"] is True
+
+
+def test_parse_pack_jobs():
+    assert parse_pack_jobs("auto") is None
+    assert parse_pack_jobs("4") == 4
+    for invalid in ("0", "-1", "many"):
+        with pytest.raises(ConfigError):
+            parse_pack_jobs(invalid)
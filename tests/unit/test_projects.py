@@ -0,0 +1,10 @@
+from tox_gh_matrix.projects import find_projects, project_name
+
+
+def test_find_projects(tmp_path):
+    for path in ["b", "a/nested", "a", "", ".tox/py39", "venv", "node_modules/pkg"]:
+        (tmp_path / path).mkdir(parents=True, exist_ok=True)
+        (tmp_path / path / "tox.ini").write_text("[tox]\n")
+    (tmp_path / "venv" / "pyvenv.cfg").write_text("")
+    projects = find_projects(tmp_path)
+    assert [project_name(path, tmp_path) for path in projects] == [".", "a", "a/nested", "b"]
@@ -0,0 +1,135 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from tox_gh_matrix.result_cache import (
+    evict_results,
+    hash_files,
+    load_result,
+    result_fingerprint,
+    save_result,
+)
+
+
+def make_option(**kwargs):
+    settings = dict(
+        env=None,
+        discover=[],
+        gh_matrix=["envlist"],
+        gh_matrix_dump=False,
+        gh_matrix_durations=None,
+        gh_matrix_format="json",
+    )
+    settings.update(kwargs)
+    return SimpleNamespace(**settings)
+
+
+@pytest.fixture
+def toxinipath(tmp_path):
+    path = tmp_path / "tox.ini"
+    path.write_text("[tox]\nenvlist = py{38,39}\n")
+    yield path
+
+
+def test_fingerprint_is_stable(toxinipath):
+    assert result_fingerprint(make_option(), toxinipath) == result_fingerprint(
+        make_option(), toxinipath
+    )
+
+
+def test_fingerprint_covers_config(toxinipath):
+    before = result_fingerprint(make_option(), toxinipath)
+    toxinipath.write_text("[tox]\nenvlist = py{38,39,310}\n")
+    assert result_fingerprint(make_option(), toxinipath) != before
+    changed_config = result_fingerprint(make_option(), toxinipath)
+    (toxinipath.parent / "setup.cfg").write_text("[tox:tox]\n")
+    assert result_fingerprint(make_option(), toxinipath) != changed_config
+
+
+def test_fingerprint_covers_options(toxinipath):
+    before = result_fingerprint(make_option(), toxinipath)
+    assert result_fingerprint(make_option(gh_matrix_format="compact"), toxinipath) != before
+    assert result_fingerprint(make_option(env=["py38"]), toxinipath) != before
+    assert result_fingerprint(make_option(), toxinipath, fast=True) != before
+    # (Unrelated options don't matter.)
+    assert result_fingerprint(make_option(verbose_level=2), toxinipath) == before
+
+
+def test_fingerprint_covers_environ(toxinipath, monkeypatch):
+    toxinipath.write_text("[tox]\nenvlist = {env:MY_ENVLIST:py39}\n")
+    before = result_fingerprint(make_option(), toxinipath)
+    monkeypatch.setenv("TOX_SKIP_ENV", "py38")
+    skip_env = result_fingerprint(make_option(), toxinipath)
+    assert skip_env != before
+    monkeypatch.setenv("MY_ENVLIST", "py310")
+    assert result_fingerprint(make_option(), toxinipath) != skip_env
+    monkeypatch.setenv("UNRELATED", "value")
+    assert result_fingerprint(make_option(), toxinipath) == result_fingerprint(
+        make_option(), toxinipath
+    )
+
+
+def test_fingerprint_covers_durations(toxinipath, tmp_path):
+    durations = tmp_path / "durations.json"
+    durations.write_text('{"py38": 10}')
+    option = make_option(gh_matrix_durations=[str(durations)])
+    before = result_fingerprint(option, toxinipath)
+    durations.write_text('{"py38": 20}')
+    assert result_fingerprint(option, toxinipath) != before
+
+
+def test_save_and_load(tmp_path):
+    results_dir = tmp_path / "results"
+    assert load_result(results_dir, "abc") is None
+    save_result(results_dir, "abc", {"dump": ["[]"], "gh_output": "envlist=[]\n", "files": {}})
+    result = load_result(results_dir, "abc")
+    assert result["dump"] == ["[]"]
+    assert result["gh_output"] == "envlist=[]\n"
+    assert load_result(results_dir, "def") is None
+
+
+def test_load_checks_files(tmp_path):
+    results_dir = tmp_path / "results"
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("pytest\n")
+    files = hash_files([str(requirements), str(tmp_path / "missing.txt")])
+    save_result(results_dir, "abc", {"dump": [], "gh_output": "", "files": files})
+    assert load_result(results_dir, "abc") is not None
+    requirements.write_text("pytest\ncoverage\n")
+    assert load_result(results_dir, "abc") is None
+
+
+def test_load_ignores_invalid(tmp_path):
+    results_dir = tmp_path / "results"
+    results_dir.mkdir()
+    (results_dir / "abc.json").write_text("not json")
+    assert load_result(results_dir, "abc") is None
+    (results_dir / "abc.json").write_text('{"version": 0, "fingerprint": "abc"}')
+    assert load_result(results_dir, "abc") is None
+
+
+def age(path, seconds):
+    stat = path.stat()
+    os.utime(str(path), ns=(stat.st_atime_ns, stat.st_mtime_ns - int(seconds * 1e9)))
+
+
+def test_evicts_least_recently_used(tmp_path):
+    results_dir = tmp_path / "results"
+    for number, fingerprint in enumerate(["a", "b", "c"]):
+        save_result(results_dir, fingerprint, {"dump": [], "gh_output": "", "files": {}})
+        age(results_dir / f"{fingerprint}.json", 100 - number)
+    # Using "a" makes it the most recently used.
+    assert load_result(results_dir, "a") is not None
+    evict_results(results_dir, max_entries=2)
+    assert sorted(path.name for path in results_dir.iterdir()) == ["a.json", "c.json"]
+
+
+def test_evicts_to_max_size(tmp_path):
+    results_dir = tmp_path / "results"
+    for number, fingerprint in enumerate(["a", "b", "c"]):
+        save_result(results_dir, fingerprint, {"dump": [], "gh_output": "x" * 1000, "files": {}})
+        age(results_dir / f"{fingerprint}.json", 100 - number)
+    size = (results_dir / "c.json").stat().st_size
+    evict_results(results_dir, max_size=2 * size + 10)
+    assert sorted(path.name for path in results_dir.iterdir()) == ["b.json", "c.json"]
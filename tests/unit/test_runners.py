@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+import pytest
+from tox.exception import ConfigError
+
+from tox_gh_matrix.runners import env_runners, parse_runners
+
+RUNNERS = [("ubuntu-latest", "linux"), ("windows-2022", "win32"), ("macos-13", "darwin")]
+
+
+def test_parse_runners():
+    assert parse_runners("ubuntu-latest, windows-2022,macos-13") == RUNNERS
+    assert parse_runners("self-hosted-arm=linux,Windows-Large") == [
+        ("self-hosted-arm", "linux"),
+        ("Windows-Large", "win32"),
+    ]
+
+
+@pytest.mark.parametrize("spec", ["self-hosted", ","])
+def test_parse_runners_invalid(spec):
+    with pytest.raises(ConfigError, match="--gh-matrix-runners"):
+        parse_runners(spec)
+
+
+@pytest.mark.parametrize(
+    "envname,platform,expected",
+    [
+        ("py39", ".*", ["ubuntu-latest", "windows-2022", "macos-13"]),
+        ("py39-win", ".*", ["windows-2022"]),
+        ("py39-mac-linux", ".*", ["ubuntu-latest", "macos-13"]),
+        ("py39", "linux|darwin", ["ubuntu-latest", "macos-13"]),
+        ("py39-win", "linux", []),
+        # (Not a platform factor.)
+        ("winter", ".*", ["ubuntu-latest", "windows-2022", "macos-13"]),
+    ],
+)
+def test_env_runners(envname, platform, expected):
+    env = SimpleNamespace(envname=envname, platform=platform)
+    assert env_runners(env, RUNNERS) == expected
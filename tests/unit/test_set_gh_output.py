@@ -3,7 +3,7 @@ from textwrap import dedent
 import pytest
 from tox.exception import MissingDependency
 
-from tox_gh_matrix.plugin import set_gh_output
+from tox_gh_matrix.plugin import set_gh_output, set_gh_outputs, write_gh_matrix_outputs
 
 
 @pytest.fixture
@@ -42,3 +42,32 @@ def test_gh_output(gh_output):
 def test_missing_env():
     with pytest.raises(MissingDependency):
         set_gh_output("one", "ONE")
+
+
+def test_gh_outputs(gh_output):
+    set_gh_outputs({"one": "ONE", "multi": "line 1\nline 2"})
+    assert gh_output() == "one=ONE\nmulti<<EOF-uuid4-1\nline 1\nline 2\nEOF-uuid4-1\n"
+
+
+def test_gh_matrix_outputs(gh_output):
+    record = []
+    write_gh_matrix_outputs({"one": iter([{"name": "py39"}]), "count": 2}, record=record)
+    assert gh_output() == 'one=[{"name": "py39"}]\ncount=2\n'
+    assert "".join(record) == gh_output()
+
+
+def test_gh_matrix_outputs_error(gh_output):
+    def failing_matrix():
+        yield {"name": "py39"}
+        raise ValueError("Unexpected basepython format")
+
+    set_gh_output("earlier", "OK")
+    record = ["earlier"]
+    with pytest.raises(ValueError):
+        write_gh_matrix_outputs(
+            {"one": [{"name": "lint"}], "envlist": failing_matrix()}, record=record
+        )
+    assert record == ["earlier"]
+    set_gh_output("later", "OK")
+    # (None of the outputs are written: not the failed one, nor the ones before it.)
+    assert gh_output() == "earlier=OK\nlater=OK\n"
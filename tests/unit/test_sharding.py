@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+import pytest
+from tox.exception import ConfigError
+
+from tox_gh_matrix.packing import pack_gh_matrix
+from tox_gh_matrix.sharding import get_shard_count, parse_shard_specs, shard_gh_item
+
+
+def env(name, gh_matrix_shards=None):
+    return SimpleNamespace(envname=name, gh_matrix_shards=gh_matrix_shards)
+
+
+def test_cli_spec_overrides_setting():
+    specs = parse_shard_specs(["py{38,39}-slow=4", "slow=2"])
+    assert get_shard_count(env("py38-slow", "3"), specs) == 4  # first match wins
+    assert get_shard_count(env("py310-slow", "3"), specs) == 2
+    assert get_shard_count(env("py310-fast", "3"), specs) == 3  # tox.ini setting
+    assert get_shard_count(env("py310-fast"), specs) == 1
+
+
+def test_target_duration():
+    durations = {"slow": 1500, "fast": 180}
+    assert get_shard_count(env("slow"), [], durations, target=600) == 3
+    assert get_shard_count(env("fast"), [], durations, target=600) == 1
+    # No timing data: no automatic sharding
+    assert get_shard_count(env("other"), [], durations, target=600) == 1
+    # Explicit setting wins over target:
+    assert get_shard_count(env("slow", "2"), [], durations, target=600) == 2
+
+
+@pytest.mark.parametrize("spec", ["slow", "=3", "slow=0", "slow=many"])
+def test_invalid_spec(spec):
+    with pytest.raises(ConfigError):
+        parse_shard_specs([spec])
+
+
+def test_invalid_setting():
+    with pytest.raises(ConfigError, match=r"\[testenv:slow\] gh_matrix_shards"):
+        get_shard_count(env("slow", "nope"), [])
+
+
+def test_shard_gh_item():
+    item = {"name": "slow", "factors": ["slow"]}
+    assert shard_gh_item(item, 1) == [item]
+    assert shard_gh_item(item, 3) == [
+        {"name": "slow", "factors": ["slow"], "shard": {"index": 0, "total": 3}},
+        {"name": "slow", "factors": ["slow"], "shard": {"index": 1, "total": 3}},
+        {"name": "slow", "factors": ["slow"], "shard": {"index": 2, "total": 3}},
+    ]
+
+
+def test_pack_keeps_shards_separate():
+    matrix = shard_gh_item({"name": "slow", "factors": ["slow"]}, 2)
+    matrix += [{"name": "a", "factors": ["a"]}, {"name": "b", "factors": ["b"]}]
+    packed = pack_gh_matrix(matrix, 1, {"slow": 1000, "a": 10, "b": 20})
+    assert [(job["name"], job.get("shard"), job["estimated_seconds"]) for job in packed] == [
+        ("slow", {"index": 0, "total": 2}, 500),
+        ("slow", {"index": 1, "total": 2}, 500),
+        ("a,b", None, 30),
+    ]
@@ -0,0 +1,67 @@
+import pytest
+from tox.exception import ConfigError
+
+from tox_gh_matrix.staging import assign_stages, stage_gh_matrix, stage_gh_outputs
+
+DEPENDS = {
+    "coverage": ["py38", "py39"],
+    "report": ["coverage", "lint"],
+    "docs": ["missing"],
+}
+
+
+def items(*names, **kwargs):
+    return [dict(name=name, **kwargs) for name in names]
+
+
+def test_assign_stages():
+    names = ["py38", "py39", "coverage", "lint", "report", "docs"]
+    assert assign_stages(names, DEPENDS) == {
+        "py38": 0,
+        "py39": 0,
+        "coverage": 1,
+        "lint": 0,
+        "report": 2,
+        "docs": 0,
+    }
+
+
+def test_ignores_unselected_depends():
+    assert assign_stages(["py39", "coverage", "report"], DEPENDS) == {
+        "py39": 0,
+        "coverage": 1,
+        "report": 2,
+    }
+    assert assign_stages(["report"], DEPENDS) == {"report": 0}
+
+
+def test_cycle():
+    with pytest.raises(ConfigError, match="circular depends"):
+        assign_stages(["a", "b", "c"], {"a": ["b"], "b": ["a"]})
+
+
+def test_stage_gh_matrix():
+    matrix = items("report", "py38", "coverage") + items("py39", "py39", runs_on="x")
+    assert stage_gh_matrix(matrix, DEPENDS) == [
+        items("py38") + items("py39", "py39", runs_on="x"),
+        items("coverage"),
+        items("report"),
+    ]
+
+
+def test_stage_gh_matrix_aliases():
+    # coverage depends on py39, which is covered by py38's item
+    matrix = [{"name": "py38", "aliases": ["py39"]}, {"name": "coverage"}]
+    assert stage_gh_matrix(matrix, DEPENDS) == [[matrix[0]], [matrix[1]]]
+
+
+def test_stage_gh_outputs():
+    outputs = stage_gh_outputs({None: items("py38", "coverage"), "docs": items("docs")}, DEPENDS)
+    assert outputs == {
+        "envlist-stage0": items("py38"),
+        "envlist-stage1": items("coverage"),
+        "envlist-stages": 2,
+        "docs-stage0": items("docs"),
+        "docs-stages": 1,
+    }
+    assert stage_gh_outputs({"empty": []}, DEPENDS) == {"empty-stages": 0}
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from tox_gh_matrix import timings
+from tox_gh_matrix.timings import (
+    UNTIMED_PHASE,
+    format_timings_markdown,
+    format_timings_table,
+    start_timings,
+    stop_timings,
+    timed,
+    write_timings_profile,
+)
+
+
+@pytest.fixture(autouse=True)
+def no_timings():
+    stop_timings()
+    yield
+    stop_timings()
+
+
+def test_untimed_when_off():
+    assert timed("phase") is UNTIMED_PHASE
+    with timed("phase"):
+        pass
+    assert stop_timings() is None
+
+
+def test_records_phases(monkeypatch):
+    monkeypatch.setattr(timings, "MARKS", {})
+    start_timings()
+    for _ in range(3):
+        with timed("items"):
+            pass
+    with timed("write"):
+        pass
+    phases = stop_timings().as_list()
+    assert [(phase["name"], phase["calls"]) for phase in phases] == [("items", 3), ("write", 1)]
+    assert all(phase["seconds"] >= 0 for phase in phases)
+    assert timed("items") is UNTIMED_PHASE
+
+
+def test_marks_become_phases(monkeypatch):
+    monkeypatch.setattr(timings, "MARKS", {"import": 1.0, "addoption": 1.5, "configure": 4.0})
+    phases = start_timings().as_list()
+    assert phases == [
+        {"name": "plugin import", "calls": 1, "seconds": 0.5},
+        {"name": "config parse", "calls": 1, "seconds": 2.5},
+    ]
+
+
+PHASES = [
+    {"name": "plugin import", "calls": 1, "seconds": 0.25},
+    {"name": "env items", "calls": 120, "seconds": 0.0125},
+]
+
+
+def test_format_timings_table():
+    assert format_timings_table(PHASES) == [
+        "  phase           calls    seconds",
+        "  plugin import       1     0.2500",
+        "  env items         120     0.0125",
+    ]
+
+
+def test_format_timings_markdown():
+    assert format_timings_markdown(PHASES) == (
+        "### tox-gh-matrix timings\n"
+        "\n"
+        "| Phase | Calls | Seconds |\n"
+        "| --- | ---: | ---: |\n"
+        "| plugin import | 1 | 0.2500 |\n"
+        "| env items | 120 | 0.0125 |\n"
+        "\n"
+    )
+
+
+def test_write_timings_profile(tmp_path):
+    path = tmp_path / "timings.json"
+    write_timings_profile(path, PHASES)
+    assert json.loads(path.read_text()) == {"phases": PHASES}
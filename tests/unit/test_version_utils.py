@@ -7,6 +7,7 @@ from tox.interpreters import InterpreterInfo
 from tox_gh_matrix.version_utils import (
     basepython_to_gh_python_version,
     format_version_info,
+    gh_python_config,
     interpreter_info_to_version,
     python_version_to_prerelease_spec,
 )
@@ -48,8 +49,11 @@ def test_basepython_to_python_version_invalid(basepython):
     "python,expected",
     [
         ("3.7", "3.7.0-alpha - 3.7"),
-        # Unclear how to specify pypy range, so don't:
+        # setup-python's PyPy versions can't be prerelease-inclusive ranges:
         ("pypy-3.7", "pypy-3.7"),
+        ("pypy-3", "pypy-3"),
+        # nor can its Jython versions (it doesn't support Jython):
+        ("jython-3.5", "jython-3.5"),
         # These forms aren't currently handled:
         ("", ""),
         ("3", "3"),
@@ -98,3 +102,46 @@ def test_interpreter_info_to_version(
 )
 def test_format_version_info(info, expected):
     assert format_version_info(info) == expected
+
+
+@pytest.mark.parametrize(
+    "basepython,expected",
+    [
+        ("python3.10", {"version": "3.10", "spec": "3.10.0-alpha - 3.10"}),
+        ("pypy3.8", {"version": "pypy-3.8", "spec": "pypy-3.8"}),
+        ("jython3.5", {"version": "jython-3.5", "spec": "jython-3.5"}),
+        ("pypy", {"version": "pypy", "spec": "pypy"}),
+        ("python", None),
+        (sys.executable, None),
+    ],
+)
+def test_gh_python_config(basepython, expected):
+    assert gh_python_config(basepython) == expected
+
+
+def test_gh_python_config_installed(ignore_extra_kwargs):
+    interpreter_info = ignore_extra_kwargs(
+        InterpreterInfo,
+        implementation="CPython",
+        executable="n/a for this test",
+        version_info=[3, 9, 7, "final", 0],  # (e.g., from interpreter cache JSON)
+        sysplatform="n/a for this test",
+        is_64=False,
+        os_sep="/",
+        extra_version_info=None,
+    )
+    assert gh_python_config("python3.9", interpreter_info) == {
+        "version": "3.9",
+        "spec": "3.9.0-alpha - 3.9",
+        "installed": "3.9.7",
+    }
+    # Results are separate dicts (even though computed from memoized values)
+    assert gh_python_config("python3.9") is not gh_python_config("python3.9")
+
+
+def test_version_functions_memoized():
+    basepython_to_gh_python_version.cache_clear()
+    for _ in range(3):
+        basepython_to_gh_python_version("python3.8")
+    info = basepython_to_gh_python_version.cache_info()
+    assert (info.hits, info.misses) == (2, 1)
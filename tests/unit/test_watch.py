@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+from tox_gh_matrix.watch import MatrixWatcher, diff_items, diff_matrices
+
+
+def test_diff_items():
+    old = {"name": "py39", "python": {"version": "3.9", "spec": "cpython3.9"}, "x": 1}
+    new = {"name": "py39", "python": {"version": "3.9", "spec": "cpython3.9.2"}, "y": True}
+    assert diff_items(old, new) == [
+        'python.spec: "cpython3.9" -> "cpython3.9.2"',
+        "x: 1 -> null",
+        "y: null -> true",
+    ]
+
+
+def test_diff_matrices():
+    old = [
+        {"name": "py38", "python": {"version": "3.8"}},
+        {"name": "py39", "python": {"version": "3.9"}},
+        {"name": "lint", "runs_on": "ubuntu-latest"},
+        {"name": "lint", "runs_on": "windows-latest"},
+    ]
+    new = [
+        {"name": "py39", "python": {"version": "3.10"}},
+        {"name": "py310", "python": {"version": "3.10"}},
+        {"name": "lint", "runs_on": "ubuntu-latest"},
+    ]
+    assert diff_matrices(old, new) == [
+        '+ py310: {"name": "py310", "python": {"version": "3.10"}}',
+        "- py38",
+        "- lint on windows-latest",
+        "~ py39",
+        '    python.version: "3.9" -> "3.10"',
+    ]
+    assert diff_matrices(new, new) == []
+    assert diff_matrices(old, list(reversed(old))) == ["(items reordered)"]
+
+
+def make_config(**envs):
+    """Return a config with envconfigs for envname=fingerprinted setting"""
+    return SimpleNamespace(
+        envconfigs={
+            envname: SimpleNamespace(envname=envname, envdir=f"/.tox/{envname}", commands=cmd)
+            for envname, cmd in envs.items()
+        }
+    )
+
+
+class FakeBuild:
+    """Builds items with each env's commands, and remembers which envs it built"""
+
+    def __init__(self):
+        self.built = []
+
+    def __call__(self, config, env_filter):
+        for env in config.envconfigs.values():
+            if env_filter is None or env_filter(env.envname):
+                self.built.append(env.envname)
+                yield {"name": env.envname, "commands": env.commands}
+
+
+def test_matrix_watcher_reuses_unchanged_envs():
+    build = FakeBuild()
+    watcher = MatrixWatcher(build, select=lambda config: config.envconfigs.values())
+    assert watcher.update(make_config(a="1", b="2")) == [
+        {"name": "a", "commands": "1"},
+        {"name": "b", "commands": "2"},
+    ]
+    assert build.built == ["a", "b"]
+
+    build.built.clear()
+    matrix = watcher.update(make_config(c="3", a="1", b="changed"))
+    assert matrix == [
+        {"name": "c", "commands": "3"},
+        {"name": "a", "commands": "1"},
+        {"name": "b", "commands": "changed"},
+    ]
+    assert build.built == ["c", "b"]
+    assert watcher.rebuilt == {"b", "c"}
+
+    build.built.clear()
+    assert watcher.update(make_config(c="3")) == [{"name": "c", "commands": "3"}]
+    assert build.built == []
+
+
+def test_matrix_watcher_not_incremental():
+    build = FakeBuild()
+    watcher = MatrixWatcher(
+        build, select=lambda config: config.envconfigs.values(), incremental=False
+    )
+    watcher.update(make_config(a="1", b="2"))
+    build.built.clear()
+    watcher.update(make_config(a="1", b="2"))
+    assert build.built == ["a", "b"]